@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Lookups de pg_trgm (autocompletado); inofensivo en SQLite
     'debug_toolbar',
     
     # Librerías de Terceros
@@ -126,6 +127,12 @@ STORAGES = {
 }
 
 MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/'
+
+# Desarrollo sin R2: fotos en disco (mismas rutas, incluido perfiles/contenido/ de perfiles.archivos)
+if env.bool('MEDIA_LOCAL', default=False):
+    STORAGES["default"] = {"BACKEND": "django.core.files.storage.FileSystemStorage"}
+    MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+    MEDIA_URL = '/media/'
 # 7. SEGURIDAD Y CORS
 AUTH_USER_MODEL = 'usuarios.CustomUser'
 
@@ -174,5 +181,33 @@ USE_I18N = True
 USE_TZ = True
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 11. CATÁLOGO DE PERFILES
+# Backend de búsqueda (?search=): None = automático según el motor de BD (ver perfiles/search.py)
+PERFILES_BUSQUEDA_BACKEND = env('PERFILES_BUSQUEDA_BACKEND', default=None)
+# Reglas de visibilidad del catálogo (perfiles/visibilidad.py). Tras cambiarlas:
+# python manage.py recalcular_visibilidad --todos
+PERFILES_VISIBLE_REQUIERE_VERIFICACION = env.bool('PERFILES_VISIBLE_REQUIERE_VERIFICACION', default=False)
+PERFILES_VISIBLE_REQUIERE_SUSCRIPCION = env.bool('PERFILES_VISIBLE_REQUIERE_SUSCRIPCION', default=False)
+# Procesamiento de fotos subidas (perfiles/imagenes.py): 'sincrono', 'hilo' o 'worker'.
+# 'worker' solo si se despliega `manage.py procesar_imagenes` (sin él las fotos quedan pendientes)
+PERFILES_IMAGENES_MODO = env('PERFILES_IMAGENES_MODO', default='sincrono')
+PERFILES_IMAGENES_HILOS = env.int('PERFILES_IMAGENES_HILOS', default=2)
+# Segundos en 'procesando' tras los cuales procesar_imagenes la da por abandonada y la reintenta
+PERFILES_IMAGENES_TIMEOUT = env.int('PERFILES_IMAGENES_TIMEOUT', default=600)
+# Resolución máxima aceptada (ancho x alto); acota la memoria de cada decodificación
+PERFILES_IMAGENES_MAX_PIXELES = env.int('PERFILES_IMAGENES_MAX_PIXELES', default=40_000_000)
+
+# 12. CACHÉ
+# Compartida entre los workers de gunicorn. Por defecto en disco; en producción se
+# puede apuntar a Redis con CACHE_URL=redis://host:6379/1 (requiere el paquete redis).
+# Las respuestas del catálogo usan claves versionadas (perfiles/versiones.py).
+# El FileBasedCache recorta al azar al pasar MAX_ENTRIES (300 por defecto de Django) y
+# puede borrar los tokens de versiones: el tope va alto para que solo recorte en casos extremos.
+CACHES = {
+    'default': env.cache(
+        'CACHE_URL', default='filecache:///tmp/xscort_cache?max_entries=100000&cull_frequency=10'
+    ),
+}
+
 # Importar Jazzmin Config al final
 from .jazzmin_config import *
\ No newline at end of file
@@ -39,9 +39,10 @@ class PerfilModeloAdmin(admin.ModelAdmin):
         'user', 
         'ciudad', 
         'esta_publico', 
+        'esta_visible',
         'whatsapp'
     ]
-    list_filter = ['esta_publico', 'ciudad', 'genero']
+    list_filter = ['esta_publico', 'esta_visible', 'ciudad', 'genero']
     search_fields = ['nombre_artistico', 'user__username', 'user__email', 'whatsapp']
     
     # CRÍTICO: Esto crea el selector cómodo para ManyToMany
@@ -77,14 +78,14 @@ class SolicitudCambioCiudadAdmin(admin.ModelAdmin):
     def aprobar_cambios(self, request, queryset):
         from django.utils import timezone
         
-        pendientes = queryset.filter(estado='pendiente')
+        pendientes = queryset.filter(estado='pendiente').select_related('perfil')
         count = 0
         
         for solicitud in pendientes:
-            # 1. Actualizar el perfil
+            # 1. Actualizar el perfil (solo la ciudad: sin reescribir el resto de la fila)
             perfil = solicitud.perfil
-            perfil.ciudad = solicitud.ciudad_nueva
-            perfil.save()
+            perfil.ciudad_id = solicitud.ciudad_nueva_id
+            perfil.save(update_fields=['ciudad', 'updated_at'])
             
             # 2. Cerrar solicitud
             solicitud.estado = 'aprobada'
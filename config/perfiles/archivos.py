@@ -0,0 +1,84 @@
+# archivos.py
+"""
+Almacenamiento de las fotos procesadas direccionado por contenido (ArchivoMedia).
+
+Cada variante se guarda en perfiles/contenido/<sha256[:2]>/<sha256>.webp: si alguien
+sube la misma foto como avatar, portada y en la galería, el storage recibe una sola
+escritura y el CDN cachea una sola URL. Cada foto (modelo, fila, campo) registra una
+ReferenciaMedia por variante. Cuando un archivo se queda sin referencias (la foto se
+reemplazó, se quitó o se borró la fila) se elimina del storage.
+
+Liberar es idempotente: borrar las referencias de una foto dos veces no descuenta dos veces.
+Funciona con cualquier storage de Django (R2 en producción, FileSystemStorage en tests).
+"""
+import hashlib
+
+from django.db import transaction
+
+from .models import ArchivoMedia, ReferenciaMedia
+
+PREFIJO = 'perfiles/contenido'
+
+
+def _sha256(contenido):
+    digest = hashlib.sha256()
+    for chunk in contenido.chunks():
+        digest.update(chunk)
+    contenido.seek(0)
+    return digest.hexdigest()
+
+
+def es_direccionado(nombre):
+    return bool(nombre) and nombre.startswith(PREFIJO + '/')
+
+
+def guardar(contenido, storage, extension='webp'):
+    """
+    Retorna el ArchivoMedia de ese contenido, escribiéndolo en el storage solo si no existía.
+    Llamar dentro de una transacción junto con asignar(): la fila queda bloqueada hasta el
+    commit, así recolectar() no puede borrarla entre medio.
+    """
+    digest = _sha256(contenido)
+    nombre = f'{PREFIJO}/{digest[:2]}/{digest}.{extension}'
+    archivo, creado = ArchivoMedia.objects.select_for_update().get_or_create(
+        hash=digest, defaults={'nombre': nombre, 'tamano': contenido.size},
+    )
+    # Un objeto huérfano de una escritura anterior (p. ej. transacción revertida) se reutiliza
+    if creado and not storage.exists(nombre):
+        storage.save(nombre, contenido)
+    return archivo
+
+
+def asignar(modelo, objeto_id, campo, archivos):
+    """Reemplaza las referencias de una foto. Retorna los ids de archivos que dejó de usar."""
+    anteriores = set(
+        ReferenciaMedia.objects.filter(modelo=modelo, objeto_id=objeto_id, campo=campo)
+        .values_list('archivo_id', flat=True)
+    )
+    nuevos = {archivo.pk for archivo in archivos}
+    ReferenciaMedia.objects.filter(
+        modelo=modelo, objeto_id=objeto_id, campo=campo, archivo_id__in=anteriores - nuevos,
+    ).delete()
+    ReferenciaMedia.objects.bulk_create(
+        ReferenciaMedia(archivo_id=archivo_id, modelo=modelo, objeto_id=objeto_id, campo=campo)
+        for archivo_id in nuevos - anteriores
+    )
+    return anteriores - nuevos
+
+
+def recolectar(archivo_ids, storage):
+    """Borra del storage (y de la BD) los archivos que ya no tienen referencias."""
+    for archivo_id in archivo_ids:
+        with transaction.atomic():
+            archivo = ArchivoMedia.objects.select_for_update().filter(pk=archivo_id).first()
+            if archivo is None or archivo.referencias.exists():
+                continue
+            storage.delete(archivo.nombre)
+            archivo.delete()
+
+
+def liberar(modelo, objeto_id, campo, storage):
+    """La foto dejó de existir (se quitó o se borró la fila): suelta sus archivos."""
+    with transaction.atomic():
+        sin_uso = asignar(modelo, objeto_id, campo, [])
+    recolectar(sin_uso, storage)
@@ -0,0 +1,124 @@
+# autocomplete.py
+"""
+Typeahead del buscador (/api/profiles/autocomplete/?q=...).
+
+Los catálogos (ciudades, tags, servicios) son chicos: se cargan una vez por
+worker en un índice de prefijos en memoria, con coincidencia difusa por
+trigramas para errores de tipeo. Los nombres de perfiles se resuelven en la BD
+con el backend de búsqueda activo (pg_trgm en PostgreSQL).
+"""
+import time
+import unicodedata
+from bisect import bisect_left
+
+from .models import Ciudad, Servicio, Tag
+
+# Los signals invalidan el índice del worker que guardó; el TTL cubre a los demás workers
+TTL_INDICES_SEGUNDOS = 300
+UMBRAL_SIMILITUD = 0.3
+
+
+def normalizar(texto):
+    """'Viña del Mar' -> 'vina del mar'"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c)).strip()
+
+
+def trigramas(texto):
+    """Trigramas por palabra con el mismo relleno que pg_trgm ('  v', ' vi', 'vin', ...)."""
+    resultado = set()
+    for palabra in texto.split():
+        palabra = f"  {palabra} "
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+class IndicePrefijos:
+    """
+    Lista ordenada de claves normalizadas (el nombre completo y cada palabra suelta,
+    para que "mar" encuentre "Viña del Mar") recorrida con bisect.
+    """
+
+    def __init__(self, items):
+        # items: [(nombre, dato_serializable)]
+        self.items = [(normalizar(nombre), dato) for nombre, dato in items]
+        claves = []
+        for posicion, (normalizado, _) in enumerate(self.items):
+            palabras = normalizado.split()
+            for i in range(len(palabras)):
+                claves.append((' '.join(palabras[i:]), posicion))
+        claves.sort()
+        self.claves = claves
+        self.trigramas = [trigramas(normalizado) for normalizado, _ in self.items]
+
+    def buscar(self, termino, limite):
+        termino = normalizar(termino)
+        if not termino:
+            return []
+
+        encontrados = []
+        i = bisect_left(self.claves, (termino, -1))
+        while i < len(self.claves) and len(encontrados) < limite:
+            clave, posicion = self.claves[i]
+            if not clave.startswith(termino):
+                break
+            if posicion not in encontrados:
+                encontrados.append(posicion)
+            i += 1
+
+        if len(encontrados) < limite:
+            # Difuso: similitud de trigramas (como pg_trgm) sobre todo el catálogo
+            buscado = trigramas(termino)
+            candidatos = []
+            for posicion, tri in enumerate(self.trigramas):
+                if posicion in encontrados or not tri:
+                    continue
+                similitud = len(buscado & tri) / len(buscado | tri)
+                if similitud >= UMBRAL_SIMILITUD:
+                    candidatos.append((-similitud, posicion))
+            candidatos.sort()
+            encontrados += [posicion for _, posicion in candidatos[:limite - len(encontrados)]]
+
+        return [self.items[posicion][1] for posicion in encontrados]
+
+
+def _cargar_ciudades():
+    return IndicePrefijos(
+        (c.nombre, {'id': c.id, 'nombre': c.nombre, 'slug': c.slug})
+        for c in Ciudad.objects.filter(activa=True).order_by('ordering', 'nombre')
+    )
+
+
+def _cargar_tags():
+    return IndicePrefijos(
+        (t.nombre, {'id': t.id, 'nombre': t.nombre, 'slug': t.slug, 'categoria': t.categoria})
+        for t in Tag.objects.order_by('categoria', 'nombre')
+    )
+
+
+def _cargar_servicios():
+    return IndicePrefijos(
+        (s.nombre, {'id': s.id, 'nombre': s.nombre, 'slug': s.slug})
+        for s in Servicio.objects.filter(activo=True).order_by('nombre')
+    )
+
+
+CARGADORES = {
+    'ciudades': _cargar_ciudades,
+    'tags': _cargar_tags,
+    'servicios': _cargar_servicios,
+}
+
+_indices = {}
+
+
+def get_indice(nombre):
+    indice, cargado_en = _indices.get(nombre, (None, 0))
+    if indice is None or time.monotonic() - cargado_en > TTL_INDICES_SEGUNDOS:
+        indice = CARGADORES[nombre]()
+        _indices[nombre] = (indice, time.monotonic())
+    return indice
+
+
+def invalidar(nombre):
+    _indices.pop(nombre, None)
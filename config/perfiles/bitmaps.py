@@ -0,0 +1,110 @@
+# bitmaps.py
+"""
+Índice de bitsets en memoria para filtrar por varios servicios/tags a la vez
+(?servicio=masajes,parejas&tags=rubia|morena).
+
+Por cada slug se guarda un int de Python cuyo bit N está encendido si el perfil
+visible con id N lo tiene. Un AND o un OR entre valores es un & o un | entre ints,
+sin un join por valor. Cada worker arma el índice una vez y lo reconstruye cuando
+cambian los tokens de versión de relaciones, servicios o tags (perfiles.versiones).
+'relaciones' solo cambia con las tablas intermedias o la visibilidad: editar la
+biografía o subir una foto no obliga a rearmarlo.
+"""
+from . import versiones
+from .models import PerfilModelo
+
+GRUPOS = ['relaciones', 'servicios', 'tags']
+
+# Sobre esta cantidad de resultados, un IN (...) con los ids deja de convenir: se usan subqueries
+MAX_IDS = 2000
+
+RELACIONES = {
+    'servicio': (PerfilModelo.servicios.through, 'servicio'),
+    'tag': (PerfilModelo.tags.through, 'tag'),
+}
+
+
+def parsear(valor):
+    """'a|b,c' -> [['a', 'b'], ['c']]: la coma es AND y la barra es OR."""
+    grupos = [
+        [slug.strip().lower() for slug in grupo.split('|') if slug.strip()]
+        for grupo in valor.split(',')
+    ]
+    return [grupo for grupo in grupos if grupo]
+
+
+def es_combinacion(valor):
+    return ',' in valor or '|' in valor
+
+
+def a_bits(ids):
+    if not ids:
+        return 0
+    bytes_ = bytearray(max(ids) // 8 + 1)
+    for perfil_id in ids:
+        bytes_[perfil_id >> 3] |= 1 << (perfil_id & 7)
+    return int.from_bytes(bytes_, 'little')
+
+
+def a_ids(bits):
+    ids = []
+    for posicion, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            bajo = byte & -byte
+            ids.append(posicion * 8 + bajo.bit_length() - 1)
+            byte ^= bajo
+    return ids
+
+
+class IndiceBitmap:
+
+    def __init__(self):
+        self.bits = {}
+        for dimension, (through, campo) in RELACIONES.items():
+            ids_por_slug = {}
+            filas = through.objects.filter(perfilmodelo__esta_visible=True).values_list(
+                f'{campo}__slug', 'perfilmodelo_id'
+            )
+            for slug, perfil_id in filas.iterator(chunk_size=5000):
+                ids_por_slug.setdefault(slug, []).append(perfil_id)
+            self.bits[dimension] = {slug: a_bits(ids) for slug, ids in ids_por_slug.items()}
+
+    def combinar(self, condiciones):
+        """condiciones: {'servicio': [['a', 'b'], ['c']], ...} -> bitset (AND de grupos OR)."""
+        resultado = None
+        for dimension, grupos in condiciones.items():
+            bits = self.bits[dimension]
+            for grupo in grupos:
+                union = 0
+                for slug in grupo:
+                    union |= bits.get(slug, 0)
+                resultado = union if resultado is None else resultado & union
+        return resultado or 0
+
+
+_memo = {'tokens': None, 'indice': None}
+
+
+def get_indice():
+    tokens = versiones.tokens(GRUPOS)
+    if _memo['tokens'] != tokens:
+        _memo['indice'] = IndiceBitmap()
+        _memo['tokens'] = tokens
+    return _memo['indice']
+
+
+def filtrar(queryset, condiciones):
+    bits = get_indice().combinar(condiciones)
+    if not bits:
+        return queryset.none()
+    if bits.bit_count() <= MAX_IDS:
+        return queryset.filter(pk__in=a_ids(bits))
+
+    # Demasiados ids para un IN: una subquery por grupo sobre la tabla intermedia
+    for dimension, grupos in condiciones.items():
+        through, campo = RELACIONES[dimension]
+        for grupo in grupos:
+            queryset = queryset.filter(pk__in=through.objects.filter(
+                **{f'{campo}__slug__in': grupo}
+            ).values('perfilmodelo_id'))
+    return queryset
@@ -0,0 +1,44 @@
+# catalogos.py
+"""
+Bundle de catálogos para los dropdowns del frontend (/api/profiles/catalogos/):
+ciudades, servicios y tags en una sola respuesta, con una versión que es el hash
+de su contenido.
+
+Cada worker lo guarda en memoria junto con los tokens de versión con que lo armó
+(perfiles.versiones). Los signals cambian esos tokens en la caché compartida, así
+que basta una lectura de la caché por request para saber si el memo sigue vigente.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import versiones
+from .models import Ciudad, Servicio, Tag
+from .serializers import CiudadSerializer, ServicioCatalogoSerializer, ServicioSerializer, TagSerializer
+
+GRUPOS = ['ciudades', 'servicios', 'tags']
+
+_memo = {'tokens': None, 'bundle': None}
+
+
+def construir():
+    """Mismo contenido que ciudades/, servicios/, servicios-catalogo/ y tags/."""
+    servicios = list(Servicio.objects.order_by('nombre'))
+    datos = {
+        'ciudades': CiudadSerializer(Ciudad.objects.filter(activa=True).order_by('ordering', 'nombre'), many=True).data,
+        'servicios': ServicioSerializer([s for s in servicios if s.activo], many=True).data,
+        'servicios_catalogo': ServicioCatalogoSerializer(servicios, many=True).data,
+        'tags': TagSerializer(Tag.objects.order_by('categoria', 'nombre'), many=True).data,
+    }
+    contenido = json.dumps(datos, sort_keys=True, cls=DjangoJSONEncoder)
+    return {'version': hashlib.sha256(contenido.encode()).hexdigest()[:16], **datos}
+
+
+def get_bundle():
+    # Tokens leídos antes de consultar la BD: un cambio concurrente invalida el memo recién armado
+    tokens = versiones.tokens(GRUPOS)
+    if _memo['tokens'] != tokens:
+        _memo['bundle'] = construir()
+        _memo['tokens'] = tokens
+    return _memo['bundle']
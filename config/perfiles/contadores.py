@@ -0,0 +1,55 @@
+# contadores.py
+"""
+Contadores denormalizados de PerfilModelo: likes_count, resenas_aprobadas_count
+y rating_promedio.
+
+Los likes se ajustan con F() en cada alta/baja (perfiles.signals), junto con su
+término de ranking_score; las reseñas se
+recalculan para el perfil afectado cuando se crean, aprueban o borran
+(reviews.signals). recalcular() es también la reparación completa.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+from . import ranking
+from .models import PerfilLike, PerfilModelo
+
+
+def sumar_like(perfil_id, delta):
+    perfiles = PerfilModelo.objects.filter(pk=perfil_id)
+    if delta < 0:
+        perfiles = perfiles.filter(likes_count__gte=-delta)
+    # En el UPDATE, F('likes_count') es todavía el valor anterior
+    perfiles.update(
+        likes_count=F('likes_count') + delta,
+        ranking_score=(
+            F('ranking_score') + ranking.termino_likes(F('likes_count') + delta) - ranking.termino_likes(F('likes_count'))
+        ),
+    )
+
+
+def _agregado(queryset, expresion):
+    return Subquery(
+        queryset.order_by().values('perfil_modelo').annotate(valor=expresion).values('valor')
+    )
+
+
+def recalcular(perfiles, likes=True, resenas=True):
+    """Recalcula los contadores de un queryset de perfiles en un solo UPDATE."""
+    from reviews.models import Resena  # Import diferido: reviews depende de perfiles
+
+    cambios = {}
+    if likes:
+        likes_qs = PerfilLike.objects.filter(perfil_modelo=OuterRef('pk'))
+        cambios['likes_count'] = Coalesce(_agregado(likes_qs, Count('pk')), Value(0))
+    if resenas:
+        resenas_qs = Resena.objects.filter(perfil_modelo=OuterRef('pk'), aprobada=True)
+        decimal = DecimalField(max_digits=3, decimal_places=2)
+        cambios['resenas_aprobadas_count'] = Coalesce(_agregado(resenas_qs, Count('pk')), Value(0))
+        cambios['rating_promedio'] = Coalesce(
+            Cast(_agregado(resenas_qs, Avg('rating')), decimal),
+            Value(Decimal('0'), output_field=decimal),
+        )
+    return PerfilModelo.objects.filter(pk__in=perfiles.values('pk')).update(**cambios)
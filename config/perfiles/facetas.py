@@ -0,0 +1,190 @@
+# facetas.py
+"""
+Conteos precalculados de los filtros del catálogo (ConteoFaceta): perfiles visibles
+por ciudad, género, servicio y tag, por ciudad y en total.
+
+Cada cambio relevante (perfil, sus servicios/tags, visibilidad) se aplica como un
+delta (+1/-1) sobre las filas afectadas, con UPDATE ... SET total = total + n: dos
+requests concurrentes no se pisan ni chocan con las restricciones de unicidad, y no
+hace falta recontar la ciudad. Las filas que faltan se insertan antes con ON CONFLICT
+DO NOTHING. Renombrar o borrar una ciudad, servicio o tag solo toca las filas de ese
+valor. `manage.py reconstruir_facetas` recalcula todo (y corrige cualquier deriva).
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import Ciudad, ConteoFaceta, PerfilModelo
+
+RELACIONES = {
+    'servicio': (PerfilModelo.servicios.through, 'servicio'),
+    'tag': (PerfilModelo.tags.through, 'tag'),
+}
+
+
+def _claves(filas, slugs_ciudad, relaciones):
+    """Claves (ciudad_id, dimensión, valor) que aportan perfiles (pk, ciudad_id, genero) visibles."""
+    claves = Counter()
+    for pk, ciudad_id, genero in filas:
+        claves[(ciudad_id, 'ciudad', slugs_ciudad[ciudad_id])] += 1
+        claves[(ciudad_id, 'genero', genero)] += 1
+        for dimension, valor in relaciones.get(pk, ()):
+            claves[(ciudad_id, dimension, valor)] += 1
+    return claves
+
+
+def _relaciones(perfil_ids):
+    relaciones = defaultdict(list)
+    for dimension, (through, lado) in RELACIONES.items():
+        for pk, slug in through.objects.filter(perfilmodelo_id__in=perfil_ids).values_list('perfilmodelo_id', f'{lado}__slug'):
+            relaciones[pk].append((dimension, slug))
+    return relaciones
+
+
+def _slugs_ciudad(ciudad_ids):
+    return dict(Ciudad.objects.filter(pk__in=ciudad_ids).values_list('pk', 'slug'))
+
+
+def aportes(perfil_ids):
+    """Lo que aportan esos perfiles a las facetas (tal como están ahora en la BD)."""
+    filas = list(PerfilModelo.objects.filter(pk__in=perfil_ids).values_list('pk', 'ciudad_id', 'genero'))
+    if not filas:
+        return Counter()
+    return _claves(filas, _slugs_ciudad({fila[1] for fila in filas}), _relaciones(perfil_ids))
+
+
+def mostrar(perfil_ids):
+    sumar(aportes(perfil_ids))
+
+
+def ocultar(perfil_ids):
+    sumar({clave: -n for clave, n in aportes(perfil_ids).items()})
+
+
+def mover(perfil_id, antes, despues):
+    """Un perfil visible cambió de (ciudad_id, genero): resta lo de antes y suma lo de ahora."""
+    slugs = _slugs_ciudad({antes[0], despues[0]})
+    relaciones = _relaciones([perfil_id])
+    deltas = _claves([(perfil_id, *despues)], slugs, relaciones)
+    deltas.subtract(_claves([(perfil_id, *antes)], slugs, relaciones))
+    sumar(deltas)
+
+
+def relaciones_cambiadas(dimension, filtro, signo):
+    """
+    Servicios o tags agregados (+1) o por quitar (-1) en la tabla intermedia, de perfiles
+    visibles. `filtro` selecciona exactamente las filas afectadas de la tabla intermedia.
+    """
+    through, lado = RELACIONES[dimension]
+    filas = (
+        through.objects.filter(perfilmodelo__esta_visible=True, **filtro)
+        .values_list('perfilmodelo__ciudad_id', f'{lado}__slug').annotate(n=Count('pk')).order_by()
+    )
+    sumar({(ciudad_id, dimension, slug): signo * n for ciudad_id, slug, n in filas})
+
+
+def _actualizar(claves, **valores):
+    """UPDATE de las filas de esas claves, en tandas (un OR por clave)."""
+    claves = list(claves)
+    for inicio in range(0, len(claves), 200):
+        condicion = reduce(or_, (
+            Q(ciudad_id=ciudad_id, dimension=dimension, valor=valor) if ciudad_id is not None
+            else Q(ciudad__isnull=True, dimension=dimension, valor=valor)
+            for ciudad_id, dimension, valor in claves[inicio:inicio + 200]
+        ))
+        ConteoFaceta.objects.filter(condicion).update(**valores)
+
+
+def sumar(deltas):
+    """Aplica {(ciudad_id, dimensión, valor): n} a las filas por ciudad y a las globales."""
+    total = Counter()
+    for (ciudad_id, dimension, valor), n in deltas.items():
+        total[(ciudad_id, dimension, valor)] += n
+        total[(None, dimension, valor)] += n
+    total = {clave: n for clave, n in total.items() if n}
+    if not total:
+        return
+
+    with transaction.atomic():
+        ConteoFaceta.objects.bulk_create(
+            [ConteoFaceta(ciudad_id=ciudad_id, dimension=dimension, valor=valor, total=0)
+             for ciudad_id, dimension, valor in sorted(total, key=str)],
+            ignore_conflicts=True,
+        )
+        # Un UPDATE por valor de delta (casi siempre +1 o -1)
+        por_delta = defaultdict(list)
+        for clave, n in total.items():
+            por_delta[n].append(clave)
+        for n, claves in por_delta.items():
+            _actualizar(claves, total=Greatest(F('total') + n, Value(0)))
+
+
+@transaction.atomic
+def renombrar(dimension, antes, despues):
+    """El slug de una ciudad, servicio o tag cambió: sus filas pasan al slug nuevo."""
+    # Restos en 0 de un valor que antes tuvo ese slug (nadie más puede tenerlo ahora)
+    ConteoFaceta.objects.filter(dimension=dimension, valor=despues).delete()
+    ConteoFaceta.objects.filter(dimension=dimension, valor=antes).update(valor=despues)
+
+
+def quitar(dimension, valor):
+    """Se borró la ciudad, servicio o tag: sus filas ya no cuentan nada."""
+    ConteoFaceta.objects.filter(dimension=dimension, valor=valor).delete()
+
+
+def _conteos():
+    visibles = PerfilModelo.objects.filter(esta_visible=True)
+    filas = list(visibles.values_list('pk', 'ciudad_id', 'genero'))
+    relaciones = defaultdict(list)
+    for dimension, (through, lado) in RELACIONES.items():
+        for pk, slug in through.objects.filter(perfilmodelo__esta_visible=True).values_list('perfilmodelo_id', f'{lado}__slug'):
+            relaciones[pk].append((dimension, slug))
+    conteos = _claves(filas, dict(Ciudad.objects.values_list('pk', 'slug')), relaciones)
+    for (ciudad_id, dimension, valor), n in list(conteos.items()):
+        conteos[(None, dimension, valor)] += n
+    return conteos
+
+
+@transaction.atomic
+def reconstruir():
+    """
+    Recalcula todo desde cero. Bloquea las filas existentes en vez de borrarlas: los
+    deltas concurrentes esperan y se aplican encima del recuento. Las filas en 0 (slugs
+    renombrados, tags sin perfiles) se conservan: obtener() las omite.
+    """
+    list(ConteoFaceta.objects.select_for_update().values_list('pk', flat=True))
+    conteos = _conteos()
+    ConteoFaceta.objects.exclude(total=0).update(total=0)
+    ConteoFaceta.objects.bulk_create(
+        [ConteoFaceta(ciudad_id=ciudad_id, dimension=dimension, valor=valor, total=0)
+         for ciudad_id, dimension, valor in conteos],
+        ignore_conflicts=True,
+    )
+    por_total = defaultdict(list)
+    for clave, n in conteos.items():
+        por_total[n].append(clave)
+    for n, claves in por_total.items():
+        _actualizar(claves, total=n)
+
+
+def obtener(ciudad_id=None):
+    """
+    {'ciudad': {slug: n}, 'genero': {...}, 'servicio': {...}, 'tag': {...}}
+    Con ciudad_id, género/servicios/tags quedan condicionados a esa ciudad; las
+    ciudades siempre son globales (elegir otra ciudad reemplaza el filtro).
+    """
+    resultado = {dimension: {} for dimension, _ in ConteoFaceta.DIMENSIONES}
+    if ciudad_id is None:
+        filas = ConteoFaceta.objects.filter(ciudad__isnull=True)
+    else:
+        filas = ConteoFaceta.objects.filter(
+            Q(ciudad__isnull=True, dimension='ciudad') | (Q(ciudad_id=ciudad_id) & ~Q(dimension='ciudad'))
+        )
+    filas = filas.filter(total__gt=0)
+    for dimension, valor, total in filas.values_list('dimension', 'valor', 'total').order_by('-total', 'valor'):
+        resultado[dimension][valor] = total
+    return resultado
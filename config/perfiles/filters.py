@@ -1,16 +1,92 @@
 import django_filters
+from rest_framework import filters
+from . import bitmaps
 from .models import PerfilModelo
+from .search import get_backend
+
+class SlugFilter(django_filters.CharFilter):
+    """
+    Igualdad exacta sobre un slug, normalizando a minúsculas (slugify siempre las genera).
+    A diferencia de iexact (UPPER()/LIKE), puede usar el índice único del slug.
+    """
+
+    def filter(self, qs, value):
+        return super().filter(qs, value.lower() if value else value)
+
+
+class RelacionFilter(SlugFilter):
+    """
+    Un slug se filtra con el join de siempre; las combinaciones ('a,b' = AND,
+    'a|b' = OR) las resuelve PerfilFilter con el índice de bitsets (perfiles.bitmaps).
+    """
+
+    def __init__(self, *args, dimension, **kwargs):
+        self.dimension = dimension
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value and bitmaps.es_combinacion(value):
+            return qs
+        return super().filter(qs, value)
+
 
 class PerfilFilter(django_filters.FilterSet):
     # Filtramos por el 'slug' de la relación ciudad
-    ciudad = django_filters.CharFilter(field_name='ciudad__slug', lookup_expr='iexact')
+    ciudad = SlugFilter(field_name='ciudad__slug')
     
-    # Filtramos por el 'slug' de los servicios (tags)
-    servicio = django_filters.CharFilter(field_name='servicios__slug', lookup_expr='iexact')
+    # Filtramos por el 'slug' de los servicios (tags): ?servicio=masajes,parejas
+    servicio = RelacionFilter(field_name='servicios__slug', dimension='servicio')
     
-    # Filtramos por tags generales
-    tags = django_filters.CharFilter(field_name='tags__slug', lookup_expr='iexact')
+    # Filtramos por tags generales: ?tags=rubia|morena
+    tags = RelacionFilter(field_name='tags__slug', dimension='tag')
+
+    # Rangos (?edad_min=25&edad_max=30): cubiertos por los índices parciales (ciudad, genero, edad)
+    edad_min = django_filters.NumberFilter(field_name='edad', lookup_expr='gte')
+    edad_max = django_filters.NumberFilter(field_name='edad', lookup_expr='lte')
+    altura_min = django_filters.NumberFilter(field_name='altura', lookup_expr='gte')
+    altura_max = django_filters.NumberFilter(field_name='altura', lookup_expr='lte')
+    peso_min = django_filters.NumberFilter(field_name='peso', lookup_expr='gte')
+    peso_max = django_filters.NumberFilter(field_name='peso', lookup_expr='lte')
 
     class Meta:
         model = PerfilModelo
-        fields = ['ciudad', 'servicio', 'tags', 'genero', 'esta_publico']
\ No newline at end of file
+        fields = ['ciudad', 'servicio', 'tags', 'genero', 'esta_publico']
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Todas las combinaciones de servicio y tags se cruzan juntas en un solo bitset
+        condiciones = {}
+        for nombre in ('servicio', 'tags'):
+            valor = self.form.cleaned_data.get(nombre)
+            if valor and bitmaps.es_combinacion(valor):
+                condiciones[self.filters[nombre].dimension] = bitmaps.parsear(valor)
+        if condiciones:
+            queryset = bitmaps.filtrar(queryset, condiciones)
+        return queryset
+
+
+class PerfilSearchFilter(filters.SearchFilter):
+    """
+    ?search=... usando el backend de búsqueda activo (perfiles.search:
+    tsvector en PostgreSQL, FTS5 en SQLite, icontains como último recurso),
+    ordenado por relevancia.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termino = request.query_params.get(self.search_param, '').strip()
+        if not termino:
+            return queryset
+        return get_backend().buscar(queryset, termino)
+
+
+class PerfilOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter que siempre desempata por -id: un orden total hace que la paginación
+    (por página o keyset) no repita ni salte perfiles con el mismo likes_count u orden_rotacion.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not any(campo.lstrip('-') in ('id', 'pk') for campo in ordering):
+            ordering = [*ordering, '-id']
+        return ordering
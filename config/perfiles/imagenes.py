@@ -0,0 +1,256 @@
+# imagenes.py
+"""
+Procesamiento de las fotos subidas (foto_perfil, foto_portada, galería) fuera del request.
+
+El save() del modelo guarda el archivo tal cual llegó y marca su estado como
+'pendiente'; la compresión a WebP y la escritura final en el storage las hace
+procesar(), según settings.PERFILES_IMAGENES_MODO:
+    sincrono  dentro del request, justo después de guardar (por defecto: no necesita nada más)
+    hilo      en un pool de hilos del mismo proceso, tras el commit
+    worker    nada en el proceso web: `manage.py procesar_imagenes` toma las pendientes
+
+Cada foto se guarda en varios anchos (ANCHOS_VARIANTES, hasta el máximo de su campo),
+decodificándola una sola vez. El campo de imagen queda con la variante más grande y
+el manifiesto <campo>_variantes con todas: {"320": "ruta_320.webp", ...}.
+
+Mientras el estado no es 'lista' los serializers devuelven la URL en null (placeholder).
+`procesar_imagenes --una-vez` también sirve de red de seguridad para el modo hilo: las
+que quedaron en 'procesando' más de PERFILES_IMAGENES_TIMEOUT segundos (el proceso
+murió a mitad) vuelven a 'pendiente' según <estado>_desde.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import versiones
+from .utils import generar_variantes
+
+logger = logging.getLogger('xscort')
+
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+LISTA = 'lista'
+ERROR = 'error'
+
+# (modelo, campo) -> (campo de estado, campo del manifiesto, ancho máximo)
+IMAGENES = {
+    ('PerfilModelo', 'foto_perfil'): ('foto_perfil_estado', 'foto_perfil_variantes', 800),
+    ('PerfilModelo', 'foto_portada'): ('foto_portada_estado', 'foto_portada_variantes', 1200),
+    ('GaleriaFoto', 'imagen'): ('imagen_estado', 'imagen_variantes', 1200),
+}
+
+# Anchos de las variantes (el máximo de cada campo se agrega siempre)
+ANCHOS_VARIANTES = (320, 640, 1200)
+
+
+def campos_de(modelo):
+    """[(campo, campo de estado, campo del manifiesto), ...] de un modelo."""
+    return [
+        (campo, estado, variantes)
+        for (nombre, campo), (estado, variantes, _) in IMAGENES.items() if nombre == modelo
+    ]
+
+
+def anchos_de(modelo, campo):
+    maximo = IMAGENES[(modelo, campo)][2]
+    return sorted({ancho for ancho in ANCHOS_VARIANTES if ancho < maximo} | {maximo})
+
+
+def _modo():
+    return settings.PERFILES_IMAGENES_MODO
+
+
+def desde(estado):
+    """Campo con el momento en que la imagen entró a 'procesando'."""
+    return f'{estado}_desde'
+
+
+def subidas(instancia):
+    """
+    Campos con un archivo recién asignado (todavía no escrito en el storage). Una instancia
+    vieja con la foto cruda en memoria no cuenta: esa foto ya está guardada.
+    """
+    campos = []
+    for campo, _, _ in campos_de(type(instancia).__name__):
+        # Desde __dict__ para no disparar la carga de un campo diferido. Ahí queda el nombre
+        # (str) o un FieldFile si vino de la BD, y el archivo tal cual si se acaba de asignar
+        archivo = instancia.__dict__.get(campo)
+        if archivo and not isinstance(archivo, str) and not getattr(archivo, '_committed', False):
+            campos.append(campo)
+    return campos
+
+
+def preparar(instancia, campos):
+    """Llamado en save() con los campos de imagen nuevos, antes de escribir la fila."""
+    for campo, estado, variantes in campos_de(type(instancia).__name__):
+        if campo in campos:
+            setattr(instancia, estado, PENDIENTE)
+        if campo in campos or (campo in instancia.__dict__ and not instancia.__dict__[campo]):
+            setattr(instancia, variantes, {})
+
+
+def encolar(instancia, campos):
+    """Llamado en save() tras escribir la fila: procesa ahora (sincrono) o al confirmar (hilo)."""
+    if not campos:
+        return
+    modelo = type(instancia).__name__
+    tareas = [(modelo, instancia.pk, campo) for campo in campos]
+    if _modo() == 'hilo':
+        transaction.on_commit(lambda: _pool().submit(_procesar_en_hilo, tareas))
+    elif _modo() == 'sincrono':
+        for tarea in tareas:
+            procesar(*tarea)
+        instancia.refresh_from_db(fields=[nombre for campo in campos for nombre in (campo, *IMAGENES[(modelo, campo)][:2])])
+        if hasattr(instancia, 'recordar_originales'):
+            instancia.recordar_originales()
+
+
+_memo = {'pool': None}
+
+
+def _pool():
+    if _memo['pool'] is None:
+        _memo['pool'] = ThreadPoolExecutor(
+            max_workers=settings.PERFILES_IMAGENES_HILOS, thread_name_prefix='imagenes',
+        )
+    return _memo['pool']
+
+
+def _procesar_en_hilo(tareas):
+    try:
+        for tarea in tareas:
+            procesar(*tarea)
+    finally:
+        close_old_connections()
+
+
+def _perfil_id(modelo, pk):
+    if modelo == 'PerfilModelo':
+        return pk
+    return apps.get_model('perfiles', modelo).objects.values_list('perfil_modelo_id', flat=True).get(pk=pk)
+
+
+def procesar(modelo, pk, campo):
+    """
+    Genera las variantes de la imagen cruda, las guarda y borra la original.
+    Retorna True si la dejó lista. Se puede llamar varias veces: solo una la toma.
+    """
+    from . import archivos  # Import diferido: perfiles.archivos importa los modelos
+
+    Modelo = apps.get_model('perfiles', modelo)
+    estado, campo_variantes, _ = IMAGENES[(modelo, campo)]
+
+    # Tomarla con un UPDATE condicional: hilos y workers concurrentes no la procesan dos veces
+    tomada = Modelo.objects.filter(pk=pk, **{estado: PENDIENTE}).update(
+        **{estado: PROCESANDO, desde(estado): timezone.now()}
+    )
+    if not tomada:
+        return False
+
+    archivo = getattr(Modelo.objects.only('pk', campo).get(pk=pk), campo)
+    original = archivo.name
+    storage = archivo.storage
+    variantes = []
+    try:
+        with archivo.open('rb'):
+            variantes = generar_variantes(archivo, anchos_de(modelo, campo))
+        with transaction.atomic():
+            # Cada variante se guarda por su hash (perfiles.archivos): las repetidas no se reescriben
+            guardados = {ancho: archivos.guardar(contenido, storage) for ancho, contenido in variantes}
+            manifiesto = {str(ancho): guardado.nombre for ancho, guardado in guardados.items()}
+            # El campo queda con la variante más grande. Si mientras tanto se subió otra foto, esta ya no sirve
+            actualizadas = Modelo.objects.filter(pk=pk, **{campo: original}).update(
+                **{campo: manifiesto[str(max(guardados))], estado: LISTA, campo_variantes: manifiesto}
+            )
+            sin_uso = set(guardado.pk for guardado in guardados.values())
+            if actualizadas:
+                sin_uso = archivos.asignar(modelo, pk, campo, guardados.values())
+    except Exception:
+        logger.exception("Error procesando imagen", extra={'modelo': modelo, 'pk': pk, 'campo': campo})
+        Modelo.objects.filter(pk=pk, **{campo: original}).update(**{estado: ERROR})
+        return False
+    finally:
+        # Libera los temporales de las variantes (perfiles.utils._a_webp)
+        for _, contenido in variantes:
+            contenido.close()
+
+    # Los archivos de la foto anterior (o los de esta, si llegó tarde) quedan sin uso
+    archivos.recolectar(sin_uso, storage)
+    if not actualizadas:
+        return False
+    if not archivos.es_direccionado(original):
+        storage.delete(original)
+    versiones.invalidar('perfiles', versiones.grupo_perfil(_perfil_id(modelo, pk)))
+    return True
+
+
+def quitar(instancia, campos):
+    """Fotos quitadas o filas borradas: suelta sus archivos al confirmar la transacción."""
+    from . import archivos
+
+    modelo = type(instancia).__name__
+    objeto_id = instancia.pk  # Tras un delete() la instancia queda sin pk
+    for campo in campos:
+        storage = instancia._meta.get_field(campo).storage
+        transaction.on_commit(
+            lambda campo=campo, storage=storage: archivos.liberar(modelo, objeto_id, campo, storage)
+        )
+
+
+def reclamar_trabadas(segundos=None):
+    """Vuelve a 'pendiente' las que llevan en 'procesando' más de `segundos` (el proceso murió a mitad)."""
+    limite = timezone.now() - timedelta(seconds=segundos if segundos is not None else settings.PERFILES_IMAGENES_TIMEOUT)
+    total = 0
+    for (modelo, _), (estado, _, _) in IMAGENES.items():
+        Modelo = apps.get_model('perfiles', modelo)
+        # Sin marca de tiempo: tomadas antes de que existiera el campo
+        vencidas = Q(**{f'{desde(estado)}__lt': limite}) | Q(**{f'{desde(estado)}__isnull': True})
+        total += Modelo.objects.filter(vencidas, **{estado: PROCESANDO}).update(**{estado: PENDIENTE})
+    return total
+
+
+def procesar_pendientes(lote=50):
+    """Procesa hasta `lote` imágenes pendientes de cada campo. Retorna cuántas quedaron listas."""
+    reclamar_trabadas()
+    listas = 0
+    for (modelo, campo), (estado, _, _) in IMAGENES.items():
+        Modelo = apps.get_model('perfiles', modelo)
+        ids = Modelo.objects.filter(**{estado: PENDIENTE}).order_by('pk').values_list('pk', flat=True)[:lote]
+        listas += sum(procesar(modelo, pk, campo) for pk in list(ids))
+    return listas
+
+
+def reintentar(estados=(PROCESANDO, ERROR)):
+    """Devuelve a 'pendiente' las imágenes trabadas (p. ej. el proceso murió a mitad) o con error."""
+    total = 0
+    for (modelo, _), (estado, _, _) in IMAGENES.items():
+        Modelo = apps.get_model('perfiles', modelo)
+        total += Modelo.objects.filter(**{f'{estado}__in': estados}).update(**{estado: PENDIENTE})
+    return total
+
+
+def regenerar_sin_variantes():
+    """Vuelve a 'pendiente' las imágenes listas que no tienen manifiesto (procesadas antes de las variantes)."""
+    total = 0
+    for (modelo, campo), (estado, variantes, _) in IMAGENES.items():
+        Modelo = apps.get_model('perfiles', modelo)
+        total += (
+            Modelo.objects.filter(**{estado: LISTA, variantes: {}})
+            .exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            .update(**{estado: PENDIENTE})
+        )
+    return total
+
+
+def srcset(storage, manifiesto):
+    """[{'ancho': 320, 'url': ...}, ...] de menor a mayor: lo que necesita un <img srcset>."""
+    return [
+        {'ancho': int(ancho), 'url': storage.url(nombre)}
+        for ancho, nombre in sorted(manifiesto.items(), key=lambda item: int(item[0]))
+    ]
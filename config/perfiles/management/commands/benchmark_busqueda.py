@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perfiles.models import Ciudad, PerfilModelo, Tag
+from perfiles.search import BACKENDS, get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara latencia y relevancia de los backends de búsqueda de perfiles '
+        'sobre la misma base de datos (ej: --backend fts5 --backend icontains)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', choices=sorted(BACKENDS),
+            help='Backend a medir (repetible). Por defecto: el activo e icontains',
+        )
+        parser.add_argument('--consulta', action='append', help='Término a buscar (repetible)')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--top', type=int, default=10, help='Resultados que se comparan por consulta')
+
+    def handle(self, *args, **options):
+        nombres = options['backend'] or [get_backend().nombre, 'icontains']
+        backends = [get_backend(nombre) for nombre in dict.fromkeys(nombres)]
+        consultas = options['consulta'] or self.consultas_de_muestra()
+        if not consultas:
+            raise CommandError('No hay perfiles para armar consultas de muestra; usa --consulta')
+
+        top = options['top']
+        base = PerfilModelo.objects.filter(esta_publico=True).order_by('-id')
+        resultados = {}
+
+        for backend in backends:
+            tiempos = []
+            for consulta in consultas:
+                ids = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    ids = list(backend.buscar(base, consulta).values_list('id', flat=True)[:top])
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                resultados[(backend.nombre, consulta)] = ids
+
+            tiempos.sort()
+            p95 = tiempos[int(len(tiempos) * 0.95) - 1] if len(tiempos) >= 20 else tiempos[-1]
+            self.stdout.write(
+                f'{backend.nombre:<10} p50={statistics.median(tiempos):.2f}ms '
+                f'p95={p95:.2f}ms max={tiempos[-1]:.2f}ms ({len(tiempos)} búsquedas)'
+            )
+
+        # Relevancia: solapamiento del top-N de cada backend contra el primero
+        referencia = backends[0].nombre
+        self.stdout.write('')
+        for consulta in consultas:
+            esperados = set(resultados[(referencia, consulta)])
+            linea = [f'{consulta!r}: {referencia}={len(esperados)}']
+            for backend in backends[1:]:
+                obtenidos = set(resultados[(backend.nombre, consulta)])
+                union = esperados | obtenidos
+                jaccard = len(esperados & obtenidos) / len(union) if union else 1.0
+                linea.append(f'{backend.nombre}={len(obtenidos)} (jaccard {jaccard:.2f})')
+            self.stdout.write('  '.join(linea))
+
+        self.stdout.write(self.style.SUCCESS(f'{len(consultas)} consultas medidas en {len(backends)} backends'))
+
+    def consultas_de_muestra(self):
+        """Un nombre, una ciudad y un tag reales, más un prefijo y una búsqueda sin acento."""
+        consultas = []
+        nombre = PerfilModelo.objects.values_list('nombre_artistico', flat=True).order_by('?').first()
+        if nombre:
+            consultas += [nombre, nombre[:4]]
+        ciudad = Ciudad.objects.filter(perfiles__isnull=False).values_list('nombre', flat=True).first()
+        if ciudad:
+            consultas.append(ciudad.lower())
+        tag = Tag.objects.filter(perfiles__isnull=False).values_list('nombre', flat=True).first()
+        if tag:
+            consultas.append(tag)
+        return consultas
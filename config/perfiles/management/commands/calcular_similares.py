@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from perfiles import similares
+from perfiles.models import Ciudad
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los perfiles similares (PerfilSimilar) de todas las ciudades o de una'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ciudad', help='Slug de la ciudad a recalcular')
+
+    def handle(self, *args, **options):
+        if options['ciudad']:
+            ciudad = Ciudad.objects.filter(slug=options['ciudad']).first()
+            if ciudad is None:
+                raise CommandError(f'No existe la ciudad "{options["ciudad"]}"')
+            total = similares.calcular_ciudad(ciudad.pk)
+        else:
+            total = similares.calcular_todo()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Perfiles similares calculados para {total} perfiles')
+        )
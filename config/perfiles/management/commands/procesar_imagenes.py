@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from perfiles import imagenes
+
+
+class Command(BaseCommand):
+    help = (
+        'Comprime las fotos subidas que quedaron pendientes (PERFILES_IMAGENES_MODO=worker). '
+        'Corre en bucle; con --una-vez procesa lo pendiente y termina (sirve desde cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50)
+        parser.add_argument('--intervalo', type=float, default=2, help='Segundos de espera cuando no hay pendientes')
+        parser.add_argument('--una-vez', action='store_true')
+        parser.add_argument(
+            '--reintentar', action='store_true',
+            help="Antes de empezar, vuelve a 'pendiente' las imágenes en 'procesando' o con error",
+        )
+        parser.add_argument(
+            '--regenerar-variantes', action='store_true',
+            help='Antes de empezar, encola las imágenes listas sin manifiesto de variantes (subidas antes de las variantes)',
+        )
+
+    def handle(self, *args, **options):
+        if options['reintentar']:
+            self.stdout.write(f'{imagenes.reintentar()} imágenes vueltas a pendiente')
+        if options['regenerar_variantes']:
+            self.stdout.write(f'{imagenes.regenerar_sin_variantes()} imágenes encoladas para generar variantes')
+
+        total = 0
+        while True:
+            listas = imagenes.procesar_pendientes(lote=options['lote'])
+            total += listas
+            if listas:
+                continue
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f'Se procesaron {total} imágenes'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from perfiles import contadores
+from perfiles.models import PerfilModelo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula likes_count, resenas_aprobadas_count y rating_promedio de todos los perfiles, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Perfiles por UPDATE')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        total = 0
+        ultimo = 0
+        while True:
+            # Recorrido por pk (keyset) para no cargar todos los ids en memoria
+            ids = list(
+                PerfilModelo.objects.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote]
+            )
+            if not ids:
+                break
+            total += contadores.recalcular(PerfilModelo.objects.filter(pk__in=ids))
+            ultimo = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Se recalcularon los contadores de {total} perfiles')
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from perfiles import ranking, versiones
+from perfiles.models import PerfilModelo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula ranking_score de todos los perfiles, por lotes (la recencia decae con el tiempo: correr a diario)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Perfiles por bulk_update')
+
+    def handle(self, *args, **options):
+        total = ranking.recalcular(PerfilModelo.objects.all(), lote=options['lote'])
+        versiones.invalidar('perfiles')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Se recalculó el ranking de {total} perfiles')
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from perfiles import visibilidad
+from perfiles.models import PerfilModelo
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula PerfilModelo.esta_visible. Por defecto solo revisa los perfiles visibles '
+        '(barrido periódico de suscripciones vencidas); --todos revisa el catálogo completo por lotes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Revisar también los perfiles ocultos')
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        base = PerfilModelo.objects.all() if options['todos'] else PerfilModelo.objects.filter(esta_visible=True)
+        lote = options['lote']
+        cambiados = 0
+        ultimo = 0
+        while True:
+            ids = list(base.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote])
+            if not ids:
+                break
+            cambiados += len(visibilidad.recalcular(PerfilModelo.objects.filter(pk__in=ids)))
+            ultimo = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Se actualizó la visibilidad de {cambiados} perfiles')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from perfiles import facetas
+from perfiles.models import ConteoFaceta
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero los conteos de facetas del catálogo (ConteoFaceta)'
+
+    def handle(self, *args, **options):
+        facetas.reconstruir()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Facetas reconstruidas: {ConteoFaceta.objects.count()} conteos')
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from perfiles.search import BACKENDS, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de perfiles (tsvector en PostgreSQL, FTS5 en SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=sorted(BACKENDS), help='Por defecto, el backend activo')
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['backend'])
+        backend.reconstruir()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Índice de búsqueda "{backend.nombre}" reconstruido')
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from perfiles import rotacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-sortea PerfilModelo.orden_rotacion (?ordering=orden_rotacion) con un solo UPDATE. '
+        'Pensado para correr cada hora: los cursores abiertos siguen sobre la clave anterior '
+        'hasta el próximo sorteo (perfiles.rotacion)'
+    )
+
+    def handle(self, *args, **options):
+        total = rotacion.rotar()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Orden de rotación re-sorteado para {total} perfiles')
+        )
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:46
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Solo PostgreSQL: configuración de texto español sin acentos + índice GIN.
+# En SQLite la columna queda sin uso (ver perfiles.search).
+SQL_CREAR = """
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+CREATE INDEX IF NOT EXISTS perfiles_perfil_search_gin
+    ON perfiles_perfilmodelo USING GIN (search_vector);
+"""
+
+# Copia congelada de perfiles.search.PostgresBusqueda.SQL_ACTUALIZAR: la migración
+# no debe depender del código de la app, que puede cambiar después.
+SQL_POBLAR = """
+UPDATE perfiles_perfilmodelo AS p SET search_vector =
+    setweight(to_tsvector('es_unaccent', coalesce(p.nombre_artistico, '')), 'A')
+    || setweight(to_tsvector('es_unaccent', coalesce(c.nombre, '')), 'B')
+    || setweight(to_tsvector('es_unaccent', coalesce((
+        SELECT string_agg(t.nombre, ' ')
+        FROM perfiles_perfilmodelo_tags pt
+        JOIN perfiles_tag t ON t.id = pt.tag_id
+        WHERE pt.perfilmodelo_id = p.id
+    ), '')), 'B')
+    || setweight(to_tsvector('es_unaccent', coalesce(p.biografia, '')), 'C')
+FROM perfiles_ciudad AS c
+WHERE c.id = p.ciudad_id
+"""
+
+SQL_ELIMINAR = """
+DROP INDEX IF EXISTS perfiles_perfil_search_gin;
+DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent;
+"""
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SQL_CREAR)
+    schema_editor.execute(SQL_POBLAR)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SQL_ELIMINAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0003_remove_perfilmodelo_tarifa_desde'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
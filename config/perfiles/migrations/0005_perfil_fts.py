@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:20
+
+from django.db import migrations
+
+
+# Solo SQLite: tabla virtual FTS5 usada por perfiles.search.Fts5Busqueda.
+# rowid = id del perfil; unicode61 sin diacríticos equivale al unaccent de PostgreSQL.
+SQL_CREAR = """
+CREATE VIRTUAL TABLE IF NOT EXISTS perfiles_perfil_fts USING fts5(
+    nombre, ciudad, tags, biografia,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Copia congelada de perfiles.search.Fts5Busqueda.SQL_INSERTAR
+SQL_POBLAR = """
+INSERT INTO perfiles_perfil_fts (rowid, nombre, ciudad, tags, biografia)
+SELECT p.id, p.nombre_artistico, c.nombre,
+    coalesce((
+        SELECT group_concat(t.nombre, ' ')
+        FROM perfiles_perfilmodelo_tags pt
+        JOIN perfiles_tag t ON t.id = pt.tag_id
+        WHERE pt.perfilmodelo_id = p.id
+    ), ''),
+    coalesce(p.biografia, '')
+FROM perfiles_perfilmodelo AS p
+JOIN perfiles_ciudad AS c ON c.id = p.ciudad_id
+"""
+
+
+def crear_tabla_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(SQL_CREAR)
+    schema_editor.execute(SQL_POBLAR)
+
+
+def eliminar_tabla_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS perfiles_perfil_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0004_perfilmodelo_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla_fts, eliminar_tabla_fts),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:05
+
+from django.db import migrations
+
+
+# Solo PostgreSQL: índice de trigramas para el autocompletado de nombres (operador <%).
+SQL_CREAR = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS perfiles_perfil_nombre_trgm
+    ON perfiles_perfilmodelo USING GIN (nombre_artistico gin_trgm_ops);
+"""
+
+SQL_ELIMINAR = "DROP INDEX IF EXISTS perfiles_perfil_nombre_trgm;"
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_CREAR)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SQL_ELIMINAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0005_perfil_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
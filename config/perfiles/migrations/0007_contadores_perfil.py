@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:51
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def _agregado(queryset, expresion):
+    return Subquery(queryset.order_by().values('perfil_modelo').annotate(valor=expresion).values('valor'))
+
+
+def poblar_contadores(apps, schema_editor):
+    PerfilModelo = apps.get_model('perfiles', 'PerfilModelo')
+    PerfilLike = apps.get_model('perfiles', 'PerfilLike')
+    Resena = apps.get_model('reviews', 'Resena')
+
+    likes = PerfilLike.objects.filter(perfil_modelo=OuterRef('pk'))
+    resenas = Resena.objects.filter(perfil_modelo=OuterRef('pk'), aprobada=True)
+    decimal = models.DecimalField(max_digits=3, decimal_places=2)
+    PerfilModelo.objects.update(
+        likes_count=Coalesce(_agregado(likes, Count('pk')), Value(0)),
+        resenas_aprobadas_count=Coalesce(_agregado(resenas, Count('pk')), Value(0)),
+        rating_promedio=Coalesce(
+            Cast(_agregado(resenas, Avg('rating')), decimal),
+            Value(Decimal('0'), output_field=decimal),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0006_perfil_nombre_trgm'),
+        ('reviews', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='rating_promedio',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='resenas_aprobadas_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(fields=['-likes_count', '-id'], name='perfil_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(fields=['-rating_promedio', '-id'], name='perfil_rating_idx'),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
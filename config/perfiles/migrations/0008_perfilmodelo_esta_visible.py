@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:53
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def poblar_visibilidad(apps, schema_editor):
+    # Equivale a las reglas por defecto (sin exigir verificación ni suscripción).
+    # Si se activan en settings: python manage.py recalcular_visibilidad --todos
+    PerfilModelo = apps.get_model('perfiles', 'PerfilModelo')
+    PerfilModelo.objects.update(esta_visible=F('esta_publico'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0007_contadores_perfil'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='esta_visible',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(poblar_visibilidad, migrations.RunPython.noop),
+    ]
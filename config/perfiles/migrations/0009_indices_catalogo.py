@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0008_perfilmodelo_esta_visible'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['-id'], name='perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', '-id'], name='perfil_visible_ciudad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['genero', '-id'], name='perfil_visible_genero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', 'genero', '-id'], name='perfil_visible_ciu_gen_idx'),
+        ),
+    ]
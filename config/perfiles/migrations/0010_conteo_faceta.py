@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_facetas(apps, schema_editor):
+    # Misma lógica que perfiles.facetas.reconstruir(), con los modelos históricos
+    PerfilModelo = apps.get_model('perfiles', 'PerfilModelo')
+    ConteoFaceta = apps.get_model('perfiles', 'ConteoFaceta')
+    conteos = []
+    visibles = PerfilModelo.objects.filter(esta_visible=True)
+    for fila in visibles.values('ciudad_id', 'ciudad__slug').annotate(total=Count('pk')).order_by():
+        conteos.append((fila['ciudad_id'], 'ciudad', fila['ciudad__slug'], fila['total']))
+    for fila in visibles.values('ciudad_id', 'genero').annotate(total=Count('pk')).order_by():
+        conteos.append((fila['ciudad_id'], 'genero', fila['genero'], fila['total']))
+    for dimension, through, campo in [
+        ('servicio', PerfilModelo.servicios.through, 'servicio__slug'),
+        ('tag', PerfilModelo.tags.through, 'tag__slug'),
+    ]:
+        filas = (
+            through.objects.filter(perfilmodelo__esta_visible=True)
+            .values('perfilmodelo__ciudad_id', campo).annotate(total=Count('pk')).order_by()
+        )
+        conteos += [(f['perfilmodelo__ciudad_id'], dimension, f[campo], f['total']) for f in filas]
+
+    ConteoFaceta.objects.bulk_create(
+        ConteoFaceta(ciudad_id=ciudad_id, dimension=dimension, valor=valor, total=total)
+        for ciudad_id, dimension, valor, total in conteos
+    )
+    globales = ConteoFaceta.objects.values('dimension', 'valor').annotate(suma=Sum('total')).order_by()
+    ConteoFaceta.objects.bulk_create(
+        ConteoFaceta(ciudad_id=None, dimension=f['dimension'], valor=f['valor'], total=f['suma'])
+        for f in list(globales)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0009_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoFaceta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('ciudad', 'Ciudad'), ('genero', 'Género'), ('servicio', 'Servicio'), ('tag', 'Tag')], max_length=10)),
+                ('valor', models.CharField(help_text='Slug (ciudad, servicio, tag) o código de género', max_length=100)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('ciudad', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facetas', to='perfiles.ciudad')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('ciudad__isnull', False)), fields=('ciudad', 'dimension', 'valor'), name='faceta_por_ciudad_unica'), models.UniqueConstraint(condition=models.Q(('ciudad__isnull', True)), fields=('dimension', 'valor'), name='faceta_global_unica')],
+            },
+        ),
+        migrations.RunPython(poblar_facetas, migrations.RunPython.noop),
+    ]
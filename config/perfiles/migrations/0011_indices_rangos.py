@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0010_conteo_faceta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', 'genero', 'edad'], name='perfil_visible_ciu_gen_edad'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', 'edad'], name='perfil_visible_ciu_edad_idx'),
+        ),
+    ]
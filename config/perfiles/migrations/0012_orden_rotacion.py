@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:09
+
+import perfiles.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import IntegerField
+from django.db.models.functions import Cast, Random
+
+
+def sortear_existentes(apps, schema_editor):
+    # AddField evalúa el default una sola vez: todas las filas quedan con el mismo valor
+    PerfilModelo = apps.get_model('perfiles', 'PerfilModelo')
+    PerfilModelo.objects.update(orden_rotacion=Cast(Random() * (2 ** 31 - 1), IntegerField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0011_indices_rangos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='orden_rotacion',
+            field=models.PositiveIntegerField(default=perfiles.models.orden_rotacion_aleatorio, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['orden_rotacion', 'id'], name='perfil_rotacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', 'orden_rotacion', 'id'], name='perfil_ciudad_rotacion_idx'),
+        ),
+        migrations.RunPython(sortear_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Sin backfill: después de migrar, `python manage.py recalcular_ranking` (usa perfiles.ranking)
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0012_orden_rotacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='ranking_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['-ranking_score', '-id'], name='perfil_ranking_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0013_ranking_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('perfil', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similares', to='perfiles.perfilmodelo')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_de', to='perfiles.perfilmodelo')),
+            ],
+            options={
+                'ordering': ['perfil', 'posicion'],
+                'constraints': [models.UniqueConstraint(fields=('perfil', 'posicion'), name='perfil_similar_posicion_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0014_perfil_similar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galeriafoto',
+            name='imagen_estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_perfil_estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_portada_estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('lista', 'Lista'), ('error', 'Error')], default='lista', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='galeriafoto',
+            index=models.Index(condition=models.Q(('imagen_estado', 'pendiente')), fields=['id'], name='galeria_imagen_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('foto_perfil_estado', 'pendiente'), ('foto_portada_estado', 'pendiente'), _connector='OR'), fields=['id'], name='perfil_imagen_pendiente_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:23
+
+from django.db import migrations, models
+
+
+# Sin backfill: después de migrar, `python manage.py procesar_imagenes --una-vez --regenerar-variantes`
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0015_estado_imagenes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galeriafoto',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_perfil_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_portada_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:25
+
+import perfiles.models
+import perfiles.utils
+import usuarios.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0016_variantes_imagenes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='galeriafoto',
+            name='imagen',
+            field=models.ImageField(upload_to=perfiles.models.ruta_galeria, validators=[usuarios.models.validate_image_file, perfiles.utils.validar_pixeles]),
+        ),
+        migrations.AlterField(
+            model_name='perfilmodelo',
+            name='foto_perfil',
+            field=models.ImageField(blank=True, null=True, upload_to=perfiles.models.ruta_foto_perfil, validators=[usuarios.models.validate_image_file, perfiles.utils.validar_pixeles]),
+        ),
+        migrations.AlterField(
+            model_name='perfilmodelo',
+            name='foto_portada',
+            field=models.ImageField(blank=True, null=True, upload_to=perfiles.models.ruta_foto_perfil, validators=[usuarios.models.validate_image_file, perfiles.utils.validar_pixeles]),
+        ),
+    ]
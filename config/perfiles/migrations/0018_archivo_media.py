@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0017_validar_pixeles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReferenciaMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('campo', models.CharField(max_length=30)),
+                ('archivo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='referencias', to='perfiles.archivomedia')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['modelo', 'objeto_id', 'campo'], name='referencia_media_foto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('archivo', 'modelo', 'objeto_id', 'campo'), name='referencia_media_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0018_archivo_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galeriafoto',
+            name='imagen_estado_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_perfil_estado_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='foto_portada_estado_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
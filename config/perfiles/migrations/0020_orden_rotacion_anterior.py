@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:55
+
+import perfiles.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_vigente(apps, schema_editor):
+    # AddField evalúa el default una sola vez: se parte con la clave vigente
+    PerfilModelo = apps.get_model('perfiles', 'PerfilModelo')
+    PerfilModelo.objects.update(orden_rotacion_anterior=F('orden_rotacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0019_imagen_estado_desde'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilmodelo',
+            name='orden_rotacion_anterior',
+            field=models.PositiveIntegerField(default=perfiles.models.orden_rotacion_aleatorio, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['orden_rotacion_anterior', 'id'], name='perfil_rotacion_ant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilmodelo',
+            index=models.Index(condition=models.Q(('esta_visible', True)), fields=['ciudad', 'orden_rotacion_anterior', 'id'], name='perfil_ciudad_rotacion_ant_idx'),
+        ),
+        migrations.RunPython(copiar_vigente, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfiles', '0020_orden_rotacion_anterior'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpocaRotacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actual', models.PositiveIntegerField(default=0)),
+                ('anterior', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -1,10 +1,31 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from usuarios.models import CustomUser, validate_image_file
+import random
 import uuid
-# Asegúrate de que utils.py esté en la misma carpeta, o ajusta el import
-from .utils import comprimir_imagen 
+from . import imagenes
+from .utils import validar_pixeles
+
+# Rango de PerfilModelo.orden_rotacion (int32 positivo)
+MAX_ORDEN_ROTACION = 2 ** 31 - 1
+
+
+def orden_rotacion_aleatorio():
+    return random.randint(0, MAX_ORDEN_ROTACION)
+
+
+# Estado del procesamiento de cada foto subida (perfiles.imagenes)
+ESTADO_IMAGEN_CHOICES = [
+    (imagenes.PENDIENTE, 'Pendiente'),
+    (imagenes.PROCESANDO, 'Procesando'),
+    (imagenes.LISTA, 'Lista'),
+    (imagenes.ERROR, 'Error'),
+]
+
 
 # --- Utilidades para rutas de archivos ---
 def ruta_foto_perfil(instance, filename):
@@ -77,6 +98,63 @@ class Tag(models.Model):
 
 # --- Modelo Principal ---
 
+class PerfilModeloQuerySet(models.QuerySet):
+
+    def con_datos_publicos(self, user=None):
+        """
+        Carga todo lo que necesita PerfilModeloSerializer en un número fijo de queries,
+        sin importar el tamaño de la página (sin N+1).
+        """
+        from reviews.models import Resena  # Import diferido: reviews depende de este módulo
+
+        queryset = self.select_related('ciudad').prefetch_related(
+            'tags',
+            'servicios',
+            Prefetch(
+                'galeria_fotos',
+                queryset=GaleriaFoto.objects.filter(es_publica=True, imagen_estado=imagenes.LISTA).order_by('orden', '-id'),
+                to_attr='galeria_publica',
+            ),
+            Prefetch(
+                'resenas',
+                queryset=Resena.objects.filter(aprobada=True).select_related('cliente'),
+                to_attr='resenas_aprobadas',
+            ),
+        )
+
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                liked_by_me_anotado=Exists(
+                    PerfilLike.objects.filter(perfil_modelo=OuterRef('pk'), user=user)
+                )
+            )
+        return queryset
+
+    def con_datos_tarjeta(self):
+        """
+        Versión liviana para la grilla del catálogo (PerfilModeloCardSerializer):
+        sin biografía, galería ni reseñas, solo contadores.
+        """
+        fotos = (
+            GaleriaFoto.objects.filter(perfil_modelo=OuterRef('pk'), es_publica=True, imagen_estado=imagenes.LISTA)
+            .order_by()
+            .values('perfil_modelo')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.select_related('ciudad').only(
+            'id', 'slug', 'nombre_artistico', 'edad', 'genero',
+            'foto_perfil', 'foto_portada', 'foto_perfil_estado', 'foto_portada_estado',
+            'foto_perfil_variantes', 'foto_portada_variantes', 'ciudad__nombre', 'ciudad__slug',
+            'likes_count', 'resenas_aprobadas_count', 'rating_promedio',
+            'orden_rotacion', 'orden_rotacion_anterior', 'ranking_score',  # Posición del cursor al ordenar por estos campos
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'nombre', 'slug').order_by('nombre')),
+        ).annotate(
+            fotos_total=Coalesce(Subquery(fotos), Value(0)),
+        )
+
+
 class PerfilModelo(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='perfil_modelo')
     slug = models.SlugField(max_length=150, unique=True, blank=True)
@@ -85,9 +163,17 @@ class PerfilModelo(models.Model):
     nombre_artistico = models.CharField(max_length=100)
     biografia = models.TextField(blank=True, null=True)
     
-    # Imágenes (Se comprimirán al guardar)
-    foto_perfil = models.ImageField(upload_to=ruta_foto_perfil, validators=[validate_image_file], blank=True, null=True)
-    foto_portada = models.ImageField(upload_to=ruta_foto_perfil, validators=[validate_image_file], blank=True, null=True)
+    # Imágenes (se guardan crudas y las comprime perfiles.imagenes fuera del request)
+    foto_perfil = models.ImageField(upload_to=ruta_foto_perfil, validators=[validate_image_file, validar_pixeles], blank=True, null=True)
+    foto_portada = models.ImageField(upload_to=ruta_foto_perfil, validators=[validate_image_file, validar_pixeles], blank=True, null=True)
+    foto_perfil_estado = models.CharField(max_length=10, choices=ESTADO_IMAGEN_CHOICES, default=imagenes.LISTA, editable=False)
+    foto_portada_estado = models.CharField(max_length=10, choices=ESTADO_IMAGEN_CHOICES, default=imagenes.LISTA, editable=False)
+    # Cuándo entró a 'procesando': procesar_imagenes retoma las abandonadas
+    foto_perfil_estado_desde = models.DateTimeField(null=True, blank=True, editable=False)
+    foto_portada_estado_desde = models.DateTimeField(null=True, blank=True, editable=False)
+    # Manifiestos {ancho: ruta} de las variantes WebP de cada foto (perfiles.imagenes)
+    foto_perfil_variantes = models.JSONField(default=dict, blank=True, editable=False)
+    foto_portada_variantes = models.JSONField(default=dict, blank=True, editable=False)
 
     # Ubicación y Contacto
     ciudad = models.ForeignKey(Ciudad, on_delete=models.PROTECT, related_name='perfiles')
@@ -109,42 +195,169 @@ class PerfilModelo(models.Model):
     servicios = models.ManyToManyField(Servicio, related_name='perfiles', blank=True)
     tags = models.ManyToManyField(Tag, related_name='perfiles', blank=True)
 
+    # Contadores denormalizados (mantenidos por perfiles.contadores; reparar con
+    # `manage.py recalcular_contadores`). Permiten ordenar por popularidad con un índice.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    resenas_aprobadas_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_promedio = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+
+    # Puntaje de calidad 0-100 para ?ordering=-ranking_score (perfiles.ranking;
+    # reconstruir con `manage.py recalcular_ranking`)
+    ranking_score = models.FloatField(default=0, editable=False)
+
+    # Clave aleatoria para ?ordering=orden_rotacion (exposición pareja de los perfiles).
+    # `manage.py rotar_catalogo` la re-sortea periódicamente; estable entre sorteos.
+    orden_rotacion = models.PositiveIntegerField(default=orden_rotacion_aleatorio, editable=False)
+    # Clave del sorteo previo: los cursores abiertos antes del último sorteo siguen sobre ella
+    orden_rotacion_anterior = models.PositiveIntegerField(default=orden_rotacion_aleatorio, editable=False)
+
     # Estados
     esta_publico = models.BooleanField(default=True)
+    # Publicado + reglas de negocio (verificación, suscripción). Lo mantiene perfiles.visibilidad
+    esta_visible = models.BooleanField(default=False, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Índice de búsqueda (PostgreSQL): tsvector ponderado, mantenido por perfiles.signals.
+    # El índice GIN se crea en la migración 0004 solo en PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PerfilModeloQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-likes_count', '-id'], name='perfil_likes_idx'),
+            models.Index(fields=['-rating_promedio', '-id'], name='perfil_rating_idx'),
+            # Índices parciales del catálogo público (WHERE esta_visible), alineados con las
+            # combinaciones de PerfilFilter y el orden por defecto (-id). Los cubre perfiles.tests.ExplainTests
+            models.Index(fields=['-id'], condition=models.Q(esta_visible=True), name='perfil_visible_idx'),
+            models.Index(fields=['ciudad', '-id'], condition=models.Q(esta_visible=True), name='perfil_visible_ciudad_idx'),
+            models.Index(fields=['genero', '-id'], condition=models.Q(esta_visible=True), name='perfil_visible_genero_idx'),
+            models.Index(
+                fields=['ciudad', 'genero', '-id'],
+                condition=models.Q(esta_visible=True),
+                name='perfil_visible_ciu_gen_idx',
+            ),
+            # Rangos de edad dentro de ciudad (+ género); altura y peso se filtran sobre esas filas
+            models.Index(
+                fields=['ciudad', 'genero', 'edad'],
+                condition=models.Q(esta_visible=True),
+                name='perfil_visible_ciu_gen_edad',
+            ),
+            models.Index(fields=['ciudad', 'edad'], condition=models.Q(esta_visible=True), name='perfil_visible_ciu_edad_idx'),
+            models.Index(fields=['-ranking_score', '-id'], condition=models.Q(esta_visible=True), name='perfil_ranking_idx'),
+            # Orden de rotación (con id como desempate) para el catálogo y por ciudad
+            models.Index(fields=['orden_rotacion', 'id'], condition=models.Q(esta_visible=True), name='perfil_rotacion_idx'),
+            models.Index(
+                fields=['ciudad', 'orden_rotacion', 'id'],
+                condition=models.Q(esta_visible=True),
+                name='perfil_ciudad_rotacion_idx',
+            ),
+            models.Index(fields=['orden_rotacion_anterior', 'id'], condition=models.Q(esta_visible=True), name='perfil_rotacion_ant_idx'),
+            models.Index(
+                fields=['ciudad', 'orden_rotacion_anterior', 'id'],
+                condition=models.Q(esta_visible=True),
+                name='perfil_ciudad_rotacion_ant_idx',
+            ),
+            # Cola de `manage.py procesar_imagenes`
+            models.Index(
+                fields=['id'],
+                condition=models.Q(foto_perfil_estado='pendiente') | models.Q(foto_portada_estado='pendiente'),
+                name='perfil_imagen_pendiente_idx',
+            ),
+        ]
+
+    # Campos que se mantienen con UPDATE directos (contadores, visibilidad, búsqueda, ranking,
+    # procesamiento de fotos): un save() completo de una instancia vieja no debe pisarlos
+    CAMPOS_DERIVADOS = (
+        'likes_count', 'resenas_aprobadas_count', 'rating_promedio',
+        'esta_visible', 'search_vector', 'orden_rotacion', 'orden_rotacion_anterior', 'ranking_score',
+        'foto_perfil_estado_desde', 'foto_portada_estado_desde',
+    )
+
+    # Valores con que se cargó la fila (seguimiento de cambios en memoria, sin releerla):
+    # perfiles.facetas necesita la ciudad y el género anteriores, y save() no reescribe
+    # las fotos que no cambiaron
+    CAMPOS_ORIGINALES = ('ciudad_id', 'genero', 'foto_perfil', 'foto_portada')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.recordar_originales()
+        return instance
+
+    def recordar_originales(self):
+        # Solo los campos cargados (no los diferidos); las fotos se recuerdan por nombre de archivo
+        self._originales = {
+            campo: getattr(self.__dict__[campo], 'name', self.__dict__[campo])
+            for campo in self.CAMPOS_ORIGINALES if campo in self.__dict__
+        }
+
+    def campos_modificados(self):
+        """Los CAMPOS_ORIGINALES conocidos que cambiaron desde que se cargó o guardó la instancia."""
+        modificados = set()
+        for campo, original in getattr(self, '_originales', {}).items():
+            actual = self.__dict__.get(campo)
+            if (getattr(actual, 'name', actual) or None) != (original or None):
+                modificados.add(campo)
+        return modificados
+
+    def generar_slug(self):
+        # Una sola query trae los slugs que empiezan igual; el sufijo se elige en memoria
+        base = slugify(f"{self.nombre_artistico}-{self.ciudad.nombre}")
+        ocupados = set(
+            PerfilModelo.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list('slug', flat=True)
+        )
+        slug = base
+        while slug in ocupados:
+            slug = f"{base}-{uuid.uuid4().hex[:4]}"
+        return slug
+
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+
         # 1. Generación de Slug
         if not self.slug and self.nombre_artistico:
-            base = f"{self.nombre_artistico}-{self.ciudad.nombre}"
-            self.slug = slugify(base)
-            if PerfilModelo.objects.filter(slug=self.slug).exists():
-                self.slug = f"{self.slug}-{uuid.uuid4().hex[:4]}"
-
-        # 2. Compresión de Imágenes (WebP)
-        # Verificamos si es una actualización para no recomprimir lo que no cambió
-        if self.pk:
-            try:
-                old_instance = PerfilModelo.objects.get(pk=self.pk)
-                
-                # Foto Perfil (Max 800px ancho es suficiente)
-                if self.foto_perfil and self.foto_perfil != old_instance.foto_perfil:
-                    self.foto_perfil = comprimir_imagen(self.foto_perfil, max_width=800)
-                
-                # Foto Portada (Max 1200px o 1600px ancho)
-                if self.foto_portada and self.foto_portada != old_instance.foto_portada:
-                    self.foto_portada = comprimir_imagen(self.foto_portada, max_width=1200)
-            except PerfilModelo.DoesNotExist:
-                pass # Caso raro, se comporta como creación
-        else:
-            # Creación nueva
-            if self.foto_perfil:
-                self.foto_perfil = comprimir_imagen(self.foto_perfil, max_width=800)
-            if self.foto_portada:
-                self.foto_portada = comprimir_imagen(self.foto_portada, max_width=1200)
-
+            self.slug = self.generar_slug()
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'slug'}
+
+        # 2. Imágenes nuevas: se guardan crudas y quedan pendientes (perfiles.imagenes).
+        # Con update_fields solo cuentan las fotos incluidas
+        nuevas = [
+            campo for campo in imagenes.subidas(self)
+            if update_fields is None or campo in update_fields
+        ]
+        imagenes.preparar(self, nuevas)
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields,
+                *(nombre for campo, *derivados in imagenes.campos_de('PerfilModelo') if campo in update_fields
+                  for nombre in derivados),
+            }
+
+        # Fotos quitadas: sus archivos se sueltan tras guardar (perfiles.archivos)
+        modificados = self.campos_modificados()
+        quitadas = [
+            campo for campo, _, _ in imagenes.campos_de('PerfilModelo')
+            if campo in modificados and not self.__dict__.get(campo)
+            and (update_fields is None or campo in update_fields)
+        ]
+
+        if not self._state.adding and update_fields is None and not kwargs.get('force_insert'):
+            # Ni las fotos sin cambios (el worker puede estar reemplazándolas) ni los campos diferidos
+            conocidas = getattr(self, '_originales', {})
+            excluidos = set(self.CAMPOS_DERIVADOS) | self.get_deferred_fields()
+            for campo, *derivados in imagenes.campos_de('PerfilModelo'):
+                if campo in conocidas and campo not in modificados:
+                    excluidos.update((campo, *derivados))
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in excluidos and f.attname not in excluidos
+            ]
         super().save(*args, **kwargs)
+        imagenes.encolar(self, nuevas)
+        imagenes.quitar(self, quitadas)
 
     def __str__(self):
         return self.nombre_artistico
@@ -152,30 +365,137 @@ class PerfilModelo(models.Model):
 
 class GaleriaFoto(models.Model):
     perfil_modelo = models.ForeignKey(PerfilModelo, on_delete=models.CASCADE, related_name='galeria_fotos')
-    imagen = models.ImageField(upload_to=ruta_galeria, validators=[validate_image_file])
+    imagen = models.ImageField(upload_to=ruta_galeria, validators=[validate_image_file, validar_pixeles])
     orden = models.PositiveIntegerField(default=0)
     es_publica = models.BooleanField(default=True)
+    imagen_estado = models.CharField(max_length=10, choices=ESTADO_IMAGEN_CHOICES, default=imagenes.LISTA, editable=False)
+    imagen_estado_desde = models.DateTimeField(null=True, blank=True, editable=False)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['orden', '-id']
+        indexes = [
+            # Cola de `manage.py procesar_imagenes`
+            models.Index(fields=['id'], condition=models.Q(imagen_estado='pendiente'), name='galeria_imagen_pendiente_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        # Compresión de imágenes de galería
-        if self.pk:
-            try:
-                old_instance = GaleriaFoto.objects.get(pk=self.pk)
-                if self.imagen and self.imagen != old_instance.imagen:
-                    self.imagen = comprimir_imagen(self.imagen, max_width=1200)
-            except GaleriaFoto.DoesNotExist:
-                pass
-        else:
-            if self.imagen:
-                self.imagen = comprimir_imagen(self.imagen, max_width=1200)
-                
+        # Imagen nueva: se guarda cruda y queda pendiente (perfiles.imagenes)
+        nuevas = imagenes.subidas(self)
+        imagenes.preparar(self, nuevas)
+
         super().save(*args, **kwargs)
+        imagenes.encolar(self, nuevas)
 
     def __str__(self):
         return f"Foto {self.id} - {self.perfil_modelo}"
+
+
+class ConteoFaceta(models.Model):
+    """
+    Cantidad de perfiles visibles por valor de filtro, para mostrar "Masajes (120)".
+    ciudad = None guarda los totales de todo el catálogo. Lo mantiene perfiles.facetas.
+    """
+    DIMENSIONES = [
+        ('ciudad', 'Ciudad'),
+        ('genero', 'Género'),
+        ('servicio', 'Servicio'),
+        ('tag', 'Tag'),
+    ]
+
+    ciudad = models.ForeignKey(Ciudad, on_delete=models.CASCADE, null=True, blank=True, related_name='facetas')
+    dimension = models.CharField(max_length=10, choices=DIMENSIONES)
+    valor = models.CharField(max_length=100, help_text="Slug (ciudad, servicio, tag) o código de género")
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ciudad', 'dimension', 'valor'],
+                condition=models.Q(ciudad__isnull=False),
+                name='faceta_por_ciudad_unica',
+            ),
+            models.UniqueConstraint(
+                fields=['dimension', 'valor'],
+                condition=models.Q(ciudad__isnull=True),
+                name='faceta_global_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ciudad or 'Global'} / {self.dimension}={self.valor}: {self.total}"
+
+
+class EpocaRotacion(models.Model):
+    """
+    Fila única con la época vigente y la anterior del sorteo de orden_rotacion.
+    Está en la BD (no solo en caché) para que un reinicio o un recorte de la caché no
+    invalide los cursores abiertos. La mantiene perfiles.rotacion.
+    """
+    actual = models.PositiveIntegerField(default=0)
+    anterior = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Época {self.actual} (anterior: {self.anterior})"
+
+
+class PerfilSimilar(models.Model):
+    """
+    Vecinos precalculados de un perfil (misma ciudad, similitud de Jaccard sobre
+    servicios y tags). Los mantiene perfiles.similares.
+    """
+    perfil = models.ForeignKey(PerfilModelo, on_delete=models.CASCADE, related_name='similares')
+    similar = models.ForeignKey(PerfilModelo, on_delete=models.CASCADE, related_name='similar_de')
+    puntaje = models.FloatField()
+    posicion = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['perfil', 'posicion']
+        constraints = [
+            models.UniqueConstraint(fields=['perfil', 'posicion'], name='perfil_similar_posicion_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.perfil} ~ {self.similar} ({self.puntaje:.2f})"
+
+
+class ArchivoMedia(models.Model):
+    """
+    Objeto del storage direccionado por contenido: su nombre sale del sha256 de los bytes
+    procesados, así que la misma foto subida varias veces se guarda una sola vez.
+    Lo usan las fotos a través de ReferenciaMedia; lo mantiene perfiles.archivos.
+    """
+    hash = models.CharField(max_length=64, unique=True)
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nombre
+
+
+class ReferenciaMedia(models.Model):
+    """
+    Uso de un ArchivoMedia por una foto (modelo, fila, campo de imagen): una por variante.
+    El archivo se borra del storage cuando se queda sin referencias.
+    """
+    archivo = models.ForeignKey(ArchivoMedia, on_delete=models.PROTECT, related_name='referencias')
+    modelo = models.CharField(max_length=30)
+    objeto_id = models.BigIntegerField()
+    campo = models.CharField(max_length=30)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id', 'campo'], name='referencia_media_foto_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['archivo', 'modelo', 'objeto_id', 'campo'], name='referencia_media_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}:{self.objeto_id}.{self.campo} -> {self.archivo}"
+
+
 class PerfilLike(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='likes')
     perfil_modelo = models.ForeignKey(PerfilModelo, on_delete=models.CASCADE, related_name='likes')
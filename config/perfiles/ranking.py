@@ -0,0 +1,92 @@
+# ranking.py
+"""
+PerfilModelo.ranking_score: puntaje de 0 a 100 para ?ordering=-ranking_score.
+
+Mezcla, con los pesos de PESOS, cinco componentes normalizados a 0..1:
+    recencia     antigüedad del perfil (1 al crearse, 0.5 a los DIAS_RECENCIA días)
+    likes        likes_count en escala logarítmica, saturando en LIKES_REFERENCIA
+    rating       rating_promedio / 5, ponderado por la cantidad de reseñas aprobadas
+    completitud  fracción de datos del perfil completos (incluye tener tags y servicios)
+    plan         precio del plan vigente relativo al plan más caro
+
+Se recalcula por perfil desde los signals cuando cambia alguno de los insumos, y
+completo con `manage.py recalcular_ranking` (la recencia decae sola con el tiempo).
+Los likes, que cambian a cada rato, solo suman la diferencia de su término
+(termino_likes) en el mismo UPDATE del contador.
+"""
+import math
+
+from django.db.models import Exists, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Least, Ln
+from django.utils import timezone
+
+from suscripciones.models import Plan, Suscripcion
+
+from .models import PerfilModelo
+
+PESOS = {
+    'recencia': 0.20,
+    'likes': 0.25,
+    'rating': 0.20,
+    'completitud': 0.15,
+    'plan': 0.20,
+}
+DIAS_RECENCIA = 30
+LIKES_REFERENCIA = 500
+RESENAS_CONFIANZA = 5  # Con 5 reseñas el rating pesa la mitad; con muchas, casi completo
+CAMPOS_COMPLETITUD = ['biografia', 'foto_perfil', 'foto_portada', 'edad', 'altura', 'peso', 'medidas', 'whatsapp']
+
+
+def componentes(perfil, ahora, precio_maximo):
+    dias = max((ahora - perfil.created_at).total_seconds() / 86400, 0)
+    resenas = perfil.resenas_aprobadas_count
+    completos = sum(1 for campo in CAMPOS_COMPLETITUD if getattr(perfil, campo))
+    completos += perfil.tiene_tags + perfil.tiene_servicios
+    return {
+        'recencia': DIAS_RECENCIA / (DIAS_RECENCIA + dias),
+        'likes': min(math.log1p(perfil.likes_count) / math.log1p(LIKES_REFERENCIA), 1.0),
+        'rating': float(perfil.rating_promedio) / 5 * resenas / (resenas + RESENAS_CONFIANZA),
+        'completitud': completos / (len(CAMPOS_COMPLETITUD) + 2),
+        'plan': float(perfil.precio_plan or 0) / precio_maximo if precio_maximo else 0.0,
+    }
+
+
+def termino_likes(likes):
+    """Aporte de los likes al puntaje (0..100) como expresión SQL, igual que en componentes()."""
+    tope = math.log1p(LIKES_REFERENCIA)
+    return Value(100 * PESOS['likes'] / tope) * Least(Ln(likes + 1), Value(tope))
+
+
+def calcular(perfil, ahora, precio_maximo):
+    valores = componentes(perfil, ahora, precio_maximo)
+    return round(100 * sum(PESOS[nombre] * valor for nombre, valor in valores.items()), 4)
+
+
+def recalcular(perfiles, lote=500):
+    """Recalcula ranking_score para un queryset de perfiles, por lotes de ids. Retorna cuántos."""
+    ahora = timezone.now()
+    precio_maximo = float(Plan.objects.aggregate(maximo=Max('precio'))['maximo'] or 0)
+    plan_vigente = Suscripcion.objects.filter(
+        user_id=OuterRef('user_id'), esta_pausada=False, fecha_expiracion__gt=ahora,
+    ).values('plan__precio')[:1]
+
+    queryset = perfiles.order_by('pk').only(
+        'id', 'created_at', 'likes_count', 'rating_promedio', 'resenas_aprobadas_count', *CAMPOS_COMPLETITUD,
+    ).annotate(
+        precio_plan=Subquery(plan_vigente),
+        tiene_tags=Exists(PerfilModelo.tags.through.objects.filter(perfilmodelo_id=OuterRef('pk'))),
+        tiene_servicios=Exists(PerfilModelo.servicios.through.objects.filter(perfilmodelo_id=OuterRef('pk'))),
+    )
+
+    total = 0
+    ultimo = 0
+    while True:
+        perfiles_lote = list(queryset.filter(pk__gt=ultimo)[:lote])
+        if not perfiles_lote:
+            break
+        for perfil in perfiles_lote:
+            perfil.ranking_score = calcular(perfil, ahora, precio_maximo)
+        PerfilModelo.objects.bulk_update(perfiles_lote, ['ranking_score'])
+        total += len(perfiles_lote)
+        ultimo = perfiles_lote[-1].pk
+    return total
@@ -0,0 +1,50 @@
+# rotacion.py
+"""
+Sorteo de PerfilModelo.orden_rotacion (?ordering=orden_rotacion) por épocas.
+
+Cada sorteo abre una época nueva (EpocaRotacion) y copia la clave vigente a
+orden_rotacion_anterior, en la misma transacción. Los cursores del scroll guardan su
+época: uno de la época anterior sigue paginando sobre la clave anterior sin saltos ni
+repetidos; uno más viejo se rechaza (400) y el cliente vuelve a la primera página.
+La caché solo acelera la lectura de las épocas; si se pierde se vuelve a leer la BD.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Random
+
+from . import versiones
+from .models import MAX_ORDEN_ROTACION, EpocaRotacion, PerfilModelo
+
+CLAVE_EPOCAS = 'rotacion:epocas'
+
+# Columna que ordena los cursores de la época anterior
+COLUMNA_ANTERIOR = {'orden_rotacion': 'orden_rotacion_anterior'}
+
+
+def epocas():
+    """(época vigente, época anterior o None)."""
+    valor = cache.get(CLAVE_EPOCAS)
+    if valor is None:
+        valor = EpocaRotacion.objects.filter(pk=1).values_list('actual', 'anterior').first() or (0, None)
+        # add() para no pisar lo que haya guardado un sorteo que terminó entre medio
+        cache.add(CLAVE_EPOCAS, valor, None)
+    return tuple(valor)
+
+
+def rotar():
+    """Re-sortea la clave de los perfiles visibles con un solo UPDATE. Retorna cuántos."""
+    with transaction.atomic():
+        epoca, _ = EpocaRotacion.objects.select_for_update().get_or_create(pk=1)
+        # Los perfiles ocultos se sortean al volver a ser visibles en la siguiente corrida
+        total = PerfilModelo.objects.filter(esta_visible=True).update(
+            orden_rotacion_anterior=F('orden_rotacion'),
+            orden_rotacion=Cast(Random() * MAX_ORDEN_ROTACION, IntegerField()),
+        )
+        epoca.anterior, epoca.actual = epoca.actual, epoca.actual + 1
+        epoca.save()
+
+        valor = (epoca.actual, epoca.anterior)
+        transaction.on_commit(lambda: cache.set(CLAVE_EPOCAS, valor, None))
+        transaction.on_commit(lambda: versiones.invalidar('perfiles'))
+    return total
@@ -0,0 +1,211 @@
+# search.py
+"""
+Backends de búsqueda de texto para el catálogo de perfiles (?search=...).
+
+Cada backend mantiene su propio índice y expone la misma API:
+    buscar(queryset, termino) -> queryset filtrado y anotado con 'relevancia' (mayor = mejor)
+    autocompletar(queryset, termino) -> perfiles cuyo nombre calza con lo que se está tipeando
+    actualizar(perfiles)      -> reindexa un queryset de PerfilModelo
+    eliminar(ids)             -> quita perfiles borrados del índice
+    reconstruir()             -> reindexa todo el catálogo
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Configuración de texto creada en la migración 0004 (spanish + unaccent)
+CONFIG_POSTGRES = 'es_unaccent'
+
+
+class IcontainsBusqueda:
+    """
+    Sin índice: OR de icontains sobre los campos (comportamiento original de DRF).
+    Sirve de fallback y de línea base en el benchmark.
+    """
+    nombre = 'icontains'
+    CAMPOS = ['nombre_artistico', 'biografia', 'ciudad__nombre', 'tags__nombre']
+
+    def buscar(self, queryset, termino):
+        for palabra in termino.split():
+            condicion = reduce(or_, (Q(**{f'{campo}__icontains': palabra}) for campo in self.CAMPOS))
+            queryset = queryset.filter(condicion)
+        # El join con tags puede duplicar filas
+        return queryset.annotate(relevancia=Value(0.0)).distinct()
+
+    def autocompletar(self, queryset, termino):
+        return queryset.filter(nombre_artistico__icontains=termino).order_by('nombre_artistico')
+
+    def actualizar(self, perfiles):
+        pass
+
+    def eliminar(self, ids):
+        pass
+
+    def reconstruir(self):
+        pass
+
+
+class PostgresBusqueda:
+    """
+    tsvector almacenado en PerfilModelo.search_vector con índice GIN.
+    Pesos: A = nombre artístico, B = ciudad y tags, C = biografía.
+    """
+    nombre = 'postgres'
+
+    SQL_ACTUALIZAR = f"""
+        UPDATE perfiles_perfilmodelo AS p SET search_vector =
+            setweight(to_tsvector('{CONFIG_POSTGRES}', coalesce(p.nombre_artistico, '')), 'A')
+            || setweight(to_tsvector('{CONFIG_POSTGRES}', coalesce(c.nombre, '')), 'B')
+            || setweight(to_tsvector('{CONFIG_POSTGRES}', coalesce((
+                SELECT string_agg(t.nombre, ' ')
+                FROM perfiles_perfilmodelo_tags pt
+                JOIN perfiles_tag t ON t.id = pt.tag_id
+                WHERE pt.perfilmodelo_id = p.id
+            ), '')), 'B')
+            || setweight(to_tsvector('{CONFIG_POSTGRES}', coalesce(p.biografia, '')), 'C')
+        FROM perfiles_ciudad AS c
+        WHERE c.id = p.ciudad_id
+    """
+
+    def buscar(self, queryset, termino):
+        query = SearchQuery(termino, config=CONFIG_POSTGRES, search_type='websearch')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(relevancia=SearchRank(F('search_vector'), query))
+            .order_by('-relevancia', '-id')
+        )
+
+    def autocompletar(self, queryset, termino):
+        # Operador <% (word_similarity) de pg_trgm, servido por el índice GIN de la migración 0006.
+        # Tolera errores de tipeo y también calza prefijos ("vale" -> "Valentina").
+        return (
+            queryset.filter(nombre_artistico__trigram_word_similar=termino)
+            .annotate(similitud=TrigramWordSimilarity(termino, 'nombre_artistico'))
+            .order_by('-similitud', 'nombre_artistico')
+        )
+
+    def actualizar(self, perfiles):
+        sql, params = perfiles.values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{self.SQL_ACTUALIZAR} AND p.id IN ({sql})", params)
+
+    def eliminar(self, ids):
+        pass  # La fila del perfil (y su tsvector) ya no existe
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(self.SQL_ACTUALIZAR)
+
+
+class Fts5Busqueda:
+    """
+    Tabla virtual FTS5 de SQLite (perfiles_perfil_fts, migración 0005), con rowid = id del perfil.
+    unicode61 + remove_diacritics hace el papel de unaccent; como FTS5 no trae
+    stemming en español, cada palabra se busca por prefijo.
+    """
+    nombre = 'fts5'
+    TABLA = 'perfiles_perfil_fts'
+    # Pesos bm25 por columna: nombre, ciudad, tags, biografía
+    PESOS = '10.0, 4.0, 4.0, 1.0'
+
+    SQL_INSERTAR = f"""
+        INSERT INTO {TABLA} (rowid, nombre, ciudad, tags, biografia)
+        SELECT p.id, p.nombre_artistico, c.nombre,
+            coalesce((
+                SELECT group_concat(t.nombre, ' ')
+                FROM perfiles_perfilmodelo_tags pt
+                JOIN perfiles_tag t ON t.id = pt.tag_id
+                WHERE pt.perfilmodelo_id = p.id
+            ), ''),
+            coalesce(p.biografia, '')
+        FROM perfiles_perfilmodelo AS p
+        JOIN perfiles_ciudad AS c ON c.id = p.ciudad_id
+    """
+
+    @staticmethod
+    def consulta_fts(termino):
+        """'valen rubi' -> '"valen"* "rubi"*' (AND de prefijos, sin operadores del usuario)."""
+        palabras = re.findall(r'\w+', termino)
+        return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+    def buscar(self, queryset, termino):
+        consulta = self.consulta_fts(termino)
+        if not consulta:
+            return queryset.none()
+        # El filtro es un IN no correlacionado (un solo MATCH); bm25 se calcula solo para
+        # las filas que pasan el filtro. Expresiones del ORM (no extra()): .values(),
+        # combinadores y la paginación por cursor siguen viendo 'relevancia' como anotación
+        return queryset.filter(pk__in=self.coincidencias(consulta)).annotate(
+            relevancia=RawSQL(
+                f'SELECT -bm25({self.TABLA}, {self.PESOS}) FROM {self.TABLA} '
+                f'WHERE {self.TABLA} MATCH %s AND {self.TABLA}.rowid = perfiles_perfilmodelo.id',
+                [consulta],
+                output_field=FloatField(),
+            )
+        ).order_by('-relevancia', '-id')
+
+    def coincidencias(self, consulta):
+        return RawSQL(f'SELECT rowid FROM {self.TABLA} WHERE {self.TABLA} MATCH %s', [consulta])
+
+    def autocompletar(self, queryset, termino):
+        # Solo prefijos sobre la columna del nombre: FTS5 no tiene búsqueda difusa
+        consulta = self.consulta_fts(termino)
+        if not consulta:
+            return queryset.none()
+        return queryset.filter(pk__in=self.coincidencias(f'nombre : ({consulta})')).order_by('nombre_artistico')
+
+    def actualizar(self, perfiles):
+        sql, params = perfiles.values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLA} WHERE rowid IN ({sql})", params)
+            cursor.execute(f"{self.SQL_INSERTAR} WHERE p.id IN ({sql})", params)
+
+    def eliminar(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        marcadores = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLA} WHERE rowid IN ({marcadores})", ids)
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.TABLA}")
+            cursor.execute(self.SQL_INSERTAR)
+
+    @classmethod
+    def disponible(cls):
+        return cls.TABLA in connection.introspection.table_names()
+
+
+BACKENDS = {
+    IcontainsBusqueda.nombre: IcontainsBusqueda,
+    PostgresBusqueda.nombre: PostgresBusqueda,
+    Fts5Busqueda.nombre: Fts5Busqueda,
+}
+
+_fts5_disponible = None
+
+
+def get_backend(nombre=None):
+    """
+    Backend pedido, o el activo según settings.PERFILES_BUSQUEDA_BACKEND o, por
+    defecto, según el motor de la base de datos. Sin índice disponible se usa icontains.
+    """
+    global _fts5_disponible
+    nombre = nombre or getattr(settings, 'PERFILES_BUSQUEDA_BACKEND', None)
+    if nombre is None:
+        if connection.vendor == 'postgresql':
+            nombre = PostgresBusqueda.nombre
+        elif connection.vendor == 'sqlite':
+            if _fts5_disponible is None:
+                _fts5_disponible = Fts5Busqueda.disponible()
+            if _fts5_disponible:
+                nombre = Fts5Busqueda.nombre
+    return BACKENDS.get(nombre, IcontainsBusqueda)()
@@ -1,8 +1,36 @@
 from rest_framework import serializers
 from django.conf import settings
 from .models import PerfilModelo, Servicio, GaleriaFoto, Tag, SolicitudCambioCiudad, Ciudad, Servicio
+from . import imagenes
 from reviews.models import Resena
 
+
+class ImagenesProcesadasMixin:
+    """
+    Placeholder mientras perfiles.imagenes procesa una foto: la URL va en null hasta que
+    su estado es 'lista' (el estado se expone en el campo <campo>_estado / 'estado').
+    El manifiesto de variantes sale como lista [{'ancho', 'url'}, ...] para el srcset.
+    """
+    # Nombre de salida del manifiesto cuando no es el del modelo (<campo>_variantes)
+    claves_variantes = {}
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        request = self.context.get('request')
+        for campo, estado, variantes in imagenes.campos_de(type(instance).__name__):
+            lista = getattr(instance, estado) == imagenes.LISTA
+            if campo in rep and not lista:
+                rep[campo] = None
+            clave = self.claves_variantes.get(campo, variantes)
+            if clave in rep:
+                rep[clave] = []
+                if lista:
+                    rep[clave] = imagenes.srcset(getattr(instance, campo).storage, getattr(instance, variantes))
+                    for variante in rep[clave]:
+                        variante['url'] = request.build_absolute_uri(variante['url']) if request else variante['url']
+        return rep
+
+
 # --- Serializers de Catálogos (Simples) ---
 
 class TagSerializer(serializers.ModelSerializer):
@@ -30,10 +58,14 @@ class CiudadSerializer(serializers.ModelSerializer):
 
 # --- Serializers de Contenido ---
 
-class GaleriaFotoSerializer(serializers.ModelSerializer):
+class GaleriaFotoSerializer(ImagenesProcesadasMixin, serializers.ModelSerializer):
+    estado = serializers.CharField(source='imagen_estado', read_only=True)
+    variantes = serializers.JSONField(source='imagen_variantes', read_only=True)
+    claves_variantes = {'imagen': 'variantes'}
+
     class Meta:
         model = GaleriaFoto
-        fields = ['id', 'imagen', 'orden', 'es_publica']
+        fields = ['id', 'imagen', 'estado', 'variantes', 'orden', 'es_publica']
 
 
 class ResenaAprobadaSerializer(serializers.ModelSerializer):
@@ -46,7 +78,7 @@ class ResenaAprobadaSerializer(serializers.ModelSerializer):
 
 # --- Serializer PRINCIPAL de Perfil (Lectura Pública - GET) ---
 
-class PerfilModeloSerializer(serializers.ModelSerializer):
+class PerfilModeloSerializer(ImagenesProcesadasMixin, serializers.ModelSerializer):
     # Relaciones expandidas para lectura fácil (Objetos completos)
     ciudad = CiudadSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -56,7 +88,6 @@ class PerfilModeloSerializer(serializers.ModelSerializer):
     
     # Campos calculados
     resenas = serializers.SerializerMethodField()
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
     liked_by_me = serializers.SerializerMethodField()
     
     class Meta:
@@ -67,6 +98,10 @@ class PerfilModeloSerializer(serializers.ModelSerializer):
             'user',
             'foto_perfil',
             'foto_portada',
+            'foto_perfil_estado',
+            'foto_portada_estado',
+            'foto_perfil_variantes',
+            'foto_portada_variantes',
             'nombre_artistico',
             'biografia',
             'telefono_contacto',
@@ -84,31 +119,104 @@ class PerfilModeloSerializer(serializers.ModelSerializer):
             'galeria_fotos',
             'resenas',
             'likes_count',
+            'resenas_aprobadas_count',
+            'rating_promedio',
             'liked_by_me',
             'esta_publico',
         ]
-        read_only_fields = ['slug', 'user', 'likes_count', 'liked_by_me']
+        read_only_fields = ['slug', 'user', 'likes_count', 'resenas_aprobadas_count', 'rating_promedio', 'liked_by_me']
     
     def get_galeria_fotos(self, obj):
-        fotos = obj.galeria_fotos.filter(es_publica=True).order_by('orden')
+        # Usa el Prefetch de PerfilModeloQuerySet.con_datos_publicos si está disponible
+        fotos = getattr(obj, 'galeria_publica', None)
+        if fotos is None:
+            fotos = obj.galeria_fotos.filter(es_publica=True, imagen_estado=imagenes.LISTA).order_by('orden')
         return GaleriaFotoSerializer(fotos, many=True).data
 
     def get_resenas(self, obj):
-        if hasattr(obj, 'resenas'):
-            resenas_aprobadas = obj.resenas.filter(aprobada=True)
-            return ResenaAprobadaSerializer(resenas_aprobadas, many=True).data
-        return []
+        resenas_aprobadas = getattr(obj, 'resenas_aprobadas', None)
+        if resenas_aprobadas is None:
+            resenas_aprobadas = obj.resenas.filter(aprobada=True).select_related('cliente')
+        return ResenaAprobadaSerializer(resenas_aprobadas, many=True).data
 
     def get_liked_by_me(self, obj):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        # 'publico': payload compartido en caché; liked_by_me se superpone después por usuario
+        if request and request.user.is_authenticated and not self.context.get('publico'):
+            if hasattr(obj, 'liked_by_me_anotado'):
+                return obj.liked_by_me_anotado
             return obj.likes.filter(user=request.user).exists()
         return False
 
 
+# --- Serializer de TARJETA (Grilla del catálogo, ?view=card) ---
+
+class PerfilModeloCardSerializer(serializers.ModelSerializer):
+    """
+    Representación compacta para la grilla: sin biografía, contactos,
+    galería ni reseñas. Espera el queryset de PerfilModeloQuerySet.con_datos_tarjeta.
+    """
+    MAX_TAGS = 4
+
+    ciudad = serializers.CharField(source='ciudad.nombre', read_only=True)
+    ciudad_slug = serializers.CharField(source='ciudad.slug', read_only=True)
+    foto = serializers.SerializerMethodField()
+    foto_variantes = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    fotos_count = serializers.IntegerField(source='fotos_total', read_only=True)
+    resenas_count = serializers.IntegerField(source='resenas_aprobadas_count', read_only=True)
+
+    class Meta:
+        model = PerfilModelo
+        fields = [
+            'id',
+            'slug',
+            'nombre_artistico',
+            'ciudad',
+            'ciudad_slug',
+            'edad',
+            'genero',
+            'foto',
+            'foto_variantes',
+            'tags',
+            'likes_count',
+            'fotos_count',
+            'resenas_count',
+            'rating_promedio',
+        ]
+        read_only_fields = fields
+
+    def foto_lista(self, obj):
+        # La primera foto ya procesada (perfiles.imagenes); None = placeholder. Se calcula una vez por perfil
+        if not hasattr(obj, '_foto_lista'):
+            obj._foto_lista = None
+            for campo, estado, variantes in imagenes.campos_de('PerfilModelo'):
+                imagen = getattr(obj, campo)
+                if imagen and getattr(obj, estado) == imagenes.LISTA:
+                    obj._foto_lista = imagenes.srcset(imagen.storage, getattr(obj, variantes)) or [{'url': imagen.url}]
+                    break
+            # URLs absolutas, igual que el resto de los serializers
+            request = self.context.get('request')
+            for variante in (obj._foto_lista or []) if request else []:
+                variante['url'] = request.build_absolute_uri(variante['url'])
+        return obj._foto_lista
+
+    def get_foto(self, obj):
+        # La variante más chica: la grilla muestra tarjetas de ~300px
+        variantes = self.foto_lista(obj)
+        return variantes[0]['url'] if variantes else None
+
+    def get_foto_variantes(self, obj):
+        variantes = self.foto_lista(obj) or []
+        return [variante for variante in variantes if 'ancho' in variante]
+
+    def get_tags(self, obj):
+        return [tag.nombre for tag in obj.tags.all()[:self.MAX_TAGS]]
+
+
 # --- Serializer de EDICIÓN (Para el Panel - PATCH/PUT) ---
 
-class PerfilModeloUpdateSerializer(serializers.ModelSerializer):
+class PerfilModeloUpdateSerializer(ImagenesProcesadasMixin, serializers.ModelSerializer):
     """
     Se usa cuando la modelo edita su propio perfil.
     Diferencia: 'servicios' y 'tags' aceptan LISTAS DE IDs.
@@ -134,6 +242,10 @@ class PerfilModeloUpdateSerializer(serializers.ModelSerializer):
         fields = [
             'foto_perfil',
             'foto_portada',
+            'foto_perfil_estado',
+            'foto_portada_estado',
+            'foto_perfil_variantes',
+            'foto_portada_variantes',
             'nombre_artistico',
             'biografia',
             'telefono_contacto',
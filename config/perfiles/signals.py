@@ -0,0 +1,243 @@
+# signals.py
+"""
+Mantiene sincronizados los índices y estados derivados de PerfilModelo
+(búsqueda de texto, autocompletado, contadores, visibilidad, facetas, ranking,
+perfiles similares, versiones de caché, archivos de fotos)
+cuando cambian perfiles, tags, ciudades, likes, usuarios o suscripciones.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from suscripciones.models import Suscripcion
+from usuarios.models import CustomUser
+
+from . import autocomplete, contadores, facetas, imagenes, ranking, similares, versiones, visibilidad
+from .models import Ciudad, GaleriaFoto, PerfilLike, PerfilModelo, Servicio, Tag
+from .search import get_backend
+
+
+def reindexar_busqueda(perfiles):
+    get_backend().actualizar(perfiles)
+
+
+# Campos que lee cada paso de perfil_guardado: un save(update_fields=...) que no toca
+# ninguno (p. ej. aprobar un cambio de ciudad) se salta ese paso
+CAMPOS_BUSQUEDA = {'nombre_artistico', 'biografia', 'ciudad', 'ciudad_id'}
+CAMPOS_RANKING = set(ranking.CAMPOS_COMPLETITUD)
+CAMPOS_VISIBILIDAD = {'esta_publico'}
+
+
+def toca(update_fields, campos):
+    return update_fields is None or not campos.isdisjoint(update_fields)
+
+
+@receiver(post_save, sender=PerfilModelo)
+def perfil_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    perfil = PerfilModelo.objects.filter(pk=instance.pk)
+    if toca(update_fields, CAMPOS_BUSQUEDA):
+        reindexar_busqueda(perfil)
+    if toca(update_fields, CAMPOS_RANKING):
+        ranking.recalcular(perfil)  # Completitud del perfil
+    # Facetas: primero el cambio de ciudad/género (si ya era visible), luego la visibilidad
+    if instance.campos_modificados() & {'ciudad_id', 'genero'} and perfil.filter(esta_visible=True).exists():
+        antes = (
+            instance._originales.get('ciudad_id', instance.ciudad_id),
+            instance._originales.get('genero', instance.genero),
+        )
+        facetas.mover(instance.pk, antes, (instance.ciudad_id, instance.genero))
+    if toca(update_fields, CAMPOS_VISIBILIDAD):
+        visibilidad.recalcular(perfil)
+    instance.recordar_originales()
+
+
+@receiver(pre_delete, sender=PerfilModelo)
+def perfil_por_eliminar(sender, instance, **kwargs):
+    # Antes del borrado: después ya no están sus servicios/tags para restarlos.
+    # esta_visible se lee de la BD: lo actualiza visibilidad con UPDATE, no la instancia
+    if PerfilModelo.objects.filter(pk=instance.pk, esta_visible=True).exists():
+        facetas.ocultar([instance.pk])
+
+
+@receiver(post_delete, sender=PerfilModelo)
+def perfil_eliminado(sender, instance, **kwargs):
+    get_backend().eliminar([instance.pk])
+
+
+POST_M2M = ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver(m2m_changed, sender=PerfilModelo.tags.through)
+def tags_de_perfil_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in POST_M2M:
+            reindexar_busqueda(PerfilModelo.objects.filter(pk=instance.pk))
+        return
+
+    # tag.perfiles.add/remove/clear(): instance es el Tag
+    if action == 'pre_clear':
+        instance._perfiles_afectados = list(instance.perfiles.values_list('pk', flat=True))
+    elif action in POST_M2M:
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_perfiles_afectados', [])
+        reindexar_busqueda(PerfilModelo.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+def tag_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    reindexar_busqueda(PerfilModelo.objects.filter(tags=instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_por_eliminar(sender, instance, **kwargs):
+    # Guardamos los afectados antes de que Django borre las filas de la tabla intermedia
+    instance._perfiles_afectados = list(instance.perfiles.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_eliminado(sender, instance, **kwargs):
+    reindexar_busqueda(PerfilModelo.objects.filter(pk__in=getattr(instance, '_perfiles_afectados', [])))
+
+
+@receiver(post_save, sender=Ciudad)
+def ciudad_guardada(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    reindexar_busqueda(PerfilModelo.objects.filter(ciudad=instance))
+
+
+@receiver([post_save, post_delete], sender=Ciudad)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Servicio)
+def catalogo_cambiado(sender, **kwargs):
+    nombres = {Ciudad: 'ciudades', Tag: 'tags', Servicio: 'servicios'}
+    autocomplete.invalidar(nombres[sender])
+    # Los perfiles serializan el nombre de su ciudad, tags y servicios
+    versiones.invalidar(nombres[sender], 'perfiles')
+
+
+@receiver([post_save, post_delete], sender=PerfilModelo)
+@receiver([post_save, post_delete], sender=GaleriaFoto)
+def perfil_cambiado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    perfil_id = instance.pk if sender is PerfilModelo else instance.perfil_modelo_id
+    versiones.invalidar('perfiles', versiones.grupo_perfil(perfil_id))
+
+
+@receiver(m2m_changed, sender=PerfilModelo.tags.through)
+@receiver(m2m_changed, sender=PerfilModelo.servicios.through)
+def relaciones_de_perfil_cambiadas(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in POST_M2M:
+        return
+    if not reverse:
+        versiones.invalidar('perfiles', 'relaciones', versiones.grupo_perfil(instance.pk))
+        ranking.recalcular(PerfilModelo.objects.filter(pk=instance.pk))
+    elif action == 'post_clear':
+        # tag.perfiles.clear() no informa los perfiles: se invalida todo el catálogo del tipo
+        catalogo = 'tags' if sender is PerfilModelo.tags.through else 'servicios'
+        versiones.invalidar('perfiles', 'relaciones', catalogo)
+    else:
+        versiones.invalidar('perfiles', 'relaciones', *map(versiones.grupo_perfil, pk_set))
+        ranking.recalcular(PerfilModelo.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=PerfilLike)
+def like_creado(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.sumar_like(instance.perfil_modelo_id, 1)
+        # Solo el detalle: el listado tolera contadores atrasados hasta su TTL
+        versiones.invalidar(versiones.grupo_perfil(instance.perfil_modelo_id))
+
+
+@receiver(post_delete, sender=PerfilLike)
+def like_eliminado(sender, instance, **kwargs):
+    contadores.sumar_like(instance.perfil_modelo_id, -1)
+    versiones.invalidar(versiones.grupo_perfil(instance.perfil_modelo_id))
+
+
+@receiver(post_save, sender=Suscripcion)
+@receiver(post_delete, sender=Suscripcion)
+def suscripcion_cambiada(sender, instance, raw=False, **kwargs):
+    # Cubre pausar(), reanudar(), aplicar_plan() y la edición desde el admin
+    if not raw:
+        perfiles = PerfilModelo.objects.filter(user_id=instance.user_id)
+        visibilidad.recalcular(perfiles)
+        ranking.recalcular(perfiles)  # Plan vigente
+
+
+@receiver(post_save, sender=CustomUser)
+def usuario_guardado(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Solo importa la verificación (p. ej. el login guarda last_login con update_fields)
+    if raw or created or (update_fields is not None and 'esta_verificada' not in update_fields):
+        return
+    visibilidad.recalcular(PerfilModelo.objects.filter(user_id=instance.pk))
+
+
+# --- FACETAS ---
+
+@receiver(m2m_changed, sender=PerfilModelo.tags.through)
+@receiver(m2m_changed, sender=PerfilModelo.servicios.through)
+def facetas_de_relaciones(sender, instance, action, reverse, pk_set, **kwargs):
+    # Se cuentan las filas de la tabla intermedia recién agregadas o a punto de quitarse
+    signo = {'post_add': 1, 'pre_remove': -1, 'pre_clear': -1}.get(action)
+    if signo is None:
+        return
+    dimension = 'tag' if sender is PerfilModelo.tags.through else 'servicio'
+    lado = f"{facetas.RELACIONES[dimension][1]}_id"
+    propio, otro = ('perfilmodelo_id', lado) if not reverse else (lado, 'perfilmodelo_id')
+    filtro = {propio: instance.pk}
+    if pk_set is not None:
+        filtro[f'{otro}__in'] = pk_set
+    facetas.relaciones_cambiadas(dimension, filtro, signo)
+
+
+DIMENSIONES_CATALOGO = {Ciudad: 'ciudad', Tag: 'tag', Servicio: 'servicio'}
+
+
+@receiver(pre_save, sender=Ciudad)
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=Servicio)
+def slug_de_catalogo_anterior(sender, instance, raw=False, **kwargs):
+    # El slug tal como está en la BD: las facetas solo cambian si cambia el slug
+    if not raw and instance.pk is not None:
+        instance._slug_anterior = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Ciudad)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Servicio)
+def facetas_de_catalogo_guardado(sender, instance, created, raw=False, **kwargs):
+    antes = getattr(instance, '_slug_anterior', None)
+    if not (raw or created) and antes and antes != instance.slug:
+        facetas.renombrar(DIMENSIONES_CATALOGO[sender], antes, instance.slug)
+
+
+@receiver(post_delete, sender=Ciudad)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Servicio)
+def facetas_de_catalogo_eliminado(sender, instance, **kwargs):
+    # El borrado arrastra la tabla intermedia sin m2m_changed: se quitan las filas del valor
+    facetas.quitar(DIMENSIONES_CATALOGO[sender], instance.slug)
+
+
+# --- PERFILES SIMILARES ---
+
+@receiver(m2m_changed, sender=PerfilModelo.tags.through)
+@receiver(m2m_changed, sender=PerfilModelo.servicios.through)
+def similares_de_relaciones(sender, instance, action, reverse, **kwargs):
+    # Cambios desde el lado del tag/servicio (admin) quedan para `manage.py calcular_similares`
+    if action in POST_M2M and not reverse:
+        similares.marcar(instance.pk)
+
+
+# --- ARCHIVOS DE FOTOS ---
+
+@receiver(post_delete, sender=PerfilModelo)
+@receiver(post_delete, sender=GaleriaFoto)
+def fotos_eliminadas(sender, instance, **kwargs):
+    # Los archivos compartidos con otras fotos siguen en el storage (perfiles.archivos)
+    imagenes.quitar(instance, [campo for campo, _, _ in imagenes.campos_de(sender.__name__)])
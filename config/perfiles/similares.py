@@ -0,0 +1,154 @@
+# similares.py
+"""
+"Perfiles similares" precalculados (PerfilSimilar): para cada perfil visible, los
+TOP_K perfiles visibles de su misma ciudad con mayor similitud de Jaccard sobre
+sus servicios y tags.
+
+Por ciudad se arma una matriz binaria perfiles x (servicios + tags) empaquetada en
+bits (np.packbits, 8 características por byte); las intersecciones salen de un AND
+y un popcount (np.bitwise_count) y las uniones de |A| + |B| - |A ∩ B|, por bloques
+de filas para acotar la memoria.
+`manage.py calcular_similares` recalcula todo. Los signals solo marcan el perfil
+cuyas relaciones cambiaron (marcar): al confirmar la transacción se recalcula una
+vez su lista y la de los vecinos a los que afecta, aunque un PATCH dispare varios m2m_changed.
+"""
+import threading
+
+import numpy as np
+from django.db import transaction
+
+from .models import Ciudad, PerfilModelo, PerfilSimilar
+
+TOP_K = 8
+# Tope de la matriz intermedia (filas del bloque x perfiles x bytes por fila) al comparar
+BYTES_POR_BLOQUE = 32 * 1024 * 1024
+
+
+class MatrizCiudad:
+    """Matriz binaria (empaquetada en bits) de características de los perfiles visibles de una ciudad."""
+
+    def __init__(self, ciudad_id):
+        self.ids = list(
+            PerfilModelo.objects.filter(ciudad_id=ciudad_id, esta_visible=True)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        self.fila = {perfil_id: i for i, perfil_id in enumerate(self.ids)}
+
+        pares = []
+        relaciones = [
+            ('s', PerfilModelo.servicios.through, 'servicio_id'),
+            ('t', PerfilModelo.tags.through, 'tag_id'),
+        ]
+        for prefijo, through, campo in relaciones:
+            filas = through.objects.filter(
+                perfilmodelo__ciudad_id=ciudad_id, perfilmodelo__esta_visible=True
+            ).values_list('perfilmodelo_id', campo)
+            pares += [(perfil_id, (prefijo, valor)) for perfil_id, valor in filas]
+
+        columnas = {caracteristica: j for j, caracteristica in enumerate({c for _, c in pares})}
+        matriz = np.zeros((len(self.ids), len(columnas)), dtype=bool)
+        for perfil_id, caracteristica in pares:
+            matriz[self.fila[perfil_id], columnas[caracteristica]] = True
+        self.bits = np.packbits(matriz, axis=1)
+        self.tamanos = np.bitwise_count(self.bits).sum(axis=1, dtype=np.int32)
+
+    def jaccard(self, filas):
+        """Similitud de las filas dadas contra todos los perfiles: matriz len(filas) x n."""
+        interseccion = np.bitwise_count(self.bits[filas][:, None, :] & self.bits[None, :, :]).sum(axis=2, dtype=np.int32)
+        union = self.tamanos[filas][:, None] + self.tamanos[None, :] - interseccion
+        similitud = np.zeros(interseccion.shape, dtype=np.float32)
+        np.divide(interseccion, union, out=similitud, where=union > 0)
+        similitud[np.arange(len(filas)), filas] = 0  # Uno mismo no cuenta
+        return similitud
+
+    def vecinos(self, filas):
+        """{perfil_id: [(similar_id, puntaje), ...]} con los TOP_K de cada fila (puntaje > 0)."""
+        resultado = {}
+        por_bloque = max(1, BYTES_POR_BLOQUE // max(1, self.bits.size))
+        for inicio in range(0, len(filas), por_bloque):
+            bloque = filas[inicio:inicio + por_bloque]
+            similitud = self.jaccard(bloque)
+            k = min(TOP_K, similitud.shape[1])
+            if k == 0:
+                continue
+            candidatos = np.argpartition(-similitud, k - 1, axis=1)[:, :k]
+            for i, fila in enumerate(bloque):
+                # Orden por puntaje y, ante empates, por id más nuevo
+                orden = sorted(candidatos[i], key=lambda j: (-similitud[i, j], -self.ids[j]))
+                resultado[self.ids[fila]] = [
+                    (self.ids[j], float(similitud[i, j])) for j in orden if similitud[i, j] > 0
+                ]
+        return resultado
+
+
+def _crear(vecinos):
+    PerfilSimilar.objects.bulk_create(
+        PerfilSimilar(perfil_id=perfil_id, similar_id=similar_id, puntaje=puntaje, posicion=posicion)
+        for perfil_id, lista in vecinos.items()
+        for posicion, (similar_id, puntaje) in enumerate(lista)
+    )
+
+
+@transaction.atomic
+def calcular_ciudad(ciudad_id):
+    matriz = MatrizCiudad(ciudad_id)
+    PerfilSimilar.objects.filter(perfil__ciudad_id=ciudad_id).delete()
+    _crear(matriz.vecinos(list(range(len(matriz.ids)))))
+    return len(matriz.ids)
+
+
+def calcular_todo():
+    return sum(calcular_ciudad(ciudad_id) for ciudad_id in Ciudad.objects.values_list('pk', flat=True))
+
+
+@transaction.atomic
+def actualizar_perfil(perfil_id):
+    """
+    Tras cambiar los servicios/tags de un perfil: recalcula su lista y la de los
+    vecinos afectados (los que lo tenían en su lista o donde ahora entraría).
+    """
+    ciudad_id = PerfilModelo.objects.filter(pk=perfil_id, esta_visible=True).values_list('ciudad_id', flat=True).first()
+    if ciudad_id is None:
+        return
+    matriz = MatrizCiudad(ciudad_id)
+    fila = matriz.fila[perfil_id]
+    similitud = matriz.jaccard([fila])[0]
+
+    # Umbral de entrada de cada perfil: el puntaje de su último vecino (0 si tiene menos de TOP_K)
+    umbral = np.zeros(len(matriz.ids), dtype=np.float32)
+    lo_tenian = set()
+    listas = PerfilSimilar.objects.filter(perfil__ciudad_id=ciudad_id, perfil__esta_visible=True).values_list(
+        'perfil_id', 'similar_id', 'puntaje', 'posicion'
+    )
+    for perfil, similar, puntaje, posicion in listas:
+        if similar == perfil_id:
+            lo_tenian.add(matriz.fila[perfil])
+        if posicion == TOP_K - 1:
+            umbral[matriz.fila[perfil]] = puntaje
+
+    entrarian = set(np.nonzero(similitud > umbral)[0].tolist())
+    afectados = sorted({fila} | lo_tenian | entrarian)
+    PerfilSimilar.objects.filter(perfil_id__in=[matriz.ids[i] for i in afectados]).delete()
+    _crear(matriz.vecinos(afectados))
+
+
+_pendientes = threading.local()
+
+
+def marcar(perfil_id):
+    """
+    Agenda actualizar_perfil para cuando se confirme la transacción, una sola vez por
+    perfil aunque sus servicios y tags cambien en varios pasos (remove + add de cada set()).
+    """
+    pendientes = getattr(_pendientes, 'ids', None)
+    if pendientes is None:
+        pendientes = _pendientes.ids = set()
+    pendientes.add(perfil_id)
+    transaction.on_commit(lambda: _actualizar_pendiente(perfil_id))
+
+
+def _actualizar_pendiente(perfil_id):
+    # Las demás llamadas de la misma transacción encuentran el perfil ya procesado
+    if perfil_id in _pendientes.ids:
+        _pendientes.ids.discard(perfil_id)
+        actualizar_perfil(perfil_id)
@@ -1,3 +1,1308 @@
-from django.test import TestCase
+import re
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient
+
+from reviews.models import Resena
+from suscripciones.models import Plan, SolicitudSuscripcion, Suscripcion
+from usuarios.models import CustomUser
+from . import autocomplete, bitmaps, imagenes, ranking, similares, utils
+from .models import ArchivoMedia, Ciudad, GaleriaFoto, PerfilLike, PerfilModelo, PerfilSimilar, Servicio, Tag
+from .search import get_backend
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}})
+class CacheLocalTestCase(TestCase):
+    """Caché en memoria propia: los cache.clear() de los tests no tocan la caché compartida."""
+
+
+def crear_perfil(ciudad, n, **kwargs):
+    user = CustomUser.objects.create_user(
+        username=f"modelo{n}", email=f"modelo{n}@example.com", password="x"
+    )
+    kwargs.setdefault('nombre_artistico', f"Modelo {n}")
+    return PerfilModelo.objects.create(user=user, ciudad=ciudad, **kwargs)
+
+
+class PerfilModeloListQueriesTests(CacheLocalTestCase):
+    """El listado público debe costar el mismo número de queries para cualquier page_size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.tag = Tag.objects.create(nombre="Rubia")
+        cls.servicio = Servicio.objects.create(nombre="Masajes")
+        cls.cliente = CustomUser.objects.create_user(
+            username="cliente", email="cliente@example.com", password="x"
+        )
+        for n in range(12):
+            perfil = crear_perfil(cls.ciudad, n)
+            perfil.tags.add(cls.tag)
+            perfil.servicios.add(cls.servicio)
+            # Sin archivo real: se inserta directo para no pasar por la compresión
+            GaleriaFoto.objects.bulk_create([
+                GaleriaFoto(perfil_modelo=perfil, imagen="x.webp", es_publica=True),
+                GaleriaFoto(perfil_modelo=perfil, imagen="y.webp", es_publica=False),
+            ])
+            Resena.objects.create(perfil_modelo=perfil, cliente=cls.cliente, comentario="ok", aprobada=True)
+            PerfilLike.objects.create(user=cls.cliente, perfil_modelo=perfil)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def contar_queries(self, page_size, **params):
+        cache.clear()  # Medimos siempre en frío (sin el COUNT cacheado)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/profiles/', {'page_size': page_size, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries), response
+
+    def test_queries_constantes_anonimo(self):
+        pocas, _ = self.contar_queries(2)
+        muchas, response = self.contar_queries(12)
+        self.assertEqual(pocas, muchas)
+
+        perfil = response.data['results'][0]
+        self.assertEqual(len(perfil['galeria_fotos']), 1)
+        self.assertEqual(len(perfil['resenas']), 1)
+        self.assertEqual(perfil['likes_count'], 1)
+        self.assertFalse(perfil['liked_by_me'])
+
+    def test_queries_constantes_autenticado(self):
+        self.client.force_authenticate(self.cliente)
+        pocas, _ = self.contar_queries(2)
+        muchas, response = self.contar_queries(12)
+        self.assertEqual(pocas, muchas)
+        self.assertTrue(all(p['liked_by_me'] for p in response.data['results']))
+
+    def test_vista_tarjeta(self):
+        pocas, _ = self.contar_queries(2, view='card')
+        muchas, response = self.contar_queries(12, view='card')
+        self.assertEqual(pocas, muchas)
+
+        tarjeta = response.data['results'][0]
+        self.assertNotIn('biografia', tarjeta)
+        self.assertNotIn('galeria_fotos', tarjeta)
+        self.assertEqual(tarjeta['ciudad'], 'Santiago')
+        self.assertEqual(tarjeta['tags'], ['Rubia'])
+        self.assertEqual(
+            (tarjeta['likes_count'], tarjeta['fotos_count'], tarjeta['resenas_count']),
+            (1, 1, 1),
+        )
+
+    def test_tarjeta_tags_en_orden_alfabetico(self):
+        perfil = PerfilModelo.objects.get(user__username='modelo0')
+        perfil.tags.add(Tag.objects.create(nombre="Alta"), Tag.objects.create(nombre="Zurda"))
+        tarjeta = next(
+            t for t in self.client.get('/api/profiles/', {'view': 'card', 'page_size': 12}).data['results']
+            if t['id'] == perfil.pk
+        )
+        self.assertEqual(tarjeta['tags'], ['Alta', 'Rubia', 'Zurda'])
+
+
+class PerfilesCursorPaginationTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Valparaíso")
+        for n in range(5):
+            crear_perfil(cls.ciudad, n)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_sin_saltos_ni_duplicados_con_inserciones(self):
+        response = self.client.get('/api/profiles/', {'paginacion': 'cursor', 'page_size': 2})
+        self.assertNotIn('count', response.data)
+        vistos = [p['id'] for p in response.data['results']]
+
+        # Un perfil nuevo entre páginas no debe desplazar el resto del scroll
+        crear_perfil(self.ciudad, 99)
+
+        siguiente = response.data['next']
+        while siguiente:
+            response = self.client.get(siguiente)
+            vistos += [p['id'] for p in response.data['results']]
+            siguiente = response.data['next']
+
+        esperados = list(
+            PerfilModelo.objects.exclude(user__username='modelo99')
+            .order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_total_opcional(self):
+        response = self.client.get('/api/profiles/', {'paginacion': 'cursor', 'total': 1})
+        self.assertEqual(response.data['count'], 5)
+
+    def test_fechas_dentro_del_mismo_milisegundo(self):
+        # created_at distintos por microsegundos: el cursor no puede redondearlos
+        base = timezone.now().replace(microsecond=500000)
+        for n, pk in enumerate(PerfilModelo.objects.order_by('id').values_list('id', flat=True)):
+            PerfilModelo.objects.filter(pk=pk).update(created_at=base + timedelta(microseconds=n * 10))
+
+        for ordering in ('created_at', '-created_at'):
+            vistos = []
+            siguiente = f'/api/profiles/?paginacion=cursor&ordering={ordering}&page_size=1'
+            while siguiente:
+                response = self.client.get(siguiente)
+                self.assertEqual(response.status_code, 200)
+                vistos += [p['id'] for p in response.data['results']]
+                siguiente = response.data['next']
+                self.assertLessEqual(len(vistos), 5)
+
+            esperados = list(PerfilModelo.objects.order_by(ordering, '-id').values_list('id', flat=True))
+            self.assertEqual(vistos, esperados)
+
+            # Y de vuelta hacia atrás desde la última página
+            anterior = response.data['previous']
+            atras = []
+            while anterior:
+                response = self.client.get(anterior)
+                atras = [p['id'] for p in response.data['results']] + atras
+                anterior = response.data['previous']
+            self.assertEqual(atras, esperados[:-1])
+
+    def test_empates_masivos_no_repiten_ni_ciclan(self):
+        # Más de 1000 perfiles con el mismo likes_count: el cursor debe avanzar por (likes_count, id)
+        usuarios = CustomUser.objects.bulk_create([
+            CustomUser(username=f"empate{n}", email=f"empate{n}@example.com") for n in range(1100)
+        ])
+        PerfilModelo.objects.bulk_create([
+            PerfilModelo(user=user, ciudad=self.ciudad, nombre_artistico="Empate", slug=f"empate-{user.pk}", esta_visible=True)
+            for user in usuarios
+        ])
+        PerfilModelo.objects.update(likes_count=0)
+
+        vistos = []
+        siguiente = '/api/profiles/?paginacion=cursor&ordering=likes_count&page_size=100'
+        while siguiente:
+            response = self.client.get(siguiente)
+            self.assertEqual(response.status_code, 200)
+            vistos += [p['id'] for p in response.data['results']]
+            siguiente = response.data['next']
+            self.assertLessEqual(len(vistos), 1105)
+
+        esperados = list(
+            PerfilModelo.objects.filter(esta_visible=True).order_by('likes_count', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+        # Y hacia atrás desde la última página se recupera la anterior tal cual
+        anterior = self.client.get(response.data['previous'])
+        self.assertEqual([p['id'] for p in anterior.data['results']], esperados[-105:-5])
+
+    def test_rechaza_orden_por_relevancia(self):
+        response = self.client.get('/api/profiles/', {'paginacion': 'cursor', 'search': 'Modelo'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/profiles/', {'paginacion': 'cursor', 'search': 'Modelo', 'ordering': '-created_at'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_de_otro_orden(self):
+        response = self.client.get('/api/profiles/', {'paginacion': 'cursor', 'page_size': 2})
+        siguiente = response.data['next'].replace('paginacion=cursor', 'paginacion=cursor&ordering=likes_count')
+        self.assertEqual(self.client.get(siguiente).status_code, 400)
+
+
+class PerfilSearchFilterTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.rubia = Tag.objects.create(nombre="Rubia")
+        cls.valentina = crear_perfil(cls.ciudad, 1, nombre_artistico="Valentina")
+        cls.valentina.tags.add(cls.rubia)
+        cls.camila = crear_perfil(cls.ciudad, 2, nombre_artistico="Camila", biografia="Amiga de Valentina")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def buscar(self, termino):
+        response = self.client.get('/api/profiles/', {'search': termino})
+        self.assertEqual(response.status_code, 200)
+        return [p['nombre_artistico'] for p in response.data['results']]
+
+    def test_busqueda_por_nombre_y_tag(self):
+        # El nombre pesa más que la biografía
+        self.assertEqual(self.buscar('valentina'), ['Valentina', 'Camila'])
+        self.assertEqual(self.buscar('rubia'), ['Valentina'])
+
+    def test_sin_acentos_y_por_prefijo(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Prueba del backend FTS5")
+        self.assertEqual(get_backend().nombre, 'fts5')
+        self.assertEqual(self.buscar('valentína'), ['Valentina', 'Camila'])
+        self.assertEqual(self.buscar('SANTIAGO valen'), ['Valentina', 'Camila'])
+        self.assertEqual(self.buscar('rub'), ['Valentina'])
+
+    def test_resultado_es_un_queryset_componible(self):
+        # Sin extra(): values(), combinadores y count() sobre el resultado de buscar()
+        encontrados = get_backend().buscar(PerfilModelo.objects.all(), 'valentina')
+        self.assertEqual(
+            [fila['nombre_artistico'] for fila in encontrados.values('nombre_artistico', 'relevancia')],
+            ['Valentina', 'Camila'],
+        )
+        self.assertEqual(encontrados.count(), 2)
+        otros = PerfilModelo.objects.filter(pk=self.camila.pk).values_list('pk', flat=True)
+        self.assertEqual(
+            set(encontrados.order_by().values_list('pk', flat=True).intersection(otros)), {self.camila.pk}
+        )
+
+    def test_perfil_eliminado_sale_del_indice(self):
+        self.camila.delete()
+        self.assertEqual(self.buscar('valentina'), ['Valentina'])
+
+    def test_tags_nuevos_se_indexan(self):
+        morena = Tag.objects.create(nombre="Morena")
+        self.camila.tags.add(morena)
+        self.assertEqual(self.buscar('morena'), ['Camila'])
+
+
+class AutocompletarTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.santiago = Ciudad.objects.create(nombre="Santiago")
+        Ciudad.objects.create(nombre="Viña del Mar")
+        Tag.objects.create(nombre="Rubia")
+        Servicio.objects.create(nombre="Masajes")
+        crear_perfil(cls.santiago, 1, nombre_artistico="Valentina")
+
+    def setUp(self):
+        # Los índices viven en memoria del proceso: no deben arrastrarse entre tests
+        for nombre in autocomplete.CARGADORES:
+            autocomplete.invalidar(nombre)
+        self.client = APIClient()
+
+    def autocompletar(self, q):
+        response = self.client.get('/api/profiles/autocomplete/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefijos_sin_acentos(self):
+        data = self.autocompletar('vina')
+        self.assertEqual([c['nombre'] for c in data['ciudades']], ['Viña del Mar'])
+        self.assertEqual([c['nombre'] for c in self.autocompletar('mar')['ciudades']], ['Viña del Mar'])
+        self.assertEqual([p['nombre_artistico'] for p in self.autocompletar('vale')['perfiles']], ['Valentina'])
+
+    def test_errores_de_tipeo_en_catalogos(self):
+        self.assertEqual([c['nombre'] for c in self.autocompletar('santaigo')['ciudades']], ['Santiago'])
+        self.assertEqual([s['nombre'] for s in self.autocompletar('masaje')['servicios']], ['Masajes'])
+
+    def test_catalogo_se_invalida_al_guardar(self):
+        self.autocompletar('mor')
+        Tag.objects.create(nombre="Morena")
+        self.assertEqual([t['nombre'] for t in self.autocompletar('mor')['tags']], ['Morena'])
+
+
+class ContadoresTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.perfil = crear_perfil(cls.ciudad, 1)
+        cls.otro = crear_perfil(cls.ciudad, 2)
+        cls.cliente = CustomUser.objects.create_user(username="cliente", email="c@example.com", password="x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_toggle_like_ajusta_contador(self):
+        self.client.force_authenticate(self.cliente)
+        url = f'/api/profiles/{self.perfil.id}/like/'
+        self.assertEqual(self.client.post(url).data['likes_count'], 1)
+        self.assertEqual(self.client.post(url).data['likes_count'], 0)
+
+    def test_aprobar_resena_actualiza_promedio(self):
+        resena = Resena.objects.create(perfil_modelo=self.perfil, cliente=self.cliente, comentario="ok", rating=4)
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.resenas_aprobadas_count, 0)
+
+        resena.aprobada = True
+        resena.save()
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.resenas_aprobadas_count, 1)
+        self.assertEqual(self.perfil.rating_promedio, 4)
+
+    def test_save_de_instancia_vieja_no_pisa_contadores(self):
+        vieja = PerfilModelo.objects.get(pk=self.perfil.pk)
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.perfil)
+        Resena.objects.create(perfil_modelo=self.perfil, cliente=self.cliente, comentario="ok", rating=5, aprobada=True)
+
+        # save() completo con likes_count = 0 en memoria: los contadores no se escriben
+        vieja.biografia = "Editada"
+        vieja.save()
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.biografia, "Editada")
+        self.assertEqual(
+            (self.perfil.likes_count, self.perfil.resenas_aprobadas_count, self.perfil.rating_promedio),
+            (1, 1, 5),
+        )
+
+    def test_recalcular_repara_y_ordenar_por_likes(self):
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.perfil)
+        PerfilModelo.objects.update(likes_count=7)  # Contadores corruptos
+
+        call_command('recalcular_contadores', lote=1, stdout=StringIO())
+        self.assertEqual(
+            dict(PerfilModelo.objects.values_list('id', 'likes_count')),
+            {self.perfil.id: 1, self.otro.id: 0},
+        )
+        response = self.client.get('/api/profiles/', {'ordering': '-likes_count'})
+        self.assertEqual(response.data['results'][0]['id'], self.perfil.id)
+
+
+@override_settings(
+    PERFILES_VISIBLE_REQUIERE_VERIFICACION=True,
+    PERFILES_VISIBLE_REQUIERE_SUSCRIPCION=True,
+)
+class VisibilidadTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.plan = Plan.objects.create(nombre="Mensual", precio=10000, dias_contratados=30)
+
+    def setUp(self):
+        self.perfil = crear_perfil(self.ciudad, 1)
+
+    def assertVisible(self, esperado):
+        self.perfil.refresh_from_db(fields=['esta_visible'])
+        self.assertEqual(self.perfil.esta_visible, esperado)
+
+    def test_verificacion_y_suscripcion(self):
+        self.assertVisible(False)
+
+        user = self.perfil.user
+        user.esta_verificada = True
+        user.save(update_fields=['esta_verificada'])
+        self.assertVisible(False)
+
+        solicitud = SolicitudSuscripcion.objects.create(user=user, plan=self.plan, comprobante_pago='x.pdf')
+        suscripcion = solicitud.aplicar_plan()
+        self.assertVisible(True)
+
+        suscripcion.pausar()
+        self.assertVisible(False)
+        suscripcion.reanudar()
+        self.assertVisible(True)
+
+        self.perfil.esta_publico = False
+        self.perfil.save()
+        self.assertVisible(False)
+
+    def test_barrido_de_suscripciones_vencidas(self):
+        self.perfil.user.esta_verificada = True
+        self.perfil.user.save()
+        Suscripcion.objects.create(user=self.perfil.user, fecha_expiracion=timezone.now() + timedelta(days=1))
+        self.assertVisible(True)
+
+        Suscripcion.objects.update(fecha_expiracion=timezone.now() - timedelta(minutes=1))
+        call_command('recalcular_visibilidad', stdout=StringIO())
+        self.assertVisible(False)
+
+
+class ExplainTests(CacheLocalTestCase):
+    """
+    Planes de las consultas del catálogo: ninguna debe recorrer secuencialmente
+    las tablas de perfiles (en SQLite un "SCAN tabla" sin índice, en PostgreSQL un "Seq Scan").
+    Se siembran suficientes perfiles repartidos en varias ciudades y se corre ANALYZE, para
+    que el planner elija con estadísticas reales y no por el tamaño de una tabla de prueba.
+    """
+    TABLAS = ('perfiles_perfilmodelo', 'perfiles_perfilmodelo_tags', 'perfiles_perfilmodelo_servicios')
+    SEMBRADOS = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Viña del Mar")
+        tag = Tag.objects.create(nombre="Rubia")
+        servicio = Servicio.objects.create(nombre="Masajes")
+        for n in range(3):
+            perfil = crear_perfil(cls.ciudad, n, genero='F', edad=25, altura=165, peso=55)
+            perfil.tags.add(tag)
+            perfil.servicios.add(servicio)
+
+        ciudades = [cls.ciudad] + [Ciudad.objects.create(nombre=f"Ciudad {n}") for n in range(29)]
+        tags = [tag] + [Tag.objects.create(nombre=f"Tag {n}") for n in range(19)]
+        servicios = [servicio] + [Servicio.objects.create(nombre=f"Servicio {n}") for n in range(9)]
+        usuarios = CustomUser.objects.bulk_create([
+            CustomUser(username=f"sembrado{n}", email=f"sembrado{n}@example.com") for n in range(cls.SEMBRADOS)
+        ])
+        perfiles = PerfilModelo.objects.bulk_create([
+            PerfilModelo(
+                user=user, ciudad=ciudades[n % len(ciudades)], nombre_artistico=f"Sembrado {n}",
+                slug=f"sembrado-{n}", genero='FMT'[n % 3], edad=18 + n % 40, altura=150 + n % 40,
+                peso=45 + n % 40, esta_publico=n % 10 != 0,
+            )
+            for n, user in enumerate(usuarios)
+        ])
+        PerfilModelo.tags.through.objects.bulk_create([
+            PerfilModelo.tags.through(perfilmodelo_id=perfil.pk, tag_id=tags[(n + k) % len(tags)].pk)
+            for n, perfil in enumerate(perfiles) for k in range(3)
+        ])
+        PerfilModelo.servicios.through.objects.bulk_create([
+            PerfilModelo.servicios.through(perfilmodelo_id=perfil.pk, servicio_id=servicios[(n + k) % len(servicios)].pk)
+            for n, perfil in enumerate(perfiles) for k in range(2)
+        ])
+        PerfilModelo.objects.filter(esta_publico=True).update(esta_visible=True)
+        get_backend().reconstruir()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def planes(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/profiles/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'])
+
+        planes = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                prefijo = 'EXPLAIN' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN'
+                cursor.execute(f'{prefijo} {sql}')
+                planes.append((sql, '\n'.join(str(fila[-1]) for fila in cursor.fetchall())))
+        return planes
+
+    def assertSinScanSecuencial(self, **params):
+        if connection.vendor == 'postgresql':
+            patron = r'Seq Scan on (\w+)'
+        else:
+            # "SCAN tabla" a secas; "SCAN tabla USING [COVERING] INDEX" recorre un índice
+            patron = r'SCAN (\w+)(?! USING)(?: |$)'
+        for sql, plan in self.planes(**params):
+            for tabla in re.findall(patron, plan, flags=re.MULTILINE):
+                if self.recorre_por_id(tabla, sql, plan):
+                    continue
+                self.assertNotIn(tabla, self.TABLAS, f"Scan secuencial con {params}:\n{sql}\n{plan}")
+
+    def recorre_por_id(self, tabla, sql, plan):
+        # En SQLite la tabla es el árbol de su rowid: "SCAN tabla" para ORDER BY id ... LIMIT sin
+        # ordenar aparte lee solo las primeras filas (el "Index Scan Backward" de PostgreSQL)
+        return (
+            connection.vendor == 'sqlite'
+            and 'TEMP B-TREE' not in plan
+            and re.search(rf'ORDER BY "{tabla}"\."id" (ASC|DESC) LIMIT', sql) is not None
+        )
+
+    def test_listado(self):
+        self.assertSinScanSecuencial()
+        self.assertSinScanSecuencial(view='card')
+
+    def test_filtros(self):
+        self.assertSinScanSecuencial(ciudad='vina-del-mar')
+        self.assertSinScanSecuencial(genero='F')
+        self.assertSinScanSecuencial(ciudad='Vina-del-Mar', genero='F')
+        self.assertSinScanSecuencial(tags='rubia')
+        self.assertSinScanSecuencial(servicio='masajes')
+        self.assertSinScanSecuencial(ciudad='vina-del-mar', edad_min=20, edad_max=30)
+        self.assertSinScanSecuencial(ciudad='vina-del-mar', genero='F', edad_min=20, altura_min=150, peso_max=70)
+
+    def test_ranking(self):
+        self.assertSinScanSecuencial(ordering='-ranking_score')
+        self.assertSinScanSecuencial(ordering='-ranking_score', paginacion='cursor')
+
+    def test_rotacion(self):
+        self.assertSinScanSecuencial(ordering='orden_rotacion')
+        self.assertSinScanSecuencial(ordering='orden_rotacion', ciudad='vina-del-mar', paginacion='cursor')
+
+    def test_busqueda(self):
+        self.assertSinScanSecuencial(search='modelo')
+        self.assertSinScanSecuencial(search='modelo', ciudad='vina-del-mar')
+
+
+class RespuestasCacheadasTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.perfil = crear_perfil(cls.ciudad, 1, esta_visible=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_catalogo_cacheado_e_invalidado(self):
+        self.client.get('/api/profiles/ciudades/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/profiles/ciudades/')
+        self.assertEqual(response.data[0]['nombre'], "Santiago")
+
+        self.ciudad.nombre = "Santiago Centro"
+        self.ciudad.save()
+        response = self.client.get('/api/profiles/ciudades/')
+        self.assertEqual(response.data[0]['nombre'], "Santiago Centro")
+
+    def test_listado_de_perfiles(self):
+        self.client.get('/api/profiles/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/profiles/')
+
+        # Cambiar la ciudad invalida también los perfiles que la serializan
+        self.ciudad.nombre = "Stgo"
+        self.ciudad.save()
+        response = self.client.get('/api/profiles/', {'view': 'card'})
+        self.assertEqual(response.data['results'][0]['ciudad'], "Stgo")
+
+        self.perfil.nombre_artistico = "Nuevo nombre"
+        self.perfil.save()
+        response = self.client.get('/api/profiles/')
+        self.assertEqual(response.data['results'][0]['nombre_artistico'], "Nuevo nombre")
+
+    def test_autenticado_usa_la_cache_con_likes_superpuestos(self):
+        self.client.get('/api/profiles/')
+        cliente = CustomUser.objects.create_user(username="cliente", email="cliente@example.com", password="x")
+        PerfilLike.objects.create(user=cliente, perfil_modelo=self.perfil)
+        self.client.get('/api/profiles/')
+
+        self.client.force_authenticate(cliente)
+        with self.assertNumQueries(1):  # Solo los likes del usuario
+            response = self.client.get('/api/profiles/')
+        self.assertTrue(response.data['results'][0]['liked_by_me'])
+
+        self.client.force_authenticate(self.perfil.user)
+        self.assertFalse(self.client.get('/api/profiles/').data['results'][0]['liked_by_me'])
+
+    def test_estado_de_likes(self):
+        cliente = CustomUser.objects.create_user(username="cliente", email="cliente@example.com", password="x")
+        otro = crear_perfil(self.ciudad, 2)
+        PerfilLike.objects.create(user=cliente, perfil_modelo=self.perfil)
+
+        self.client.force_authenticate(cliente)
+        response = self.client.get('/api/profiles/likes/status/', {'ids': f'{self.perfil.pk},{otro.pk}'})
+        self.assertEqual(response.data, {str(self.perfil.pk): True, str(otro.pk): False})
+        self.assertEqual(self.client.get('/api/profiles/likes/status/', {'ids': 'a'}).status_code, 400)
+
+
+class PerfilDetalleCacheadoTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.perfil = crear_perfil(cls.ciudad, 1)
+        cls.cliente = CustomUser.objects.create_user(username="cliente", email="cliente@example.com", password="x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/profiles/public/{self.perfil.slug}/'
+
+    def test_etag_y_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Resena.objects.create(perfil_modelo=self.perfil, cliente=self.cliente, comentario="ok", aprobada=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['resenas']), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_es_la_fecha_del_perfil(self):
+        hace_un_dia = timezone.now() - timedelta(days=1)
+        PerfilModelo.objects.filter(pk=self.perfil.pk).update(updated_at=hace_un_dia)
+        response = self.client.get(self.url)
+        self.assertEqual(response['Last-Modified'], http_date(hace_un_dia.timestamp()))
+
+        # Se llena la caché de nuevo (otro token) y la fecha no cambia
+        cache.clear()
+        self.assertEqual(self.client.get(self.url)['Last-Modified'], http_date(hace_un_dia.timestamp()))
+
+    def test_liked_by_me_por_usuario(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(self.cliente)
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.post(f'/api/profiles/{self.perfil.pk}/like/')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['liked_by_me'])
+        self.assertEqual(response.data['likes_count'], 1)
+
+        self.client.force_authenticate(None)
+        self.assertFalse(self.client.get(self.url).data['liked_by_me'])
+
+    def test_perfil_oculto_y_cambio_de_slug(self):
+        self.client.get(self.url)
+        self.perfil.esta_publico = False
+        self.perfil.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.perfil.esta_publico = True
+        self.perfil.slug = 'nuevo-slug'
+        self.perfil.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get('/api/profiles/public/nuevo-slug/').status_code, 200)
+
+
+class CatalogosTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ciudad.objects.create(nombre="Santiago")
+        Servicio.objects.create(nombre="Masajes")
+        Tag.objects.create(nombre="Rubia")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_bundle_con_version_y_304(self):
+        response = self.client.get('/api/profiles/catalogos/')
+        self.assertEqual(response['ETag'], f'"{response.data["version"]}"')
+        self.assertEqual([c['nombre'] for c in response.data['ciudades']], ["Santiago"])
+        self.assertEqual(response.data['servicios_catalogo'][0]['slug'], "masajes")
+        self.assertEqual(response.data['tags'][0]['nombre'], "Rubia")
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/profiles/catalogos/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidado_por_signals(self):
+        version = self.client.get('/api/profiles/catalogos/').data['version']
+        Tag.objects.create(nombre="Morena")
+        response = self.client.get('/api/profiles/catalogos/')
+        self.assertNotEqual(response.data['version'], version)
+        self.assertEqual(len(response.data['tags']), 2)
+
+
+class FacetasTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.santiago = Ciudad.objects.create(nombre="Santiago")
+        cls.valpo = Ciudad.objects.create(nombre="Valparaíso")
+        cls.masajes = Servicio.objects.create(nombre="Masajes")
+        cls.rubia = Tag.objects.create(nombre="Rubia")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def facetas(self, **params):
+        response = self.client.get('/api/profiles/facetas/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_conteos_incrementales(self):
+        a = crear_perfil(self.santiago, 1, genero='F')
+        b = crear_perfil(self.santiago, 2, genero='M')
+        c = crear_perfil(self.valpo, 3, genero='F')
+        a.servicios.add(self.masajes)
+        self.masajes.perfiles.add(c)
+        b.tags.add(self.rubia)
+
+        data = self.facetas()
+        self.assertEqual(data['ciudad'], {'santiago': 2, 'valparaiso': 1})
+        self.assertEqual(data['genero'], {'F': 2, 'M': 1})
+        self.assertEqual(data['servicio'], {'masajes': 2})
+        self.assertEqual(data['tag'], {'rubia': 1})
+
+        # Condicionadas a la ciudad (las ciudades siguen siendo globales)
+        data = self.facetas(ciudad='santiago')
+        self.assertEqual(data['ciudad'], {'santiago': 2, 'valparaiso': 1})
+        self.assertEqual(data['genero'], {'F': 1, 'M': 1})
+        self.assertEqual(data['servicio'], {'masajes': 1})
+
+        # Cambio de ciudad (usa la ciudad original cargada con from_db)
+        perfil = PerfilModelo.objects.get(pk=a.pk)
+        perfil.ciudad = self.valpo
+        perfil.save()
+        self.assertEqual(self.facetas()['ciudad'], {'santiago': 1, 'valparaiso': 2})
+        self.assertEqual(self.facetas(ciudad='valparaiso')['servicio'], {'masajes': 2})
+
+        # Visibilidad
+        c.refresh_from_db()
+        c.esta_publico = False
+        c.save()
+        self.assertEqual(self.facetas(ciudad='valparaiso')['servicio'], {'masajes': 1})
+
+        # Igual que reconstruir desde cero
+        antes = self.facetas(ciudad='valparaiso')
+        call_command('reconstruir_facetas', stdout=StringIO())
+        self.assertEqual(self.facetas(ciudad='valparaiso'), antes)
+
+    def test_deltas_de_relaciones_y_borrado(self):
+        a = crear_perfil(self.santiago, 1)
+        b = crear_perfil(self.santiago, 2)
+        a.tags.add(self.rubia)
+        a.tags.add(self.rubia)  # Repetido: no suma
+        self.rubia.perfiles.add(b)
+        self.assertEqual(self.facetas()['tag'], {'rubia': 2})
+
+        b.tags.remove(self.rubia)
+        b.tags.remove(self.rubia)  # Ya no estaba: no resta
+        self.assertEqual(self.facetas()['tag'], {'rubia': 1})
+
+        self.rubia.perfiles.clear()
+        self.assertEqual(self.facetas()['tag'], {})
+
+        a.servicios.add(self.masajes)
+        a.delete()
+        data = self.facetas()
+        self.assertEqual((data['ciudad'], data['servicio']), ({'santiago': 1}, {}))
+
+        # Mismo resultado que recontar todo
+        antes = self.facetas(ciudad='santiago')
+        call_command('reconstruir_facetas', stdout=StringIO())
+        self.assertEqual(self.facetas(ciudad='santiago'), antes)
+
+    def test_renombre_y_borrado_de_catalogo(self):
+        a = crear_perfil(self.santiago, 1)
+        a.tags.add(self.rubia)
+        a.servicios.add(self.masajes)
+
+        with mock.patch('perfiles.facetas.reconstruir') as reconstruir:
+            self.rubia.categoria = "Pelo"
+            self.rubia.save()  # Sin cambio de slug: no toca las facetas
+            self.assertEqual(self.facetas()['tag'], {'rubia': 1})
+
+            self.rubia.slug = 'rubias'
+            self.rubia.save()
+            self.assertEqual(self.facetas(ciudad='santiago')['tag'], {'rubias': 1})
+
+            self.masajes.delete()
+            self.assertEqual(self.facetas()['servicio'], {})
+        reconstruir.assert_not_called()
+
+        antes = self.facetas(ciudad='santiago')
+        call_command('reconstruir_facetas', stdout=StringIO())
+        self.assertEqual(self.facetas(ciudad='santiago'), antes)
+
+    def test_ciudad_inexistente(self):
+        self.assertEqual(self.client.get('/api/profiles/facetas/', {'ciudad': 'x'}).status_code, 404)
+
+
+class BitmapFiltrosTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ciudad = Ciudad.objects.create(nombre="Santiago")
+        masajes = Servicio.objects.create(nombre="Masajes")
+        parejas = Servicio.objects.create(nombre="Parejas")
+        rubia = Tag.objects.create(nombre="Rubia")
+        morena = Tag.objects.create(nombre="Morena")
+        cls.a = crear_perfil(ciudad, 1)
+        cls.b = crear_perfil(ciudad, 2)
+        cls.c = crear_perfil(ciudad, 3)
+        cls.a.servicios.add(masajes, parejas)
+        cls.b.servicios.add(masajes)
+        cls.c.servicios.add(parejas)
+        cls.a.tags.add(rubia)
+        cls.b.tags.add(morena)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def ids(self, **params):
+        response = self.client.get('/api/profiles/', {'view': 'card', **params})
+        self.assertEqual(response.status_code, 200)
+        return {p['id'] for p in response.data['results']}
+
+    def test_and_or(self):
+        a, b, c = self.a.pk, self.b.pk, self.c.pk
+        self.assertEqual(self.ids(servicio='masajes,parejas'), {a})
+        self.assertEqual(self.ids(servicio='masajes|parejas'), {a, b, c})
+        self.assertEqual(self.ids(servicio='masajes|parejas', tags='rubia|morena'), {a, b})
+        self.assertEqual(self.ids(servicio='Parejas', tags='rubia|x'), {a})
+        self.assertEqual(self.ids(servicio='masajes,inexistente'), set())
+
+    def test_se_refresca_con_los_cambios(self):
+        self.assertEqual(self.ids(servicio='masajes,parejas'), {self.a.pk})
+        self.b.servicios.add(Servicio.objects.get(slug='parejas'))
+        self.assertEqual(self.ids(servicio='masajes,parejas'), {self.a.pk, self.b.pk})
+
+    def test_solo_relaciones_y_visibilidad_lo_rearman(self):
+        indice = bitmaps.get_indice()
+        perfil = PerfilModelo.objects.get(pk=self.c.pk)
+        perfil.biografia = "Otra biografía"
+        perfil.save()
+        self.assertIs(bitmaps.get_indice(), indice)
+
+        perfil.esta_publico = False
+        perfil.save()
+        self.assertIsNot(bitmaps.get_indice(), indice)
+        self.assertEqual(self.ids(servicio='parejas'), {self.a.pk})
+
+    def test_fallback_con_muchos_ids(self):
+        with mock.patch.object(bitmaps, 'MAX_IDS', 0):
+            self.assertEqual(self.ids(servicio='masajes|parejas', tags='rubia|morena'), {self.a.pk, self.b.pk})
+
+    def test_bits(self):
+        ids = [1, 7, 8, 9, 1000]
+        self.assertEqual(bitmaps.a_ids(bitmaps.a_bits(ids)), ids)
+        self.assertEqual(bitmaps.a_ids(0), [])
+
+
+class RangosTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.joven = crear_perfil(ciudad, 1, edad=21, altura=160, peso=50)
+        cls.mayor = crear_perfil(ciudad, 2, edad=35, altura=175, peso=65)
+        crear_perfil(ciudad, 3)  # Sin datos físicos: no entra en ningún rango
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def ids(self, **params):
+        response = self.client.get('/api/profiles/', {'view': 'card', **params})
+        self.assertEqual(response.status_code, 200)
+        return {p['id'] for p in response.data['results']}
+
+    def test_rangos(self):
+        self.assertEqual(self.ids(edad_min=18, edad_max=25), {self.joven.pk})
+        self.assertEqual(self.ids(edad_min=21, altura_min=170), {self.mayor.pk})
+        self.assertEqual(self.ids(peso_max=65), {self.joven.pk, self.mayor.pk})
+        self.assertEqual(self.ids(peso_min=51, peso_max=64), set())
+
+
+class RotacionTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ciudad = Ciudad.objects.create(nombre="Santiago")
+        for n in range(7):
+            crear_perfil(ciudad, n)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def recorrer(self):
+        response = self.client.get('/api/profiles/', {'ordering': 'orden_rotacion', 'paginacion': 'cursor', 'page_size': 3})
+        vistos = [p['id'] for p in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            vistos += [p['id'] for p in response.data['results']]
+        return vistos
+
+    def test_orden_estable_y_keyset(self):
+        # Empates en la clave: el desempate por id mantiene el orden total entre páginas
+        PerfilModelo.objects.filter(pk__in=PerfilModelo.objects.order_by('pk').values('pk')[:3]).update(orden_rotacion=5)
+        vistos = self.recorrer()
+        esperados = list(PerfilModelo.objects.order_by('orden_rotacion', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(self.recorrer(), vistos)
+
+    def rotar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rotar_catalogo', stdout=StringIO())
+
+    def test_resorteo(self):
+        self.rotar()
+        claves = set(PerfilModelo.objects.values_list('orden_rotacion', flat=True))
+        self.assertGreater(len(claves), 1)
+        self.assertEqual(self.recorrer(), list(
+            PerfilModelo.objects.order_by('orden_rotacion', '-id').values_list('id', flat=True)
+        ))
+
+    def test_cursor_sobrevive_un_resorteo(self):
+        esperados = list(PerfilModelo.objects.order_by('orden_rotacion', '-id').values_list('id', flat=True))
+        response = self.client.get('/api/profiles/', {'ordering': 'orden_rotacion', 'paginacion': 'cursor', 'page_size': 3})
+        vistos = [p['id'] for p in response.data['results']]
+        siguiente = response.data['next']
+
+        # Un sorteo a mitad del scroll: el cursor sigue sobre la clave de su época, aunque
+        # la caché se pierda (reinicio o recorte): las épocas salen de la BD
+        self.rotar()
+        cache.clear()
+        response = self.client.get(siguiente)
+        self.assertEqual(response.status_code, 200)
+        vistos += [p['id'] for p in response.data['results']]
+        siguiente = response.data['next']
+        self.assertEqual(vistos, esperados[:6])
+
+        # Dos sorteos después ya no hay clave con qué seguir
+        self.rotar()
+        self.assertEqual(self.client.get(siguiente).status_code, 400)
+
+
+class RankingTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ciudad = Ciudad.objects.create(nombre="Santiago")
+        cls.plan = Plan.objects.create(nombre="Premium", precio=30000, dias_contratados=30)
+        cls.a = crear_perfil(ciudad, 1)
+        cls.b = crear_perfil(ciudad, 2)
+        cls.cliente = CustomUser.objects.create_user(username="cliente", email="cliente@example.com", password="x")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def score(self, perfil):
+        perfil.refresh_from_db(fields=['ranking_score'])
+        return perfil.ranking_score
+
+    def test_incremental(self):
+        inicial = self.score(self.b)
+        self.assertGreater(inicial, 0)  # Recencia
+
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.b)
+        con_like = self.score(self.b)
+        self.assertGreater(con_like, inicial)
+        # El like suma solo su término, con el mismo resultado que recalcular todo
+        ranking.recalcular(PerfilModelo.objects.filter(pk=self.b.pk))
+        self.assertAlmostEqual(self.score(self.b), con_like, places=3)
+
+        PerfilLike.objects.filter(perfil_modelo=self.b).delete()
+        self.assertAlmostEqual(self.score(self.b), inicial, places=3)
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.b)
+
+        self.b.refresh_from_db()
+        self.b.biografia = "Hola"
+        self.b.save()
+        self.assertGreater(self.score(self.b), con_like)
+
+        antes = self.score(self.a)
+        Suscripcion.objects.create(user=self.a.user, plan=self.plan, fecha_expiracion=timezone.now() + timedelta(days=5))
+        self.assertAlmostEqual(self.score(self.a) - antes, 20)
+
+    def test_orden_y_reconstruccion(self):
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.a)
+        response = self.client.get('/api/profiles/', {'ordering': '-ranking_score', 'view': 'card'})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.a.pk, self.b.pk])
+
+        esperado = self.score(self.a)
+        PerfilModelo.objects.update(ranking_score=0)
+        call_command('recalcular_ranking', stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.a), esperado, places=2)
+
+    def test_save_completo_no_pisa_campos_derivados(self):
+        viejo = PerfilModelo.objects.get(pk=self.a.pk)
+        PerfilLike.objects.create(user=self.cliente, perfil_modelo=self.a)
+        viejo.nombre_artistico = "Otro nombre"
+        viejo.save()
+        viejo.refresh_from_db()
+        self.assertEqual(viejo.likes_count, 1)
+        self.assertEqual(viejo.nombre_artistico, "Otro nombre")
+
+
+    def test_save_parcial_solo_corre_los_pasos_afectados(self):
+        # Aprobar un cambio de ciudad: reindexa la búsqueda, pero no toca ranking ni visibilidad
+        self.a.ciudad = Ciudad.objects.create(nombre="Temuco")
+        with mock.patch('perfiles.ranking.recalcular') as recalcular_ranking, \
+                mock.patch('perfiles.visibilidad.recalcular') as recalcular_visibilidad, \
+                mock.patch('perfiles.signals.reindexar_busqueda') as reindexar:
+            self.a.save(update_fields=['ciudad', 'updated_at'])
+        reindexar.assert_called_once()
+        recalcular_ranking.assert_not_called()
+        recalcular_visibilidad.assert_not_called()
+
+class PerfilesSimilaresTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.santiago = Ciudad.objects.create(nombre="Santiago")
+        valpo = Ciudad.objects.create(nombre="Valparaíso")
+        cls.masajes = Servicio.objects.create(nombre="Masajes")
+        cls.parejas = Servicio.objects.create(nombre="Parejas")
+        cls.rubia = Tag.objects.create(nombre="Rubia")
+        cls.a = crear_perfil(cls.santiago, 1)
+        cls.b = crear_perfil(cls.santiago, 2)
+        cls.c = crear_perfil(cls.santiago, 3)
+        cls.otra_ciudad = crear_perfil(valpo, 4)
+        for perfil in (cls.a, cls.b, cls.otra_ciudad):
+            perfil.servicios.add(cls.masajes, cls.parejas)
+            perfil.tags.add(cls.rubia)
+        cls.c.servicios.add(cls.masajes)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def similares(self, perfil):
+        response = self.client.get(f'/api/profiles/public/{perfil.slug}/similares/')
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.data]
+
+    def test_calculo_completo(self):
+        call_command('calcular_similares', stdout=StringIO())
+        # Jaccard: a-b = 1, a-c = 1/3; otra ciudad excluida
+        self.assertEqual(self.similares(self.a), [self.b.pk, self.c.pk])
+        self.assertEqual(self.similares(self.c), [self.b.pk, self.a.pk])
+        puntajes = PerfilSimilar.objects.filter(perfil=self.a).values_list('puntaje', flat=True)
+        self.assertEqual([round(p, 3) for p in puntajes], [1.0, 0.333])
+
+    def test_actualizacion_incremental(self):
+        call_command('calcular_similares', stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c.servicios.add(self.parejas)
+            self.c.tags.add(self.rubia)
+        # c ahora es idéntico a a y b (empate: primero el más nuevo)
+        self.assertEqual(self.similares(self.a), [self.c.pk, self.b.pk])
+        self.assertEqual(self.similares(self.c), [self.b.pk, self.a.pk])
+
+        esperado = {p.pk: self.similares(p) for p in (self.a, self.b, self.c)}
+        call_command('calcular_similares', '--ciudad', 'santiago', stdout=StringIO())
+        self.assertEqual({p.pk: self.similares(p) for p in (self.a, self.b, self.c)}, esperado)
+
+    def test_patch_recalcula_una_vez(self):
+        self.client.force_authenticate(self.c.user)
+        with mock.patch.object(similares, 'actualizar_perfil') as actualizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch('/api/profiles/mi-perfil/', {
+                    'servicios': [self.masajes.pk, self.parejas.pk], 'tags': [self.rubia.pk],
+                }, format='json')
+        self.assertEqual(response.status_code, 200)
+        actualizar.assert_called_once_with(self.c.pk)
+
+    def test_bits_empaquetados(self):
+        matriz = similares.MatrizCiudad(self.santiago.pk)
+        self.assertEqual(matriz.bits.dtype, np.uint8)
+        self.assertEqual(matriz.tamanos.tolist(), [3, 3, 1])
+        self.assertAlmostEqual(float(matriz.jaccard([0])[0][2]), 1 / 3, places=5)
+
+
+def imagen_subida(nombre='foto.jpg', ancho=2000, alto=1500, modo='RGB', color=(200, 30, 30)):
+    contenido = BytesIO()
+    formato = 'PNG' if nombre.endswith('.png') else 'JPEG'
+    Image.new(modo, (ancho, alto), color).save(contenido, formato)
+    return SimpleUploadedFile(nombre, contenido.getvalue(), content_type=f'image/{formato.lower()}')
+
+
+class ImagenesPipelineTests(CacheLocalTestCase):
+    """Subida cruda + procesamiento fuera del request (perfiles.imagenes), con storage local."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.perfil = crear_perfil(Ciudad.objects.create(nombre="Santiago"), 1)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(
+            PERFILES_IMAGENES_MODO='worker',
+            MEDIA_URL='/media/',
+            STORAGES={
+                'default': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': media.name},
+                },
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        ))
+        self.client = APIClient()
+        self.client.force_authenticate(self.perfil.user)
+
+    def test_subida_queda_pendiente_hasta_procesarse(self):
+        response = self.client.post('/api/profiles/mi-galeria/', {'imagen': imagen_subida(), 'es_publica': True}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['estado'], 'pendiente')
+        self.assertIsNone(response.data['imagen'])
+
+        foto = GaleriaFoto.objects.get()
+        crudo = foto.imagen.name
+        self.assertTrue(crudo.endswith('.jpg'))
+        # El público no ve fotos pendientes
+        self.assertEqual(self.client.get(f'/api/profiles/public/{self.perfil.slug}/').data['galeria_fotos'], [])
+
+        call_command('procesar_imagenes', '--una-vez', stdout=StringIO())
+
+        foto.refresh_from_db()
+        self.assertEqual(foto.imagen_estado, 'lista')
+        self.assertTrue(foto.imagen.name.endswith('.webp'))
+        self.assertFalse(foto.imagen.storage.exists(crudo))
+        # Tres anchos desde una sola subida; la imagen del campo es la más grande
+        self.assertEqual(sorted(foto.imagen_variantes, key=int), ['320', '640', '1200'])
+        self.assertEqual(foto.imagen_variantes['1200'], foto.imagen.name)
+        for ancho, nombre in foto.imagen_variantes.items():
+            with Image.open(foto.imagen.storage.open(nombre)) as variante:
+                self.assertEqual(variante.width, int(ancho))
+
+        galeria = self.client.get(f'/api/profiles/public/{self.perfil.slug}/').data['galeria_fotos']
+        self.assertEqual([f['id'] for f in galeria], [foto.pk])
+        self.assertIsNotNone(galeria[0]['imagen'])
+        self.assertEqual([v['ancho'] for v in galeria[0]['variantes']], [320, 640, 1200])
+
+    def test_guardar_sin_cambiar_fotos_no_las_reprocesa(self):
+        self.perfil.foto_perfil = imagen_subida('avatar.jpg')
+        self.perfil.save()
+        self.assertEqual(self.perfil.foto_perfil_estado, 'pendiente')
+        self.assertTrue(imagenes.procesar('PerfilModelo', self.perfil.pk, 'foto_perfil'))
+        # Solo una llamada la toma
+        self.assertFalse(imagenes.procesar('PerfilModelo', self.perfil.pk, 'foto_perfil'))
+
+        # Una instancia vieja (foto cruda en memoria) no pisa la procesada
+        self.perfil.biografia = "Hola"
+        self.perfil.save()
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.foto_perfil_estado, 'lista')
+        self.assertTrue(self.perfil.foto_perfil.name.endswith('.webp'))
+
+        # Quitar la foto sí se guarda
+        self.perfil.foto_perfil = None
+        self.perfil.save()
+        self.perfil.refresh_from_db()
+        self.assertFalse(self.perfil.foto_perfil)
+
+    def test_retoma_las_trabadas_en_procesando(self):
+        foto = GaleriaFoto.objects.create(perfil_modelo=self.perfil, imagen=imagen_subida())
+        # Un worker la tomó y murió a mitad
+        GaleriaFoto.objects.filter(pk=foto.pk).update(imagen_estado='procesando', imagen_estado_desde=timezone.now())
+
+        call_command('procesar_imagenes', '--una-vez', stdout=StringIO())
+        foto.refresh_from_db()
+        self.assertEqual(foto.imagen_estado, 'procesando')  # Todavía dentro del timeout
+
+        GaleriaFoto.objects.filter(pk=foto.pk).update(imagen_estado_desde=timezone.now() - timedelta(hours=1))
+        call_command('procesar_imagenes', '--una-vez', stdout=StringIO())
+        foto.refresh_from_db()
+        self.assertEqual(foto.imagen_estado, 'lista')
+        self.assertTrue(foto.imagen.name.endswith('.webp'))
+
+    def test_error_de_procesamiento(self):
+        foto = GaleriaFoto.objects.create(
+            perfil_modelo=self.perfil,
+            imagen=SimpleUploadedFile('rota.jpg', b'no es una imagen', content_type='image/jpeg'),
+        )
+        with self.assertLogs('xscort', 'ERROR'):
+            self.assertFalse(imagenes.procesar('GaleriaFoto', foto.pk, 'imagen'))
+        foto.refresh_from_db()
+        self.assertEqual(foto.imagen_estado, 'error')
+        self.assertTrue(foto.imagen.storage.exists(foto.imagen.name))
+
+    @override_settings(PERFILES_IMAGENES_MODO='sincrono')
+    def test_modo_sincrono(self):
+        self.perfil.foto_portada = imagen_subida('portada.png', ancho=500, alto=400)
+        self.perfil.save()
+        self.assertEqual(self.perfil.foto_portada_estado, 'lista')
+        self.assertTrue(self.perfil.foto_portada.name.endswith('.webp'))
+        # No se agranda: 320 y el ancho original
+        self.assertEqual(sorted(self.perfil.foto_portada_variantes, key=int), ['320', '500'])
+
+    @override_settings(PERFILES_IMAGENES_MODO='sincrono')
+    def test_misma_foto_se_guarda_una_vez(self):
+        contenido = imagen_subida().read()
+        subir = lambda: GaleriaFoto.objects.create(
+            perfil_modelo=self.perfil, imagen=SimpleUploadedFile('foto.jpg', contenido, content_type='image/jpeg'),
+        )
+        primera, segunda = subir(), subir()
+        self.assertEqual(primera.imagen_variantes, segunda.imagen_variantes)
+        self.assertEqual(ArchivoMedia.objects.count(), 3)
+        # La portada tiene los mismos anchos que la galería: mismos archivos
+        self.perfil.foto_portada = SimpleUploadedFile('portada.jpg', contenido, content_type='image/jpeg')
+        self.perfil.save()
+        self.assertEqual(self.perfil.foto_portada_variantes, primera.imagen_variantes)
+        self.assertEqual(ArchivoMedia.objects.count(), 3)
+
+        storage = primera.imagen.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.delete()
+            segunda.delete()
+        # Siguen en uso por la portada
+        self.assertTrue(all(storage.exists(nombre) for nombre in segunda.imagen_variantes.values()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.foto_portada = None
+            self.perfil.save()
+        self.assertEqual(ArchivoMedia.objects.count(), 0)
+        self.assertFalse(any(storage.exists(nombre) for nombre in segunda.imagen_variantes.values()))
+
+    @override_settings(PERFILES_IMAGENES_MAX_PIXELES=1000 * 1000)
+    def test_rechaza_imagenes_sobre_el_presupuesto_de_pixeles(self):
+        response = self.client.post('/api/profiles/mi-galeria/', {'imagen': imagen_subida()}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('imagen', response.data)
+
+    @override_settings(PERFILES_IMAGENES_MODO='sincrono')
+    def test_tarjeta_usa_la_variante_chica(self):
+        self.perfil.foto_perfil = imagen_subida('avatar.jpg')
+        self.perfil.save()
+        tarjeta = self.client.get('/api/profiles/?view=card').data['results'][0]
+        self.assertEqual(tarjeta['foto'], 'http://testserver/media/' + self.perfil.foto_perfil_variantes['320'])
+        self.assertEqual([v['ancho'] for v in tarjeta['foto_variantes']], [320, 640, 800])
+        self.assertTrue(all(v['url'].startswith('http://testserver/') for v in tarjeta['foto_variantes']))
+
+
+class ComprimirImagenTests(CacheLocalTestCase):
+
+    def test_jpeg_se_decodifica_reducido(self):
+        img = utils._abrir(imagen_subida(ancho=4000, alto=3000), 1200)
+        # draft: 1/2 de resolución (1/4 ya no alcanzaría para 1200px)
+        self.assertEqual(img.size, (2000, 1500))
+        self.assertEqual(Image.open(utils.comprimir_imagen(imagen_subida(ancho=4000, alto=3000))).width, 1200)
+
+    def test_alfa_opaco_se_descarta(self):
+        opaca = utils.comprimir_imagen(imagen_subida('opaca.png', 600, 400, 'RGBA', (10, 20, 30, 255)))
+        translucida = utils.comprimir_imagen(imagen_subida('translucida.png', 600, 400, 'RGBA', (10, 20, 30, 128)))
+        self.assertEqual(Image.open(opaca).mode, 'RGB')
+        self.assertEqual(Image.open(translucida).mode, 'RGBA')
+
+    @override_settings(PERFILES_IMAGENES_MAX_PIXELES=1000 * 1000)
+    def test_presupuesto_de_pixeles(self):
+        with self.assertRaises(utils.ImagenDemasiadoGrande):
+            utils.generar_variantes(imagen_subida(), [320, 1200])
+
+
+class GuardadoPerfilTests(CacheLocalTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.santiago = Ciudad.objects.create(nombre="Santiago")
+        cls.valpo = Ciudad.objects.create(nombre="Valparaíso")
+        cls.perfil = crear_perfil(cls.santiago, 1)
+
+    def primera_escritura(self, queries):
+        return next(q['sql'] for q in queries if not q['sql'].startswith(('SELECT', 'SAVEPOINT')))
+
+    def test_save_no_relee_la_fila(self):
+        perfil = PerfilModelo.objects.get(pk=self.perfil.pk)
+        perfil.ciudad = self.valpo
+        with CaptureQueriesContext(connection) as ctx:
+            perfil.save(update_fields=['ciudad'])
+        self.assertTrue(ctx.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(PerfilModelo.objects.filter(ciudad=self.valpo).count(), 1)
+
+    def test_save_completo_omite_fotos_sin_cambios(self):
+        perfil = PerfilModelo.objects.get(pk=self.perfil.pk)
+        perfil.biografia = "Hola"
+        with CaptureQueriesContext(connection) as ctx:
+            perfil.save()
+        update = self.primera_escritura(ctx.captured_queries)
+        self.assertTrue(update.startswith('UPDATE'))
+        self.assertIn('"biografia"', update)
+        self.assertNotIn('"foto_perfil"', update)
+
+    def test_slug_repetido_en_una_query(self):
+        user = CustomUser.objects.create_user(username="otra", email="otra@example.com", password="x")
+        perfil = PerfilModelo(user=user, ciudad=self.santiago, nombre_artistico="Modelo 1")
+        with CaptureQueriesContext(connection) as ctx:
+            perfil.save()
+        consultas_slug = [q for q in ctx.captured_queries if 'perfilmodelo"."slug" LIKE' in q['sql']]
+        self.assertEqual(len(consultas_slug), 1)
+        self.assertNotEqual(perfil.slug, self.perfil.slug)
+        self.assertTrue(perfil.slug.startswith(self.perfil.slug + '-'))
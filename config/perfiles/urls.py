@@ -9,6 +9,8 @@ urlpatterns = [
     path('servicios/', views.ServicioListView.as_view(), name='listar_servicios'),
     path('tags/', views.TagListView.as_view(), name='listar_tags'),
     path('servicios-catalogo/', views.ServicioCatalogoView.as_view(), name='servicios-catalogo'),
+    path('catalogos/', views.CatalogosView.as_view(), name='catalogos'),
+    path('facetas/', views.FacetasView.as_view(), name='facetas'),
 
     # --- 2. GESTIÓN PRIVADA (¡ESTO DEBE IR PRIMERO!) ---
     # Al poner esto arriba, Django revisa si es "mi-perfil" ANTES de pensar que es un slug
@@ -20,12 +22,15 @@ urlpatterns = [
 
     # --- 3. PERFILES PÚBLICOS ---
     path('', views.PerfilModeloListView.as_view(), name='listar_perfiles'),
+    path('autocomplete/', views.AutocompletarView.as_view(), name='autocompletar'),
     
     # INTERACCIONES
     path('<int:perfil_id>/like/', views.ToggleLikeView.as_view(), name='toggle_like'),
+    path('likes/status/', views.EstadoLikesView.as_view(), name='estado_likes'),
     path('likes/', views.MisLikesView.as_view(), name='listar_mis_likes'),
 
     # --- 4. DETALLE POR SLUG (¡ESTO DEBE IR AL FINAL!) ---
     # Esta ruta atrapa "cualquier cosa". Si la pones arriba, se come a las demás.
     path('public/<slug:slug>/', views.PerfilModeloDetailView.as_view(), name='ver_perfil'),
+    path('public/<slug:slug>/similares/', views.PerfilesSimilaresView.as_view(), name='perfiles_similares'),
 ]
\ No newline at end of file
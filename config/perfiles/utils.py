@@ -1,46 +1,104 @@
 # utils.py
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.files import File
 from PIL import Image
 import os
 
-def comprimir_imagen(image, max_width=1200):
-    """
-    Recibe un ImageFieldFile, lo redimensiona y lo convierte a WebP.
-    Retorna un objeto File de Django listo para guardar.
-    """
-    if not image:
-        return None
+# Sobre este tamaño el WebP resultante pasa de memoria a un archivo temporal en disco
+MAX_BYTES_EN_MEMORIA = 1024 * 1024
+
+
+class ImagenDemasiadoGrande(ValueError):
+    pass
+
 
-    # Abrir la imagen con Pillow
+def _pixeles(image):
+    # Solo lee la cabecera: no decodifica la imagen
+    with Image.open(image) as img:
+        return img.width * img.height
+
+
+def validar_pixeles(image):
+    """Validador de los ImageField: rechaza imágenes sobre PERFILES_IMAGENES_MAX_PIXELES."""
+    if not image or getattr(image, '_committed', False):  # Solo archivos recién subidos
+        return
+    posicion = image.tell()
+    try:
+        if _pixeles(image) > settings.PERFILES_IMAGENES_MAX_PIXELES:
+            raise ValidationError("La imagen tiene demasiada resolución.")
+    finally:
+        image.seek(posicion)
+
+
+def _abrir(image, max_width):
+    # Abrir la imagen con Pillow (solo la cabecera; los píxeles se decodifican más abajo)
     img = Image.open(image)
-    
+    if img.width * img.height > settings.PERFILES_IMAGENES_MAX_PIXELES:
+        raise ImagenDemasiadoGrande(f"{img.width}x{img.height} supera PERFILES_IMAGENES_MAX_PIXELES")
+
+    # JPEG: decodificar directo a 1/2, 1/4 u 1/8 de la resolución si sigue alcanzando para max_width
+    if img.format == 'JPEG' and img.width > max_width:
+        img.draft('RGB', (max_width, img.height * max_width // img.width))
+
     # Manejar transparencia (PNG) para evitar fondos negros si conviertes a RGB
     # WebP soporta transparencia, así que mantenemos RGBA si existe
-    if img.mode in ('RGBA', 'LA'):
-        # Si prefieres quitar transparencia y poner fondo blanco:
-        # background = Image.new('RGB', img.size, (255, 255, 255))
-        # background.paste(img, mask=img.split()[3])
-        # img = background
-        pass
-    else:
+    if img.mode not in ('RGBA', 'LA'):
         img = img.convert('RGB')
+    return img
+
+
+def _quitar_alfa_opaco(img):
+    # Un canal alfa sin transparencias solo agranda el archivo: se descarta
+    if img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema() == (255, 255):
+        return img.convert('RGB')
+    return img
 
-    # Redimensionar si es muy grande (manteniendo ratio)
+
+def _reducir(img, max_width):
+    # Redimensionar si es muy grande (manteniendo ratio). reducing_gap reduce primero
+    # por un factor entero (barato) y aplica LANCZOS sobre la imagen ya achicada
     if img.width > max_width:
         ratio = max_width / float(img.width)
         height = int((float(img.height) * float(ratio)))
-        img = img.resize((max_width, height), Image.Resampling.LANCZOS)
+        img = img.resize((max_width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
 
-    # Guardar en memoria como WebP
-    im_io = BytesIO()
+def _a_webp(img, nombre):
+    # Guardar como WebP (en memoria hasta MAX_BYTES_EN_MEMORIA) y retornar el archivo compatible con Django
+    im_io = SpooledTemporaryFile(max_size=MAX_BYTES_EN_MEMORIA)
     img.save(im_io, 'WEBP', quality=85, optimize=True)
-    
-    # Crear el nuevo nombre de archivo
-    nombre_original = os.path.basename(image.name)
-    nombre_sin_ext = os.path.splitext(nombre_original)[0]
-    nuevo_nombre = f"{nombre_sin_ext}.webp"
-
-    # Retornar el archivo compatible con Django
-    new_image = File(im_io, name=nuevo_nombre)
-    return new_image
+    im_io.seek(0)
+    return File(im_io, name=nombre)
+
+
+def _nombre_base(image):
+    return os.path.splitext(os.path.basename(image.name))[0]
+
+
+def comprimir_imagen(image, max_width=1200):
+    """
+    Recibe un ImageFieldFile, lo redimensiona y lo convierte a WebP.
+    Retorna un objeto File de Django listo para guardar (cerrarlo después de guardarlo).
+    """
+    if not image:
+        return None
+    img = _quitar_alfa_opaco(_reducir(_abrir(image, max_width), max_width))
+    return _a_webp(img, f"{_nombre_base(image)}.webp")
+
+
+def generar_variantes(image, anchos):
+    """
+    Una versión WebP por cada ancho (sin agrandar la imagen), decodificando una sola vez:
+    cada variante se reduce desde la anterior, de mayor a menor.
+    Retorna [(ancho, File), ...] de menor a mayor.
+    """
+    img = _abrir(image, max(anchos))
+    base = _nombre_base(image)
+    variantes = []
+    for ancho in sorted({min(ancho, img.width) for ancho in anchos}, reverse=True):
+        img = _quitar_alfa_opaco(_reducir(img, ancho))
+        variantes.append((ancho, _a_webp(img, f"{base}_{ancho}.webp")))
+    return variantes[::-1]
@@ -0,0 +1,50 @@
+# versiones.py
+"""
+Claves de caché versionadas por modelo.
+
+Cada grupo ('ciudades', 'tags', 'servicios', 'perfiles', 'relaciones' y uno por perfil) tiene un token guardado
+en la caché compartida. Las respuestas cacheadas incluyen en su clave los tokens
+de los grupos de los que dependen, así que invalidar un grupo es solo cambiar su
+token (los signals lo hacen): las entradas viejas dejan de leerse y expiran por TTL.
+'relaciones' cubre solo los servicios/tags de perfiles visibles (perfiles.bitmaps).
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+PREFIJO = 'version:'
+
+
+def token(grupo):
+    clave = PREFIJO + grupo
+    valor = cache.get(clave)
+    if valor is None:
+        # add() para no pisar el token que otro worker haya creado al mismo tiempo
+        cache.add(clave, uuid.uuid4().hex, None)
+        valor = cache.get(clave)
+    return valor
+
+
+def invalidar(*grupos):
+    cache.set_many({PREFIJO + grupo: uuid.uuid4().hex for grupo in grupos}, None)
+
+
+def grupo_perfil(perfil_id):
+    """Grupo propio de cada perfil, para invalidar su detalle sin tocar el resto."""
+    return f'perfil:{perfil_id}'
+
+
+def tokens(grupos):
+    """Tokens de varios grupos con una sola lectura de la caché."""
+    encontrados = cache.get_many([PREFIJO + grupo for grupo in grupos])
+    return tuple(encontrados.get(PREFIJO + grupo) or token(grupo) for grupo in grupos)
+
+
+def clave(nombre, grupos, *partes):
+    """
+    clave('respuesta', ['ciudades'], '/api/profiles/ciudades/') ->
+    'respuesta:<md5 de los tokens y las partes>'
+    """
+    resumen = hashlib.md5('|'.join([*tokens(grupos), *map(str, partes)]).encode()).hexdigest()
+    return f'{nombre}:{resumen}'
@@ -2,17 +2,34 @@ from rest_framework import generics, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.db import transaction
 from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+import base64
+import datetime
+import hashlib
+import json
 import uuid
 from django.utils.text import slugify
 from django_filters.rest_framework import DjangoFilterBackend
 
 # --- CORRECCIÓN 1: Importar correctamente el filtro ---
-from .filters import PerfilFilter
+from .filters import PerfilFilter, PerfilOrderingFilter, PerfilSearchFilter
+from .search import get_backend
+from . import autocomplete, catalogos, facetas, rotacion, versiones
 
 from .models import (
     PerfilModelo, 
@@ -25,6 +42,7 @@ from .models import (
 )
 from .serializers import (
     PerfilModeloSerializer,
+    PerfilModeloCardSerializer,
     PerfilModeloUpdateSerializer,
     SolicitudCambioCiudadSerializer,
     ServicioSerializer,
@@ -35,14 +53,237 @@ from .serializers import (
 )
 
 # --- CONFIGURACIÓN DE PAGINACIÓN ---
+TOTAL_PERFILES_CACHE_SEGUNDOS = 60
+
+
+def contar_con_cache(queryset):
+    """
+    COUNT(*) del listado filtrado, cacheado por la SQL exacta de la query.
+    Evita repetir el conteo sobre el join de ciudad/tags/servicios en cada página.
+    """
+    try:
+        sql = str(queryset.order_by().query)
+    except EmptyResultSet:  # queryset.none() o un IN vacío: no hay nada que contar
+        return 0
+    key = versiones.clave('perfiles:total', ['perfiles'], sql)
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, TOTAL_PERFILES_CACHE_SEGUNDOS)
+    return total
+
+
+class ConteoCacheadoPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return contar_con_cache(self.object_list)
+
+
 class PerfilesPagination(PageNumberPagination):
+    django_paginator_class = ConteoCacheadoPaginator
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
+class PerfilesCursorPagination(BasePagination):
+    """
+    Paginación keyset para scroll infinito (?paginacion=cursor).
+    El cursor guarda el orden del listado y los valores (campo..., id) de la última fila
+    entregada; la página siguiente pide las filas estrictamente después de esa tupla.
+    Sin OFFSET ni COUNT(*): la latencia no crece con la página, y con muchos empates
+    (likes_count = 0) no se repiten ni se saltan perfiles aunque se inserten otros entre requests.
+    Con ?ordering=orden_rotacion el cursor guarda además la época del sorteo (perfiles.rotacion).
+    El total solo se calcula (cacheado) si se pide con ?total=1.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ['-id']
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(tamano, 1), self.max_page_size)
+
+    def get_orden(self, queryset):
+        """[(campo, descendente), ...] del queryset, siempre terminado en id (orden total)."""
+        orden = []
+        for entrada in queryset.query.order_by or self.ordering:
+            nombre = entrada.lstrip('-') if isinstance(entrada, str) else None
+            try:
+                campo = queryset.model._meta.get_field('id' if nombre == 'pk' else nombre)
+            except (FieldDoesNotExist, TypeError):
+                # Anotaciones como la relevancia de ?search no están en la fila: no hay keyset posible
+                raise ValidationError({'paginacion': 'La paginación por cursor requiere un ?ordering= por campo.'})
+            if not campo.concrete or campo.is_relation:
+                raise ValidationError({'paginacion': 'La paginación por cursor requiere un ?ordering= por campo.'})
+            orden.append((campo.attname, entrada.startswith('-')))
+        if not any(campo == 'id' for campo, _ in orden):
+            orden.append(('id', True))
+        return orden
+
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(codificado.encode()))
+            valido = (
+                cursor['o'] == [f"{'-' if desc else ''}{campo}" for campo, desc in self.orden]
+                and len(cursor['v']) == len(self.orden)
+            )
+            if valido:
+                # Fechas y decimales viajan como texto: se vuelven a su tipo con el campo del modelo
+                cursor['v'] = [
+                    self.modelo._meta.get_field(campo).to_python(valor)
+                    for (campo, _), valor in zip(self.orden, cursor['v'])
+                ]
+        except (ValueError, TypeError, KeyError, DjangoValidationError):
+            valido = False
+        if not valido:
+            raise ValidationError({'cursor': 'Cursor inválido para este listado.'})
+        return cursor
+
+    def get_columnas(self, cursor):
+        """
+        Columnas por las que se pagina. Un cursor de la época de rotación anterior sigue
+        sobre orden_rotacion_anterior; uno más viejo ya no tiene clave con qué seguir.
+        """
+        self.epoca = None
+        if not any(campo in rotacion.COLUMNA_ANTERIOR for campo, _ in self.orden):
+            return self.orden
+        actual, anterior = rotacion.epocas()
+        self.epoca = cursor.get('e') if cursor else actual
+        if self.epoca == actual:
+            return self.orden
+        if self.epoca is not None and self.epoca == anterior:
+            return [(rotacion.COLUMNA_ANTERIOR.get(campo, campo), desc) for campo, desc in self.orden]
+        raise ValidationError({'cursor': 'El orden de rotación se volvió a sortear: vuelve a la primera página.'})
+
+    def encode_cursor(self, fila, hacia_atras):
+        cursor = {
+            'o': [f"{'-' if desc else ''}{campo}" for campo, desc in self.orden],
+            # isoformat() conserva los microsegundos; DjangoJSONEncoder los corta a milisegundos
+            # y filas distintas dentro del mismo milisegundo se saltarían o repetirían
+            'v': [
+                valor.isoformat() if isinstance(valor, datetime.datetime) else valor
+                for valor in (getattr(fila, campo) for campo, _ in self.columnas)
+            ],
+            'r': hacia_atras,
+        }
+        if self.epoca is not None:
+            cursor['e'] = self.epoca
+        codificado = base64.urlsafe_b64encode(json.dumps(cursor, cls=DjangoJSONEncoder).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado)
+
+    def despues_de(self, valores, hacia_atras):
+        """
+        Comparación de tuplas (campo_1, ..., id) > / < (v_1, ..., v_id) con la dirección de
+        cada campo: OR de "iguales hasta i-1 y posterior en i". El rango sobre el primer campo
+        es redundante pero le permite al planner acotar el recorrido del índice.
+        """
+        condicion = Q()
+        iguales = Q()
+        for (campo, desc), valor in zip(self.columnas, valores):
+            menor = desc != hacia_atras
+            condicion |= iguales & Q(**{f"{campo}__{'lt' if menor else 'gt'}": valor})
+            iguales &= Q(**{campo: valor})
+        campo, desc = self.columnas[0]
+        return Q(**{f"{campo}__{'lte' if desc != hacia_atras else 'gte'}": valores[0]}) & condicion
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.modelo = queryset.model
+        self.orden = self.get_orden(queryset)
+        cursor = self.decode_cursor(request)
+        self.columnas = self.get_columnas(cursor)
+        self.total = None
+        if request.query_params.get('total') in ('1', 'true'):
+            self.total = contar_con_cache(queryset)
+
+        hacia_atras = bool(cursor and cursor.get('r'))
+        if cursor:
+            queryset = queryset.filter(self.despues_de(cursor['v'], hacia_atras))
+        if hacia_atras:
+            queryset = queryset.order_by(*(campo if desc else f'-{campo}' for campo, desc in self.columnas))
+        else:
+            queryset = queryset.order_by(*(f'-{campo}' if desc else campo for campo, desc in self.columnas))
+
+        tamano = self.get_page_size(request)
+        filas = list(queryset[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        if hacia_atras:
+            filas.reverse()
+            self.next = self.encode_cursor(filas[-1], False) if filas else None
+            self.previous = self.encode_cursor(filas[0], True) if hay_mas else None
+        else:
+            self.next = self.encode_cursor(filas[-1], False) if hay_mas else None
+            self.previous = self.encode_cursor(filas[0], True) if cursor and filas else None
+        return filas
+
+    def get_paginated_response(self, data):
+        respuesta = {'next': self.next, 'previous': self.previous, 'results': data}
+        if self.total is not None:
+            respuesta['count'] = self.total
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'example': 123},
+                'results': schema,
+            },
+        }
+
+
+# --- CACHÉ DE RESPUESTAS ---
+class RespuestaCacheadaMixin:
+    """
+    Cachea el resultado de list() en la caché compartida (settings.CACHES).
+    La clave incluye la URL completa y los tokens de cache_grupos (perfiles.versiones),
+    así que los signals invalidan la respuesta en cuanto cambia un modelo del que depende.
+    La respuesta cacheada es igual para todos; superponer_usuario() la personaliza.
+    """
+    cache_grupos = ()
+    cache_segundos = 300
+
+    def superponer_usuario(self, request, data):
+        """Agrega a la respuesta cacheada (compartida) los datos propios del usuario."""
+        return data
+
+    def list(self, request, *args, **kwargs):
+        key = versiones.clave('respuesta', self.cache_grupos, request.build_absolute_uri())
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = response.data
+            cache.set(key, data, self.cache_segundos)
+        return Response(self.superponer_usuario(request, data))
+
+
+def ids_con_like(user, perfil_ids):
+    """Subconjunto de perfil_ids que el usuario marcó con like (una query)."""
+    if not user.is_authenticated or not perfil_ids:
+        return set()
+    return set(
+        PerfilLike.objects.filter(user=user, perfil_modelo_id__in=perfil_ids)
+        .values_list('perfil_modelo_id', flat=True)
+    )
+
+
 # --- 1. VISTAS PÚBLICAS (Catálogos) ---
-class CiudadListView(generics.ListAPIView):
+class CiudadListView(RespuestaCacheadaMixin, generics.ListAPIView):
     queryset = Ciudad.objects.filter(activa=True).order_by('ordering', 'nombre')
     serializer_class = CiudadSerializer
     permission_classes = [permissions.AllowAny]
@@ -50,61 +291,134 @@ class CiudadListView(generics.ListAPIView):
     # AGREGAR ESTO: Desactiva paginación para que devuelva una lista simple [{},{}]
     pagination_class = None 
 
-    @method_decorator(cache_page(300))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    cache_grupos = ['ciudades']
 
-class ServicioListView(generics.ListAPIView):
+class ServicioListView(RespuestaCacheadaMixin, generics.ListAPIView):
     """Catálogo de servicios (Oral, Anal...)"""
     queryset = Servicio.objects.filter(activo=True).order_by('nombre')
     serializer_class = ServicioSerializer
     permission_classes = [permissions.AllowAny]
+    cache_grupos = ['servicios']
 
-    @method_decorator(cache_page(300))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
-
-class TagListView(generics.ListAPIView):
+class TagListView(RespuestaCacheadaMixin, generics.ListAPIView):
     """Catálogo de Tags (Rubia, Alta...)"""
     queryset = Tag.objects.all().order_by('categoria', 'nombre')
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny]
+    cache_grupos = ['tags']
+
+
+class CatalogosView(APIView):
+    """
+    GET /api/profiles/catalogos/: ciudades, servicios, servicios_catalogo y tags en una
+    sola respuesta. La 'version' (hash del contenido) es el ETag: con If-None-Match
+    vigente responde 304.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        bundle = catalogos.get_bundle()
+        etag = f'"{bundle["version"]}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(bundle)
+        response['ETag'] = etag
+        return response
+
+
+class FacetasView(APIView):
+    """
+    GET /api/profiles/facetas/?ciudad=santiago
+    Conteos de perfiles visibles para cada opción de filtro (precalculados en perfiles.facetas).
+    Con ?ciudad, género, servicios y tags se cuentan dentro de esa ciudad.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        ciudad_id = None
+        slug = request.query_params.get('ciudad')
+        if slug:
+            ciudad_id = Ciudad.objects.filter(slug=slug.lower()).values_list('id', flat=True).first()
+            if ciudad_id is None:
+                return Response({'error': 'Ciudad no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(facetas.obtener(ciudad_id))
 
 
 # --- 2. VISTAS PÚBLICAS (Perfiles) ---
 
-class PerfilModeloListView(generics.ListAPIView):
+class PerfilModeloListView(RespuestaCacheadaMixin, generics.ListAPIView):
     """
     Buscador principal. 
     Usa PerfilFilter para manejar ?ciudad=santiago&servicio=masajes
+    Con ?view=card devuelve la versión compacta para la grilla del catálogo.
     """
     serializer_class = PerfilModeloSerializer
     pagination_class = PerfilesPagination
     permission_classes = [permissions.AllowAny]
 
+    # Los contadores (likes) se actualizan sin invalidar: pueden atrasarse hasta cache_segundos
+    cache_grupos = ['perfiles', 'ciudades', 'tags', 'servicios']
+    cache_segundos = 60
+
     # --- CORRECCIÓN 2: Configurar Backends de Filtrado ---
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PerfilSearchFilter, PerfilOrderingFilter]
     
     # Conectamos tu clase de filtros personalizada
     filterset_class = PerfilFilter
     
-    # Configuración de Búsqueda de Texto (?search=...)
-    search_fields = ['nombre_artistico', 'biografia', 'ciudad__nombre', 'tags__nombre']
+    # Búsqueda de Texto (?search=...): la resuelve PerfilSearchFilter con perfiles.search
     
     # Configuración de Ordenamiento (?ordering=...)
-    ordering_fields = ['id', 'created_at', 'puntuacion'] # Ajusta según tus campos
+    # orden_rotacion: rotación pareja de la exposición, re-sorteada por `manage.py rotar_catalogo`
+    # ranking_score: relevancia precalculada (perfiles.ranking), usar ?ordering=-ranking_score
+    ordering_fields = [
+        'id', 'created_at', 'likes_count', 'rating_promedio', 'resenas_aprobadas_count',
+        'orden_rotacion', 'ranking_score',
+    ]
+
+    @property
+    def paginator(self):
+        # ?paginacion=cursor (o un ?cursor=... ya emitido) activa la paginación keyset
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('paginacion') == 'cursor' or 'cursor' in params:
+                self._paginator = PerfilesCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def es_vista_tarjeta(self):
+        return self.request.query_params.get('view') == 'card'
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'publico': True}
+
+    def superponer_usuario(self, request, data):
+        if self.es_vista_tarjeta() or not request.user.is_authenticated:
+            return data
+        # Una sola query para todos los perfiles de la página
+        likes = ids_con_like(request.user, [perfil['id'] for perfil in data['results']])
+        return {
+            **data,
+            'results': [{**perfil, 'liked_by_me': perfil['id'] in likes} for perfil in data['results']],
+        }
+
+    def get_serializer_class(self):
+        if self.es_vista_tarjeta():
+            return PerfilModeloCardSerializer
+        return PerfilModeloSerializer
 
     def get_queryset(self):
         # 1. Filtros Base de Negocio (Solo lo que DEBE verse)
-        queryset = PerfilModelo.objects.filter(
-            esta_publico=True,
-            # user__esta_verificada=True, # Descomentar cuando actives
-            # user__suscripcion__dias_restantes__gt=0,
-            # user__suscripcion__esta_pausada=False,
-        )
+        # esta_visible ya combina publicación, verificación y suscripción (perfiles.visibilidad);
+        # las reglas se activan con PERFILES_VISIBLE_REQUIERE_* en settings.
+        queryset = PerfilModelo.objects.filter(esta_visible=True)
         
-        # Optimización de DB
-        queryset = queryset.select_related('ciudad', 'user').prefetch_related('tags', 'servicios', 'galeria_fotos')
+        # Optimización de DB: número fijo de queries sin importar el page_size
+        if self.es_vista_tarjeta():
+            queryset = queryset.con_datos_tarjeta()
+        else:
+            queryset = queryset.con_datos_publicos()
         
         # NOTA: Ya no necesitamos filtrar manualmente aquí (if ciudad...). 
         # DjangoFilterBackend lo hace automáticamente usando filterset_class.
@@ -112,16 +426,145 @@ class PerfilModeloListView(generics.ListAPIView):
         return queryset.order_by('-id')
 
 
+class AutocompletarView(APIView):
+    """
+    Typeahead del buscador: GET /api/profiles/autocomplete/?q=vale
+    Devuelve nombres de perfiles, ciudades, tags y servicios que calzan por prefijo
+    o con errores de tipeo. Pensado para llamarse en cada tecla.
+    """
+    permission_classes = [permissions.AllowAny]
+    LIMITE_POR_DEFECTO = 5
+    LIMITE_MAXIMO = 10
+    LARGO_MINIMO_PERFILES = 2
+
+    def get(self, request):
+        termino = request.query_params.get('q', '').strip()
+        try:
+            limite = int(request.query_params.get('limite', self.LIMITE_POR_DEFECTO))
+        except ValueError:
+            limite = self.LIMITE_POR_DEFECTO
+        limite = max(1, min(limite, self.LIMITE_MAXIMO))
+
+        perfiles = []
+        if len(termino) >= self.LARGO_MINIMO_PERFILES:
+            queryset = PerfilModelo.objects.filter(esta_visible=True).select_related('ciudad')
+            perfiles = [
+                {
+                    'id': perfil.id,
+                    'slug': perfil.slug,
+                    'nombre_artistico': perfil.nombre_artistico,
+                    'ciudad': perfil.ciudad.nombre,
+                }
+                for perfil in get_backend().autocompletar(queryset, termino).only(
+                    'id', 'slug', 'nombre_artistico', 'ciudad__nombre'
+                )[:limite]
+            ]
+
+        return Response({
+            'perfiles': perfiles,
+            'ciudades': autocomplete.get_indice('ciudades').buscar(termino, limite),
+            'tags': autocomplete.get_indice('tags').buscar(termino, limite),
+            'servicios': autocomplete.get_indice('servicios').buscar(termino, limite),
+        }, status=status.HTTP_200_OK)
+
+
 class PerfilModeloDetailView(generics.RetrieveAPIView):
-    """Ver perfil individual por SLUG"""
+    """
+    Ver perfil individual por SLUG.
+    El payload público se cachea por perfil (grupo versiones.grupo_perfil) y se sirve
+    con ETag fuerte y Last-Modified: un If-None-Match vigente responde 304 sin serializar.
+    liked_by_me no se cachea: se superpone por usuario con una query.
+    """
     serializer_class = PerfilModeloSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
+    cache_segundos = 60 * 60
 
     def get_queryset(self):
-        return PerfilModelo.objects.filter(
-            esta_publico=True,
-            # user__esta_verificada=True,
+        # Sin usuario: el payload cacheado es el mismo para todos
+        return PerfilModelo.objects.filter(esta_visible=True).con_datos_publicos()
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'publico': True}
+
+    def clave_detalle(self, perfil_id):
+        grupos = [versiones.grupo_perfil(perfil_id), 'ciudades', 'tags', 'servicios']
+        return versiones.clave('perfil:detalle', grupos, perfil_id, self.request.get_host())
+
+    def ultima_modificacion(self, perfil):
+        """
+        Fecha del último cambio conocido del perfil y lo que se muestra con él (fotos procesadas,
+        reseñas), con los datos ya precargados. Los likes no tienen fecha: el ETag es el validador exacto.
+        """
+        fechas = [
+            perfil.updated_at, perfil.foto_perfil_estado_desde, perfil.foto_portada_estado_desde,
+            *(foto.imagen_estado_desde for foto in perfil.galeria_publica),
+            *(resena.fecha_creacion for resena in perfil.resenas_aprobadas),
+        ]
+        return max(fecha for fecha in fechas if fecha is not None)
+
+    def get_entrada(self, slug):
+        clave_slug = f'perfil:slug:{slug}'
+        perfil_id = cache.get(clave_slug)
+        if perfil_id is None:
+            perfil_id = PerfilModelo.objects.filter(slug=slug, esta_visible=True).values_list('id', flat=True).first()
+            if perfil_id is None:
+                raise Http404
+            cache.set(clave_slug, perfil_id, self.cache_segundos)
+
+        # Los tokens se leen antes que la BD: un cambio concurrente deja la entrada huérfana, no vieja
+        clave = self.clave_detalle(perfil_id)
+        entrada = cache.get(clave)
+        if entrada is not None and entrada['data']['slug'] == slug:
+            return entrada
+
+        perfil = self.get_object()  # 404 si dejó de ser visible
+        if perfil.pk != perfil_id:
+            cache.set(clave_slug, perfil.pk, self.cache_segundos)
+            clave = self.clave_detalle(perfil.pk)
+        data = self.get_serializer(perfil).data
+        contenido = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+        entrada = {
+            'id': perfil.pk,
+            'data': data,
+            'hash': hashlib.md5(contenido.encode()).hexdigest(),
+            'modificado': self.ultima_modificacion(perfil).replace(microsecond=0),
+        }
+        cache.set(clave, entrada, self.cache_segundos)
+        return entrada
+
+    def retrieve(self, request, *args, **kwargs):
+        entrada = self.get_entrada(kwargs[self.lookup_field])
+        liked_by_me = entrada['id'] in ids_con_like(request.user, [entrada['id']])
+
+        etag = f'"{entrada["hash"]}-{int(liked_by_me)}"'
+        response = get_conditional_response(request, etag=etag, last_modified=entrada['modificado'].timestamp())
+        if response is None:
+            response = Response({**entrada['data'], 'liked_by_me': liked_by_me})
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(entrada['modificado'].timestamp())
+        return response
+
+
+class PerfilesSimilaresView(generics.ListAPIView):
+    """
+    GET /api/profiles/public/<slug>/similares/
+    Perfiles parecidos de la misma ciudad (precalculados en perfiles.similares), en formato tarjeta.
+    """
+    serializer_class = PerfilModeloCardSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_queryset(self):
+        # Una búsqueda por el índice (perfil, posicion) de PerfilSimilar
+        return (
+            PerfilModelo.objects.filter(
+                esta_visible=True,
+                similar_de__perfil__slug=self.kwargs['slug'],
+                similar_de__perfil__esta_visible=True,
+            )
+            .con_datos_tarjeta()
+            .order_by('similar_de__posicion')
         )
 
 
@@ -135,6 +578,12 @@ class MiPerfilView(generics.RetrieveUpdateAPIView):
             return PerfilModeloUpdateSerializer
         return PerfilModeloSerializer
 
+    def perform_update(self, serializer):
+        # La fila y sus servicios/tags en una transacción: lo que espera al commit
+        # (perfiles similares, fotos) corre una vez por PATCH y no una por set()
+        with transaction.atomic():
+            serializer.save()
+
     def get_object(self):
         perfil, created = PerfilModelo.objects.get_or_create(user=self.request.user)
         
@@ -185,18 +634,43 @@ class ToggleLikeView(APIView):
 
     def post(self, request, perfil_id):
         perfil = get_object_or_404(PerfilModelo, id=perfil_id)
+        # likes_count se ajusta con F() en los signals de PerfilLike (perfiles.contadores)
         like, created = PerfilLike.objects.get_or_create(user=request.user, perfil_modelo=perfil)
         if not created:
             like.delete()
-            return Response({'status': 'unliked'}, status=status.HTTP_200_OK)
-        return Response({'status': 'liked'}, status=status.HTTP_201_CREATED)
+        perfil.refresh_from_db(fields=['likes_count'])
+        if not created:
+            return Response({'status': 'unliked', 'likes_count': perfil.likes_count}, status=status.HTTP_200_OK)
+        return Response({'status': 'liked', 'likes_count': perfil.likes_count}, status=status.HTTP_201_CREATED)
+
+class EstadoLikesView(APIView):
+    """
+    GET /api/profiles/likes/status/?ids=1,2,3 -> {"1": true, "2": false, "3": false}
+    Estado de like del usuario para perfiles ya cargados desde una respuesta cacheada.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_IDS = 100
+
+    def get(self, request):
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({
+                'error': 'ids debe ser una lista de enteros separados por coma'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        ids = ids[:self.MAX_IDS]
+        likes = ids_con_like(request.user, ids)
+        return Response({str(perfil_id): perfil_id in likes for perfil_id in ids})
+
 
 class MisLikesView(generics.ListAPIView):
     serializer_class = PerfilModeloSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return PerfilModelo.objects.filter(likes__user=self.request.user, esta_publico=True)
+        return PerfilModelo.objects.filter(
+            likes__user=self.request.user, esta_visible=True
+        ).con_datos_publicos(self.request.user)
 
 # --- 5. VISTA DE CATÁLOGO (Para Dropdowns) ---
     
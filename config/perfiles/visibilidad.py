@@ -0,0 +1,52 @@
+# visibilidad.py
+"""
+Estado denormalizado PerfilModelo.esta_visible: combina la publicación del perfil
+con las reglas de negocio (verificación y suscripción vigente), para que el
+catálogo público filtre con un único predicado indexado.
+
+Se recalcula desde perfiles.signals al cambiar el perfil, la verificación del
+usuario o su suscripción, y periódicamente con `manage.py recalcular_visibilidad`
+para las suscripciones que expiran solas.
+"""
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from suscripciones.models import Suscripcion
+from usuarios.models import CustomUser
+
+from . import facetas, versiones
+from .models import PerfilModelo
+
+
+def condicion_visible(ahora=None):
+    """Q que evalúa las reglas de visibilidad sin joins (con EXISTS correlacionados)."""
+    condicion = Q(esta_publico=True)
+    if getattr(settings, 'PERFILES_VISIBLE_REQUIERE_VERIFICACION', False):
+        condicion &= Q(Exists(CustomUser.objects.filter(pk=OuterRef('user_id'), esta_verificada=True)))
+    if getattr(settings, 'PERFILES_VISIBLE_REQUIERE_SUSCRIPCION', False):
+        condicion &= Q(Exists(Suscripcion.objects.filter(
+            user_id=OuterRef('user_id'),
+            esta_pausada=False,
+            fecha_expiracion__gt=ahora or timezone.now(),
+        )))
+    return condicion
+
+
+def recalcular(perfiles, ahora=None):
+    """
+    Actualiza esta_visible para un queryset de perfiles.
+    Retorna los ids cuyo estado cambió (para invalidar lo que dependa de ellos).
+    """
+    condicion = condicion_visible(ahora)
+    mostrar = list(perfiles.filter(esta_visible=False).filter(condicion).values_list('pk', flat=True))
+    ocultar = list(perfiles.filter(esta_visible=True).exclude(condicion).values_list('pk', flat=True))
+    if mostrar:
+        PerfilModelo.objects.filter(pk__in=mostrar).update(esta_visible=True)
+    if ocultar:
+        PerfilModelo.objects.filter(pk__in=ocultar).update(esta_visible=False)
+    if mostrar or ocultar:
+        versiones.invalidar('perfiles', 'relaciones', *map(versiones.grupo_perfil, mostrar + ocultar))
+        facetas.mostrar(mostrar)
+        facetas.ocultar(ocultar)
+    return mostrar + ocultar
@@ -0,0 +1,23 @@
+# signals.py
+"""
+Mantiene resenas_aprobadas_count, rating_promedio y ranking_score del perfil
+reseñado cuando una reseña se crea, se aprueba/desaprueba o se borra, e invalida
+las respuestas cacheadas del catálogo (que incluyen las reseñas aprobadas).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from perfiles import contadores, ranking, versiones
+from perfiles.models import PerfilModelo
+from .models import Resena
+
+
+@receiver(post_save, sender=Resena)
+@receiver(post_delete, sender=Resena)
+def resena_cambiada(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    perfil = PerfilModelo.objects.filter(pk=instance.perfil_modelo_id)
+    contadores.recalcular(perfil, likes=False)
+    ranking.recalcular(perfil)
+    versiones.invalidar('perfiles', versiones.grupo_perfil(instance.perfil_modelo_id))
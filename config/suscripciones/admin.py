@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Plan, Suscripcion, SolicitudSuscripcion
+from .models import Plan, Suscripcion, SolicitudSuscripcion, NotificacionSuscripcion
 
 
 @admin.register(Plan)
@@ -10,10 +10,10 @@ class PlanAdmin(admin.ModelAdmin):
 
 @admin.register(Suscripcion)
 class SuscripcionAdmin(admin.ModelAdmin):
-    list_display = ['user', 'plan', 'dias_restantes', 'esta_pausada', 'fecha_actualizacion']
+    list_display = ['user', 'plan', 'fecha_expiracion', 'dias_restantes', 'esta_pausada', 'expirada_en', 'fecha_actualizacion']
     list_filter = ['esta_pausada', 'plan']
     search_fields = ['user__username', 'user__email']
-    readonly_fields = ['fecha_inicio', 'fecha_actualizacion']
+    readonly_fields = ['fecha_inicio', 'fecha_actualizacion', 'expirada_en']
 
 
 @admin.register(SolicitudSuscripcion)
@@ -41,3 +41,11 @@ class SolicitudSuscripcionAdmin(admin.ModelAdmin):
 
         if obj.estado == 'aprobada' and old_estado != 'aprobada':
             obj.aplicar_plan()
+
+
+@admin.register(NotificacionSuscripcion)
+class NotificacionSuscripcionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'tipo', 'fecha_creacion', 'enviada_en']
+    list_filter = ['tipo']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['fecha_creacion']
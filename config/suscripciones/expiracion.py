@@ -0,0 +1,91 @@
+# expiracion.py
+"""
+Barrido de suscripciones vencidas. fecha_expiracion es la fuente de la verdad:
+no se toca dias_restantes (el "congelador" de las pausadas).
+
+Cada lote toma las suscripciones con fecha_expiracion <= ahora que aún no se
+procesaron (índice parcial suscripcion_por_expirar_idx), las marca con
+expirada_en, oculta los perfiles afectados y encola un aviso. Es idempotente:
+una suscripción ya marcada no vuelve a entrar hasta que se renueve.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NotificacionSuscripcion, Suscripcion
+
+logger = logging.getLogger('xscort')
+
+LOTE_POR_DEFECTO = 500
+
+
+def procesar_lote(ahora=None, lote=LOTE_POR_DEFECTO):
+    """Procesa hasta `lote` suscripciones recién vencidas. Retorna cuántas procesó."""
+    from perfiles import visibilidad
+    from perfiles.models import PerfilModelo
+
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        vencidas = list(
+            Suscripcion.objects.select_for_update(skip_locked=True)
+            .filter(expirada_en__isnull=True, esta_pausada=False, fecha_expiracion__lte=ahora)
+            .order_by('fecha_expiracion')
+            .values_list('pk', 'user_id')[:lote]
+        )
+        if not vencidas:
+            return 0
+
+        ids = [pk for pk, _ in vencidas]
+        user_ids = [user_id for _, user_id in vencidas]
+        Suscripcion.objects.filter(pk__in=ids).update(expirada_en=ahora)
+        NotificacionSuscripcion.objects.bulk_create([
+            NotificacionSuscripcion(user_id=user_id, suscripcion_id=pk, tipo='expirada')
+            for pk, user_id in vencidas
+        ])
+        ocultos = visibilidad.recalcular(PerfilModelo.objects.filter(user_id__in=user_ids), ahora)
+
+    logger.info("Suscripciones expiradas", extra={'procesadas': len(ids), 'perfiles_ocultos': len(ocultos)})
+    return len(ids)
+
+
+def procesar_vencidas(ahora=None, lote=LOTE_POR_DEFECTO, max_lotes=None):
+    total = 0
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        procesadas = procesar_lote(ahora, lote)
+        if not procesadas:
+            break
+        total += procesadas
+        lotes += 1
+    return total
+
+
+def enviar_notificaciones(lote=LOTE_POR_DEFECTO):
+    """Envía por email los avisos pendientes de la cola. Retorna cuántos envió."""
+    pendientes = list(
+        NotificacionSuscripcion.objects.filter(enviada_en__isnull=True)
+        .select_related('user')
+        .order_by('fecha_creacion')[:lote]
+    )
+    enviadas = []
+    for notificacion in pendientes:
+        try:
+            send_mail(
+                subject="Tu suscripción en xscort ha expirado",
+                message=(
+                    f"Hola {notificacion.user.username}, tu suscripción ha expirado y tu perfil "
+                    "ya no aparece en el catálogo. Renueva tu plan para volver a publicarlo."
+                ),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[notificacion.user.email],
+            )
+        except Exception:
+            logger.exception("Error enviando notificación de suscripción", extra={'notificacion_id': notificacion.id})
+            continue
+        enviadas.append(notificacion.pk)
+
+    NotificacionSuscripcion.objects.filter(pk__in=enviadas).update(enviada_en=timezone.now())
+    return len(enviadas)
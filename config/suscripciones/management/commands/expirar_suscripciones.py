@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from suscripciones import expiracion
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa las suscripciones vencidas (fecha_expiracion <= ahora): oculta los perfiles '
+        'y encola avisos. Idempotente; pensado para correr cada minuto'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=expiracion.LOTE_POR_DEFECTO)
+        parser.add_argument('--max-lotes', type=int, default=None, help='Corta tras N lotes (el resto queda para la próxima corrida)')
+        parser.add_argument('--sin-envio', action='store_true', help='Solo encolar avisos, sin enviar emails')
+
+    def handle(self, *args, **options):
+        procesadas = expiracion.procesar_vencidas(lote=options['lote'], max_lotes=options['max_lotes'])
+        enviadas = 0
+        if not options['sin_envio']:
+            enviadas = expiracion.enviar_notificaciones(lote=options['lote'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Se procesaron {procesadas} suscripciones expiradas y se enviaron {enviadas} avisos'
+            )
+        )
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def marcar_vencidas_existentes(apps, schema_editor):
+    # Las que ya vencieron antes del barrido no deben generar avisos atrasados
+    Suscripcion = apps.get_model('suscripciones', 'Suscripcion')
+    Suscripcion.objects.filter(fecha_expiracion__lte=timezone.now()).update(expirada_en=F('fecha_expiracion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suscripciones', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionSuscripcion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('expirada', 'Suscripción expirada')], max_length=20)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('enviada_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación de Suscripción',
+                'verbose_name_plural': 'Notificaciones de Suscripción',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='suscripcion',
+            name='expirada_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='suscripcion',
+            index=models.Index(condition=models.Q(('expirada_en__isnull', True)), fields=['fecha_expiracion'], name='suscripcion_por_expirar_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionsuscripcion',
+            name='suscripcion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='suscripciones.suscripcion'),
+        ),
+        migrations.AddField(
+            model_name='notificacionsuscripcion',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_suscripcion', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificacionsuscripcion',
+            index=models.Index(condition=models.Q(('enviada_en__isnull', True)), fields=['fecha_creacion'], name='notificacion_pendiente_idx'),
+        ),
+        migrations.RunPython(marcar_vencidas_existentes, migrations.RunPython.noop),
+    ]
@@ -52,14 +52,34 @@ class Suscripcion(models.Model):
     fecha_inicio = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    # Marca del barrido de expiración (suscripciones.expiracion). Null = aún no procesada.
+    expirada_en = models.DateTimeField(null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name = 'Suscripción'
         verbose_name_plural = 'Suscripciones'
+        indexes = [
+            # Solo las pendientes de procesar: el barrido cada minuto lee un rango pequeño
+            models.Index(
+                fields=['fecha_expiracion'],
+                condition=models.Q(expirada_en__isnull=True),
+                name='suscripcion_por_expirar_idx',
+            ),
+        ]
 
     def __str__(self):
         estado = "Pausada" if self.esta_pausada else "Activa"
         return f"Suscripción de {self.user.username} - {estado}"
 
+    def save(self, *args, **kwargs):
+        # Si se renovó o reanudó (fecha futura o reloj detenido), vuelve a quedar pendiente del barrido
+        if self.expirada_en and (not self.fecha_expiracion or self.fecha_expiracion > timezone.now()):
+            self.expirada_en = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'expirada_en'}
+        super().save(*args, **kwargs)
+
     # --- Lógica de Negocio Centralizada ---
 
     def pausar(self):
@@ -163,4 +183,28 @@ class SolicitudSuscripcion(models.Model):
                 suscripcion.fecha_expiracion = now + timedelta(days=dias_a_agregar)
 
         suscripcion.save()
-        return suscripcion
\ No newline at end of file
+        return suscripcion
+
+
+class NotificacionSuscripcion(models.Model):
+    """Cola de avisos al usuario, generada por el barrido de expiración."""
+    TIPO_CHOICES = [
+        ("expirada", "Suscripción expirada"),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="notificaciones_suscripcion")
+    suscripcion = models.ForeignKey(Suscripcion, on_delete=models.CASCADE, related_name="notificaciones")
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    enviada_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Notificación de Suscripción"
+        verbose_name_plural = "Notificaciones de Suscripción"
+        ordering = ["fecha_creacion"]
+        indexes = [
+            models.Index(fields=['fecha_creacion'], condition=models.Q(enviada_en__isnull=True), name='notificacion_pendiente_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.user.username}"
@@ -1,3 +1,60 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from perfiles.models import Ciudad, PerfilModelo
+from usuarios.models import CustomUser
+from .models import NotificacionSuscripcion, Suscripcion
+
+
+@override_settings(
+    PERFILES_VISIBLE_REQUIERE_SUSCRIPCION=True,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}},
+)
+class ExpirarSuscripcionesTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="modelo", email="modelo@example.com", password="x")
+        self.suscripcion = Suscripcion.objects.create(
+            user=self.user, fecha_expiracion=timezone.now() + timedelta(days=1), dias_restantes=3
+        )
+        self.perfil = PerfilModelo.objects.create(
+            user=self.user, ciudad=Ciudad.objects.create(nombre="Santiago"), nombre_artistico="Modelo"
+        )
+
+    def expirar(self):
+        call_command('expirar_suscripciones', stdout=StringIO())
+
+    def test_vencida_se_procesa_una_sola_vez(self):
+        self.assertTrue(PerfilModelo.objects.get(pk=self.perfil.pk).esta_visible)
+        Suscripcion.objects.update(fecha_expiracion=timezone.now() - timedelta(seconds=1))
+
+        self.expirar()
+        self.expirar()
+
+        self.assertFalse(PerfilModelo.objects.get(pk=self.perfil.pk).esta_visible)
+        self.assertEqual(NotificacionSuscripcion.objects.filter(enviada_en__isnull=False).count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        # dias_restantes es el congelador de las pausadas: el barrido no lo toca
+        self.assertEqual(Suscripcion.objects.get().dias_restantes, 3)
+
+    def test_renovar_vuelve_a_dejarla_pendiente(self):
+        Suscripcion.objects.update(fecha_expiracion=timezone.now() - timedelta(seconds=1))
+        self.expirar()
+
+        suscripcion = Suscripcion.objects.get()
+        suscripcion.fecha_expiracion = timezone.now() + timedelta(days=30)
+        suscripcion.save()
+        self.assertIsNone(suscripcion.expirada_en)
+        self.assertTrue(PerfilModelo.objects.get(pk=self.perfil.pk).esta_visible)
+
+    def test_no_procesa_pausadas_ni_vigentes(self):
+        self.expirar()
+        self.suscripcion.pausar()
+        self.expirar()
+        self.assertFalse(NotificacionSuscripcion.objects.exists())